@@ -17,23 +17,44 @@
         "security/oh_appraisal_ext_groups.xml",
         "security/ir.model.access.csv",
         "data/cron_reminders.xml",
+        "data/perf_config.xml",
+        "data/result_archive.xml",
+        "data/distribution_config.xml",
         "views/views_industry.xml",
         "views/views_master.xml", 
         "views/views_templates.xml",
         "views/views_scoring.xml",
         "views/views_results.xml",
+        "views/views_result_export.xml",
+        "views/views_result_archive.xml",
+        "views/views_trend_report.xml",
+        "views/views_distribution.xml",
+        "views/views_calibration.xml",
+        "views/views_weight_sensitivity.xml",
+        "views/views_noise_simulation.xml",
+        "views/views_weight_optimizer.xml",
+        "views/views_question_binding.xml",
         "views/views_team.xml",
         "views/views_okr_template.xml",
         "views/hr_appraisal_ext_views.xml",
+        "views/views_perf.xml",
         "views/menuitems.xml",
     ],
     "assets": {
         "web.assets_backend": [
             # Fix paths to match directory structure
-            "oh_appraisal_ext/static/src/js/dashboard.js",
-            "oh_appraisal_ext/static/src/css/dashboard.css",
+            "oh_appraisal_ext/static/src/js/dashboard_loader.js",
             "oh_appraisal_ext/static/src/js/okr_help_icons.js",
             "oh_appraisal_ext/static/src/css/okr_help_icons.scss",
+            "oh_appraisal_ext/static/src/js/okr_weightage_budget.js",
+            "oh_appraisal_ext/static/src/xml/okr_weightage_budget.xml",
+            "oh_appraisal_ext/static/src/js/okr_lazy_relation.js",
+            "oh_appraisal_ext/static/src/xml/okr_lazy_relation.xml",
+        ],
+        # Loaded on demand by the oh_appraisal_dashboard client action
+        "oh_appraisal_ext.assets_dashboard": [
+            "oh_appraisal_ext/static/src/js/dashboard.js",
+            "oh_appraisal_ext/static/src/css/dashboard.css",
             "oh_appraisal_ext/static/src/xml/dashboard_template.xml",
         ],
     },
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark harness for the appraisal engine.
+
+Not imported by the addon itself; run it from an Odoo shell on a scratch database:
+
+    $ odoo-bin shell -d bench_db
+    >>> from odoo.addons.oh_appraisal_ext.benchmarks import runner
+    >>> report = runner.run(env, size='1k', seed=42, output='/tmp/oh_bench_1k.json')
+
+generator.generate() builds a seeded synthetic dataset, runner.run() times the
+scenarios and writes a JSON report (wall time, SQL query count, peak Python memory).
+
+The process pool scaling is only meaningful on a multi-core box, from a shell
+that is not a server worker:
+
+    >>> report = runner.run(env, size='100k', scenarios=['rescore_parallel'], output='/tmp/oh_scaling.json')
+"""
+from . import generator
+from . import runner
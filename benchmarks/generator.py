@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+Seeded synthetic data for the appraisal engine.
+
+Everything is created through the ORM with batched create() calls so the
+dataset goes through the same constraints and computes as real data. The same
+(size, seed) pair always produces the same structure and answers.
+"""
+import logging
+import math
+import random
+
+_logger = logging.getLogger(__name__)
+
+SIZES = {
+    # employees, companies, departments per company, jobs per company,
+    # teams per department (two levels), items per template, OKR key results per template
+    'tiny': dict(employees=20, companies=1, departments=2, jobs=2, teams=2, items=4, key_results=6, peers=1),
+    '1k': dict(employees=1000, companies=1, departments=10, jobs=8, teams=4, items=8, key_results=30, peers=2),
+    '10k': dict(employees=10000, companies=2, departments=25, jobs=20, teams=6, items=10, key_results=60, peers=3),
+    '100k': dict(employees=100000, companies=4, departments=60, jobs=40, teams=8, items=12, key_results=120, peers=3),
+}
+
+BATCH = 1000
+
+
+class Dataset:
+    """Ids of everything generate() created, plus the answer sets per employee."""
+
+    def __init__(self, size, seed):
+        self.size = size
+        self.seed = seed
+        self.company_ids = []
+        self.department_ids = []
+        self.job_ids = []
+        self.team_ids = []
+        self.employee_ids = []
+        self.template_ids = []
+        self.master_ids = []
+        self.scoring_id = False
+        self.framework_id = False
+        self.okr_template_ids = []
+        self.appraisal_ids = []
+        self.survey_id = False
+        # {employee_id: {item_code: {reviewer_type: score}}}
+        self.answers = {}
+
+    def browse(self, env, model, attr):
+        return env[model].browse(getattr(self, attr))
+
+    def as_dict(self):
+        return {
+            'size': self.size,
+            'seed': self.seed,
+            'companies': len(self.company_ids),
+            'departments': len(self.department_ids),
+            'teams': len(self.team_ids),
+            'employees': len(self.employee_ids),
+            'templates': len(self.template_ids),
+            'okr_templates': len(self.okr_template_ids),
+            'appraisals': len(self.appraisal_ids),
+        }
+
+
+def _create(env, model, vals_list):
+    """Batched create returning the list of new ids."""
+    ids = []
+    for start in range(0, len(vals_list), BATCH):
+        ids += env[model].create(vals_list[start:start + BATCH]).ids
+    return ids
+
+
+def _scale(size):
+    if isinstance(size, dict):
+        return dict(SIZES['1k'], **size)
+    return SIZES[size]
+
+
+def generate(env, size='1k', seed=42, with_surveys=True):
+    """
+    Build a full synthetic population and return a Dataset.
+
+    size: one of SIZES or a dict overriding the '1k' profile.
+    with_surveys: also create hr.appraisal records with survey answers so the
+        close-out path can be benchmarked (needs the survey/oh_appraisal models).
+    """
+    cfg = _scale(size)
+    rnd = random.Random(seed)
+    data = Dataset(size if isinstance(size, str) else 'custom', seed)
+    tag = 'BENCH%s' % seed
+
+    # --- scoring scale & framework ------------------------------------------------
+    scoring = env['oh.appraisal.scoring'].create({
+        'name': '%s 1-5' % tag,
+        'scale_min': 1.0,
+        'scale_max': 5.0,
+        'rating_line_ids': [
+            (0, 0, {'min_value': 1.0, 'max_value': 2.0, 'label': 'Needs Improvement'}),
+            (0, 0, {'min_value': 2.0001, 'max_value': 3.0, 'label': 'Meets'}),
+            (0, 0, {'min_value': 3.0001, 'max_value': 4.0, 'label': 'Exceeds'}),
+            (0, 0, {'min_value': 4.0001, 'max_value': 5.0, 'label': 'Outstanding'}),
+        ],
+    })
+    data.scoring_id = scoring.id
+    framework = env['oh.appraisal.framework'].create({
+        'name': '%s 360 20/30/50' % tag,
+        'weight_line_ids': [
+            (0, 0, {'reviewer_type': 'self', 'weight': 20.0}),
+            (0, 0, {'reviewer_type': 'peer', 'weight': 30.0}),
+            (0, 0, {'reviewer_type': 'manager', 'weight': 50.0}),
+        ],
+    })
+    data.framework_id = framework.id
+
+    # --- survey questions (item codes are derived from them) ----------------------
+    item_count = cfg['items']
+    questions = env['survey.question']
+    if with_surveys:
+        survey = env['survey.survey'].create({'title': '%s appraisal survey' % tag})
+        data.survey_id = survey.id
+        questions = env['survey.question'].create([{
+            'survey_id': survey.id,
+            'title': 'Item %s' % i,
+            'question_type': 'numerical_box',
+        } for i in range(item_count * 3)])
+        item_codes = [env['hr.appraisal']._survey_item_key(q) for q in questions]
+    else:
+        item_codes = ['%s_item_%s' % (tag, i) for i in range(item_count * 3)]
+    dept_codes = item_codes[:item_count]
+    role_codes = item_codes[item_count:item_count * 2]
+    common_codes = item_codes[item_count * 2:]
+
+    def _lines(codes):
+        return [(0, 0, {
+            'name': 'Item %s' % code,
+            'code': code,
+            'max_score': 5.0,
+            'weight': float(rnd.randint(1, 3)),
+        }) for code in codes]
+
+    per_company = max(1, cfg['employees'] // cfg['companies'])
+    for c in range(cfg['companies']):
+        company = env['res.company'].create({'name': '%s Company %s' % (tag, c)})
+        data.company_ids.append(company.id)
+
+        dept_ids = _create(env, 'hr.department', [
+            {'name': '%s Dept %s.%s' % (tag, c, d), 'company_id': company.id}
+            for d in range(cfg['departments'])
+        ])
+        job_ids = _create(env, 'hr.job', [
+            {'name': '%s Job %s.%s' % (tag, c, j), 'company_id': company.id}
+            for j in range(cfg['jobs'])
+        ])
+        data.department_ids += dept_ids
+        data.job_ids += job_ids
+
+        # department weightage budgets
+        _create(env, 'oh.appraisal.department.weightage', [{
+            'company_id': company.id,
+            'department_id': dept_id,
+            'functional_weightage': 50.0,
+            'role_weightage': 30.0,
+            'common_weightage': 20.0,
+        } for dept_id in dept_ids])
+
+        # templates
+        dept_templates = _create(env, 'oh.appraisal.template', [{
+            'name': '%s Dept template %s' % (tag, dept_id),
+            'template_type': 'department',
+            'department_id': dept_id,
+            'company_id': company.id,
+            'line_ids': _lines(dept_codes),
+        } for dept_id in dept_ids])
+        role_templates = _create(env, 'oh.appraisal.template', [{
+            'name': '%s Role template %s' % (tag, job_id),
+            'template_type': 'role',
+            'job_id': job_id,
+            'company_id': company.id,
+            'line_ids': _lines(role_codes),
+        } for job_id in job_ids])
+        common_templates = _create(env, 'oh.appraisal.template', [{
+            'name': '%s Common template %s' % (tag, c),
+            'template_type': 'common',
+            'company_id': company.id,
+            'line_ids': _lines(common_codes),
+        }])
+        data.template_ids += dept_templates + role_templates + common_templates
+
+        master = env['oh.appraisal.master'].create({
+            'name': '%s Master %s' % (tag, c),
+            'company_id': company.id,
+            'assessment_period': 'annual',
+            'department_template_ids': [(6, 0, dept_templates)],
+            'role_template_ids': [(6, 0, role_templates)],
+            'common_template_ids': [(6, 0, common_templates)],
+            'weight_functional': 50.0,
+            'weight_role': 30.0,
+            'weight_common': 20.0,
+            'scoring_template_id': scoring.id,
+            'assessment_framework_id': framework.id,
+        })
+        data.master_ids.append(master.id)
+
+        # employees: one manager per department, the rest report to it
+        employees_vals = []
+        for i in range(per_company):
+            employees_vals.append({
+                'name': '%s Employee %s.%s' % (tag, c, i),
+                'company_id': company.id,
+                'department_id': dept_ids[i % len(dept_ids)],
+                'job_id': job_ids[rnd.randrange(len(job_ids))],
+            })
+        employee_ids = _create(env, 'hr.employee', employees_vals)
+        managers = {}
+        for emp_id, vals in zip(employee_ids, employees_vals):
+            managers.setdefault(vals['department_id'], emp_id)
+        by_manager = {}
+        for emp_id, vals in zip(employee_ids, employees_vals):
+            manager_id = managers[vals['department_id']]
+            if manager_id != emp_id:
+                by_manager.setdefault(manager_id, []).append(emp_id)
+        for manager_id, emp_ids in by_manager.items():
+            env['hr.employee'].browse(emp_ids).write({'parent_id': manager_id})
+        data.employee_ids += employee_ids
+
+        # team hierarchies: root team per department with sub-teams
+        members_by_dept = {}
+        for emp_id, vals in zip(employee_ids, employees_vals):
+            members_by_dept.setdefault(vals['department_id'], []).append(emp_id)
+        for dept_id in dept_ids:
+            root = env['oh.appraisal.team'].create({
+                'name': '%s Team %s' % (tag, dept_id),
+                'code': '%s-T%s' % (tag, dept_id),
+                'company_id': company.id,
+                'department_id': dept_id,
+                'team_type': 'department',
+            })
+            members = members_by_dept.get(dept_id, [])
+            chunk = max(1, len(members) // cfg['teams'])
+            sub_ids = _create(env, 'oh.appraisal.team', [{
+                'name': '%s Sub %s.%s' % (tag, dept_id, t),
+                'code': '%s-T%s.%s' % (tag, dept_id, t),
+                'company_id': company.id,
+                'department_id': dept_id,
+                'parent_id': root.id,
+                'member_ids': [(6, 0, members[t * chunk:(t + 1) * chunk])],
+            } for t in range(cfg['teams'])])
+            data.team_ids += [root.id] + sub_ids
+
+            data.okr_template_ids.append(
+                _generate_okr_template(env, rnd, tag, company, dept_id, sub_ids, cfg['key_results']))
+
+        # answers per employee: self + manager + a few peers per item
+        for emp_id, vals in zip(employee_ids, employees_vals):
+            data.answers[emp_id] = {
+                code: _reviewer_scores(rnd, cfg['peers']) for code in item_codes
+            }
+
+    if with_surveys:
+        _generate_appraisals(env, rnd, data, questions, item_codes)
+
+    env.flush_all()
+    _logger.info("Benchmark dataset generated: %s", data.as_dict())
+    return data
+
+
+def _reviewer_scores(rnd, peers):
+    base = rnd.uniform(1.5, 4.8)
+    scores = {
+        'self': min(5.0, base + rnd.uniform(0.0, 0.6)),
+        'manager': max(1.0, min(5.0, base + rnd.uniform(-0.5, 0.5))),
+    }
+    if peers:
+        scores['peer'] = sum(max(1.0, min(5.0, base + rnd.uniform(-0.8, 0.8))) for _ in range(peers)) / peers
+    return {k: round(v, 2) for k, v in scores.items()}
+
+
+def _generate_okr_template(env, rnd, tag, company, dept_id, team_ids, key_result_count):
+    template = env['oh.appraisal.okr.template'].create({
+        'name': '%s OKR %s' % (tag, dept_id),
+        'goal': 'Synthetic goal',
+        'company_id': company.id,
+        'department_id': dept_id,
+        'objective_title_department': 'Department objective',
+        'objective_title_role': 'Role objective',
+        'objective_title_common': 'Common objective',
+    })
+    # floor to 2 decimals so the team totals never exceed the 50/30 budgets
+    share = math.floor(5000.0 / len(team_ids)) / 100.0 if team_ids else 0.0
+    role_share = math.floor(3000.0 / len(team_ids)) / 100.0 if team_ids else 0.0
+    env['oh.appraisal.okr.weightage'].create([{
+        'okr_template_id': template.id,
+        'team_id': team_id,
+        'department_weightage': share,
+        'role_weightage': role_share,
+    } for team_id in team_ids])
+    breakdowns = {}
+    for breakdown_type in ('department', 'role', 'common'):
+        breakdowns[breakdown_type] = env['oh.appraisal.objective.breakdown'].create([{
+            'okr_template_id': template.id,
+            'breakdown_type': breakdown_type,
+            'objective_item': '%s breakdown %s' % (breakdown_type, i),
+            'priority': rnd.choice(['high', 'medium', 'low']),
+        } for i in range(3)]).ids
+    per_type = max(1, key_result_count // 3)
+    kr_vals = []
+    for result_type in ('department', 'role', 'common'):
+        for i in range(per_type):
+            kr_vals.append({
+                'okr_template_id': template.id,
+                'result_type': result_type,
+                'team_id': team_ids[i % len(team_ids)] if team_ids else False,
+                'key_objective_breakdown': breakdowns[result_type][i % 3],
+                'target_value': float(rnd.randint(10, 100)),
+                'actual_value': float(rnd.randint(0, 100)),
+                # stays well inside any team's allocated budget
+                'distributed_weightage': 0.01,
+            })
+    _create(env, 'oh.appraisal.okr.key.result', kr_vals)
+    return template.id
+
+
+def _generate_appraisals(env, rnd, data, questions, item_codes):
+    Appraisal = env['hr.appraisal']
+    employees = env['hr.employee'].browse(data.employee_ids)
+    appraisal_vals = []
+    for emp in employees:
+        vals = {'employee_id': emp.id, 'company_id': emp.company_id.id}
+        if 'manager_ids' in Appraisal._fields and emp.parent_id:
+            vals['manager_ids'] = [(6, 0, emp.parent_id.ids)]
+        appraisal_vals.append(vals)
+    data.appraisal_ids = _create(env, 'hr.appraisal', appraisal_vals)
+
+    question_by_code = dict(zip(item_codes, questions))
+    colleagues = employees.ids
+    input_vals = []
+    line_payloads = []
+    for app_id, emp in zip(data.appraisal_ids, employees):
+        answers = data.answers[emp.id]
+        reviewers = [('self', emp)]
+        if emp.parent_id:
+            reviewers.append(('manager', emp.parent_id))
+        peer = env['hr.employee'].browse(colleagues[rnd.randrange(len(colleagues))])
+        if peer != emp:
+            reviewers.append(('peer', peer))
+        for reviewer_type, reviewer in reviewers:
+            input_vals.append({
+                'survey_id': data.survey_id,
+                'partner_id': reviewer.work_contact_id.id,
+                'appraisal_id': app_id,
+                'state': 'done',
+            })
+            line_payloads.append([
+                (question_by_code[code], scores.get(reviewer_type, scores.get('peer', 3.0)))
+                for code, scores in answers.items()
+            ])
+    input_ids = _create(env, 'survey.user_input', input_vals)
+    line_vals = []
+    for input_id, payload in zip(input_ids, line_payloads):
+        for question, value in payload:
+            line_vals.append({
+                'user_input_id': input_id,
+                'survey_id': data.survey_id,
+                'question_id': question.id,
+                'answer_type': 'numerical_box',
+                'value_numerical_box': value,
+            })
+    _create(env, 'survey.user_input.line', line_vals)
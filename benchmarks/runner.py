@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark scenarios for the appraisal engine.
+
+Each scenario runs inside a savepoint that is rolled back afterwards, so the
+generated dataset can be reused across scenarios and runs. Measurements:
+  - wall_s: wall clock seconds (perf_counter)
+  - queries: SQL statements issued on the cursor (cr.sql_log_count)
+  - peak_kb: peak Python heap allocated during the scenario (tracemalloc)
+"""
+import contextlib
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+from odoo import release
+
+from . import generator
+from ..lib import scoring_pool
+
+_logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def measure(env, name, report, records=0, trace_memory=True):
+    """
+    Time a block and append its metrics to report['scenarios'].
+    trace_memory=False skips tracemalloc (forked pool workers would inherit it).
+    """
+    env.flush_all()
+    env.invalidate_all()
+    if trace_memory:
+        tracemalloc.start()
+    queries_before = env.cr.sql_log_count
+    started = time.perf_counter()
+    entry = {'name': name, 'records': records}
+    try:
+        yield entry
+        env.flush_all()
+    finally:
+        entry['wall_s'] = round(time.perf_counter() - started, 4)
+        entry['queries'] = env.cr.sql_log_count - queries_before
+        if trace_memory:
+            entry['peak_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024.0, 1)
+            tracemalloc.stop()
+        else:
+            entry['peak_kb'] = None
+        report['scenarios'].append(entry)
+        _logger.info("benchmark %(name)s: %(wall_s)ss, %(queries)s queries, %(peak_kb)s KiB peak", entry)
+
+
+@contextlib.contextmanager
+def rolled_back(env):
+    """Run a block in a savepoint that is always rolled back."""
+    savepoint = env.cr.savepoint()
+    try:
+        yield
+    finally:
+        savepoint.close(rollback=True)
+        env.invalidate_all()
+
+
+# ------------- Scenarios --------------
+def scenario_score_employees(env, data, report, limit=None):
+    """compute_employee_score for every generated employee, with reviewer-split answers."""
+    employees = env['hr.employee'].browse(data.employee_ids[:limit] if limit else data.employee_ids)
+    masters = {m.company_id.id: m for m in env['oh.appraisal.master'].browse(data.master_ids)}
+    with measure(env, 'compute_employee_score', report, records=len(employees)):
+        for emp in employees:
+            masters[emp.company_id.id].compute_employee_score(emp, answers_by_item=data.answers[emp.id])
+
+
+def scenario_close_out(env, data, report, limit=None):
+    """hr.appraisal.action_done on the generated appraisals (results rolled back)."""
+    if not data.appraisal_ids:
+        return
+    appraisals = env['hr.appraisal'].browse(data.appraisal_ids[:limit] if limit else data.appraisal_ids)
+    with rolled_back(env):
+        with measure(env, 'action_done', report, records=len(appraisals)):
+            appraisals.action_done()
+
+
+def scenario_okr_save(env, data, report):
+    """Save every OKR template: weightage edit + key result weight edit, as the form does."""
+    templates = env['oh.appraisal.okr.template'].browse(data.okr_template_ids)
+    with rolled_back(env):
+        with measure(env, 'okr_template_save', report, records=len(templates)):
+            for template in templates:
+                line = template.weightage_ids[:1]
+                key_results = template.department_key_result_ids[:5]
+                commands = [(1, line.id, {'department_weightage': line.department_weightage})] if line else []
+                commands_kr = [(1, kr.id, {'distributed_weightage': 0.02}) for kr in key_results]
+                template.write({'weightage_ids': commands, 'department_key_result_ids': commands_kr})
+
+
+def scenario_results_dashboard(env, data, report):
+    """Results list/pivot and team list reads, as the backend views issue them."""
+    Result = env['oh.appraisal.result']
+    Team = env['oh.appraisal.team']
+    with rolled_back(env):
+        # results only exist after a close-out; create them for the reads below
+        if data.appraisal_ids:
+            env['hr.appraisal'].browse(data.appraisal_ids).action_done()
+        with measure(env, 'results_list', report) as entry:
+            rows = Result.search_read(
+                [('company_id', 'in', data.company_ids)],
+                ['name', 'employee_id', 'final_percentage', 'rating_label', 'date'],
+                limit=80,
+            )
+            entry['records'] = len(rows)
+        with measure(env, 'results_pivot', report) as entry:
+            groups = Result.read_group(
+                [('company_id', 'in', data.company_ids)],
+                ['final_percentage:avg'],
+                ['employee_id', 'company_id'],
+                lazy=False,
+            )
+            entry['records'] = len(groups)
+    with measure(env, 'team_list', report) as entry:
+        rows = Team.search_read(
+            [('id', 'in', data.team_ids)],
+            ['complete_name', 'department_id', 'team_leader_id', 'member_count', 'child_count'],
+            limit=80,
+        )
+        entry['records'] = len(rows)
+
+
+def scenario_rescore_parallel(env, data, report, worker_counts=(1, 2, 4, 8)):
+    """
+    Pure pool scoring of every closed appraisal with 1..8 processes, then the
+    full action_recompute_parallel (extraction + scoring + bulk write-back),
+    both as the oh_rescore command runs them. Each pool entry carries its
+    speedup over the single-process run and its efficiency (speedup per
+    process); compare them with meta.cpu_count, no run scales past the cores.
+    """
+    Master = env['oh.appraisal.master']
+    with rolled_back(env):
+        appraisals = env['hr.appraisal'].browse(data.appraisal_ids)
+        appraisals._compute_appraisal_results()
+        for master in Master.browse(data.master_ids):
+            closed = appraisals.filtered(lambda a: a.result_id.master_id == master)
+            if not closed:
+                continue
+            plan = master._get_scoring_plan()
+            routes = master.get_templates_for_employees(closed.employee_id)
+            answers = closed._collect_reviewer_answers()
+            jobs = []
+            for app in closed:
+                dept, role, common = routes[app.employee_id.id]
+                jobs.append((app.id, app.employee_id.id,
+                             (dept.id if dept else False, role.id if role else False, tuple(common.ids)),
+                             answers.get(app.id, {})))
+            baseline = None
+            for workers in worker_counts:
+                with measure(env, 'score_pool[master=%s,workers=%s]' % (master.id, workers), report,
+                             records=len(jobs), trace_memory=False) as entry:
+                    _results, used = scoring_pool.run_scoring(plan, jobs, workers=workers, prefork_workers=0)
+                    entry['workers_used'] = used
+                baseline = baseline or entry['wall_s']
+                entry['speedup'] = round(baseline / entry['wall_s'], 2) if entry['wall_s'] else None
+                entry['efficiency'] = round(entry['speedup'] / used, 2) if entry['speedup'] else None
+            with measure(env, 'recompute_parallel[master=%s]' % master.id, report,
+                         records=len(closed), trace_memory=False) as entry:
+                entry.update(master.action_recompute_parallel(appraisals=closed, workers=max(worker_counts),
+                                                              prefork_workers=0))
+
+
+SCENARIOS = {
+    'score': scenario_score_employees,
+    'close_out': scenario_close_out,
+    'okr_save': scenario_okr_save,
+    'dashboard': scenario_results_dashboard,
+    'rescore_parallel': scenario_rescore_parallel,
+}
+
+
+def run(env, size='1k', seed=42, scenarios=None, output=None, data=None):
+    """
+    Generate (or reuse) a dataset, run the scenarios and return the report dict.
+
+    scenarios: iterable of SCENARIOS keys, all of them by default.
+    output: optional path; the report is written there as JSON.
+    data: a generator.Dataset from a previous run to skip generation.
+    """
+    report = {
+        'meta': {
+            'size': size,
+            'seed': seed,
+            'odoo': release.version,
+            'database': env.cr.dbname,
+            'cpu_count': os.cpu_count(),
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'scenarios': [],
+    }
+    if data is None:
+        with measure(env, 'generate', report):
+            data = generator.generate(env, size=size, seed=seed)
+    report['meta']['dataset'] = data.as_dict()
+    for key in (scenarios or SCENARIOS):
+        SCENARIOS[key](env, data, report)
+    if output:
+        with open(output, 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+    return report
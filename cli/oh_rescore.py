@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+``odoo-bin oh_rescore``: rescore appraisal results in a process pool.
+
+Server requests and crons score sequentially (see lib/scoring_pool), so large
+recomputations go through this command, which runs in its own process, on its
+main thread, outside the server workers:
+
+    $ odoo-bin oh_rescore -c /etc/odoo.conf -d prod --workers 8
+    $ odoo-bin oh_rescore -c /etc/odoo.conf -d prod --master 3 --master 7
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from odoo import SUPERUSER_ID, api
+from odoo.cli import Command
+from odoo.modules.registry import Registry
+from odoo.tools import config
+
+
+class OhRescore(Command):
+    """Rescore the appraisal results of some or all masters in a process pool"""
+    name = 'oh_rescore'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(prog='%s %s' % (Path(sys.argv[0]).name, self.name),
+                                         description=self.__doc__)
+        parser.add_argument('-c', '--config', dest='config', help="Odoo configuration file")
+        parser.add_argument('-d', '--database', dest='db_name', help="Database to rescore")
+        parser.add_argument('--master', dest='master_ids', type=int, action='append',
+                            help="Master to rescore, repeatable (default: every active master)")
+        parser.add_argument('--workers', type=int,
+                            help="Processes (default: oh_appraisal_ext.scoring_workers, else one per CPU)")
+        parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=500)
+        opts = parser.parse_args(cmdargs)
+
+        config_args = []
+        if opts.config:
+            config_args += ['-c', opts.config]
+        if opts.db_name:
+            config_args += ['-d', opts.db_name]
+        config.parse_config(config_args, setup_logging=True)
+        db_name = config['db_name']
+        if not db_name:
+            sys.exit("No database given: use -d or set db_name in the configuration file.")
+
+        registry = Registry(db_name)
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            Master = env['oh.appraisal.master']
+            masters = Master.browse(opts.master_ids) if opts.master_ids else Master.search([])
+            for master in masters:
+                started = time.perf_counter()
+                # this process is not a server worker, whatever the configuration says
+                stats = master.action_recompute_parallel(workers=opts.workers, chunk_size=opts.chunk_size,
+                                                         prefork_workers=0)
+                cr.commit()
+                print("%s: %s appraisals rescored with %s process(es) in %.1f s"
+                      % (master.display_name, stats['scored'], stats['workers'], time.perf_counter() - started))
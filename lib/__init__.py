@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+# Pure-Python helpers shared by the models. Nothing here touches the ORM, so
+# the functions can be pickled and run outside of a request (e.g. in a pool).
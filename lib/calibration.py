@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Forced-distribution calibration on plain Python data.
+
+A population is ranked best first on its final percentage, ties broken on the
+category scores and finally on the result id, and the ranked list is cut into
+consecutive slices whose sizes follow the band quotas. numpy is used for the
+ranking when it is installed; the pure-Python path gives the same order.
+"""
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+CATEGORY_FIELDS = ('functional', 'role', 'common')
+
+
+def allocate_seats(count, shares):
+    """
+    Split ``count`` results into bands following ``shares`` (percentages, best
+    band first) with the largest remainder method. Seats always add up to
+    ``count``; on equal remainders the better band gets the extra seat.
+    """
+    total = float(sum(shares))
+    if not count or total <= 0:
+        return [0] * len(shares)
+    exact = [count * share / total for share in shares]
+    seats = [int(value) for value in exact]
+    missing = count - sum(seats)
+    by_remainder = sorted(range(len(shares)), key=lambda i: (-(exact[i] - seats[i]), i))
+    for i in by_remainder[:missing]:
+        seats[i] += 1
+    return seats
+
+
+def _rank_python(ids, groups, finals, tie_columns):
+    # sorting prebuilt tuples is much faster than a key function per element
+    negated = [[-value for value in column] for column in tie_columns]
+    keys = list(zip(groups, [-value for value in finals], *negated, ids, range(len(ids))))
+    keys.sort()
+    return [key[-1] for key in keys]
+
+
+def _rank_numpy(ids, groups, finals, tie_columns):
+    # lexsort sorts on the last key first
+    keys = [numpy.asarray(ids)]
+    keys.extend(-numpy.asarray(column, dtype=float) for column in reversed(tie_columns))
+    keys.append(-numpy.asarray(finals, dtype=float))
+    keys.append(numpy.asarray(groups))
+    return numpy.lexsort(keys).tolist()
+
+
+def calibrate(rows, bands, tie_break=CATEGORY_FIELDS, use_numpy=True):
+    """
+    Assign a band to each row of each population.
+
+    rows: sequence of (result_id, group_key, final, functional, role, common);
+        group_key identifies the population (department or company id, 0 for none)
+    bands: ((label, share_percent), ...) best band first
+    tie_break: category names compared, in order, between equal final percentages
+
+    Returns ({label: [result_id, ...]}, {group_key: {label: count}}).
+    """
+    labels = [label for label, _share in bands]
+    shares = [float(share or 0.0) for _label, share in bands]
+    assigned = {label: [] for label in labels}
+    counts = {}
+    if not rows or not labels:
+        return assigned, counts
+
+    ids = [row[0] for row in rows]
+    groups = [row[1] or 0 for row in rows]
+    finals = [row[2] or 0.0 for row in rows]
+    tie_columns = [[row[3 + CATEGORY_FIELDS.index(name)] or 0.0 for row in rows] for name in tie_break]
+
+    if use_numpy and numpy is not None:
+        order = _rank_numpy(ids, groups, finals, tie_columns)
+    else:
+        order = _rank_python(ids, groups, finals, tie_columns)
+
+    start = 0
+    total = len(order)
+    while start < total:
+        group = groups[order[start]]
+        end = start
+        while end < total and groups[order[end]] == group:
+            end += 1
+        seats = allocate_seats(end - start, shares)
+        counts[group] = dict(zip(labels, seats))
+        position = start
+        for label, seat_count in zip(labels, seats):
+            assigned[label].extend(ids[i] for i in order[position:position + seat_count])
+            position += seat_count
+        start = end
+    return assigned, counts
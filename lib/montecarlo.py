@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo estimate of how stable a rating is under reviewer noise.
+
+Every reviewer score of an employee is perturbed many times and the perturbed
+answers are scored exactly like scoring_kernel.score_plan (framework weights,
+missing-reviewer policy, scale clamping, the same roundings and bands). Only
+running counts are kept per employee, so memory does not grow with the number
+of samples; numpy draws the samples in batches of at most MAX_BATCH_CELLS
+cells. Each employee has its own random stream derived from the seed and its
+key, so results do not depend on how the jobs were split over workers.
+"""
+import math
+import random
+import zlib
+
+from . import scoring_kernel
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+# Upper bound of samples x items x reviewers drawn at once by the numpy path (~16 MB of floats)
+MAX_BATCH_CELLS = 2000000
+
+# Noise columns: one per reviewer type, plus one for plain answers and unknown reviewer types
+SLOTS = len(scoring_kernel.REVIEWER_TYPES) + 1
+OTHER_SLOT = SLOTS - 1
+
+
+def _stream_seed(seed, key):
+    return zlib.crc32(('%s:%s' % (seed, key)).encode())
+
+
+def _item_inputs(value, framework):
+    """
+    ({slot: (score, weight)}, divisor) of one answer, so that item_raw(value) is
+    sum(score * weight) / divisor. A reviewer type keeps the same slot on every
+    item, which is what lets a reviewer's bias be shared across items.
+    """
+    if isinstance(value, dict):
+        if framework:
+            vector, policy = framework
+            inputs = {}
+            for slot, (weight, score) in enumerate(zip(vector, scoring_kernel.reviewer_row(value))):
+                if score is not None and weight:
+                    inputs[slot] = (score, weight)
+            if policy == scoring_kernel.MISSING_RENORMALIZE:
+                divisor = sum(weight for _score, weight in inputs.values())
+            else:
+                divisor = 1.0 if inputs else 0.0
+            return inputs, divisor
+        inputs = {}
+        others = []
+        for typ, raw_score in value.items():
+            score = scoring_kernel._as_score(raw_score)
+            if score is None:
+                continue
+            if typ in scoring_kernel.REVIEWER_TYPES:
+                inputs[scoring_kernel.REVIEWER_TYPES.index(typ)] = (score, 1.0)
+            else:
+                others.append(score)
+        if others:
+            # several unknown reviewer types share the last slot: their mean, counted once per score
+            inputs[OTHER_SLOT] = (sum(others) / len(others), float(len(others)))
+        return inputs, float(len(inputs) - bool(others) + len(others))
+    score = scoring_kernel._as_score(value)
+    if score is None:
+        return {}, 0.0
+    return {OTHER_SLOT: (score, 1.0)}, 1.0
+
+
+def compile_employee(plan, route, answers):
+    """
+    Flatten one employee into [(category_fraction, [(item_weight, max_score, low, high,
+    {slot: (score, reviewer_weight)}, divisor)])]: everything a sample needs, in scoring order.
+    Scores are clamped to [low, high] after the noise is added.
+    """
+    answers = answers or {}
+    scoring = plan['scoring']
+    categories = []
+    for fraction, (_name, lines) in zip((w / 100.0 for w in plan['weights']),
+                                        scoring_kernel._route_categories(plan, route)):
+        items = []
+        for code, (weight, max_score) in lines.items():
+            inputs, divisor = _item_inputs(answers.get(code), plan['framework'])
+            low, high = (scoring[0], scoring[1]) if scoring else (0.0, max_score)
+            items.append((weight or 1.0, max_score, low, high, inputs, divisor))
+        categories.append((fraction, items))
+    return categories
+
+
+def _sample_python(plan, categories, rng, noise, bias):
+    reviewer_bias = [rng.gauss(0.0, bias) if bias else 0.0 for _slot in range(SLOTS)]
+    final = 0.0
+    for fraction, items in categories:
+        weighted_sum = total_weight = 0.0
+        for weight, max_score, low, high, inputs, divisor in items:
+            raw = 0.0
+            if divisor:
+                for slot, (score, reviewer_weight) in inputs.items():
+                    noisy = score + reviewer_bias[slot] + (rng.gauss(0.0, noise) if noise else 0.0)
+                    raw += min(max(noisy, low), high) * reviewer_weight
+                raw /= divisor
+            weighted_sum += scoring_kernel._raw_percent(plan, raw, max_score) * weight
+            total_weight += weight
+        final += round(weighted_sum / total_weight if total_weight else 0.0, 2) * fraction
+    return round(final, 2)
+
+
+def _to_matrices(categories):
+    """Per category (fraction, arrays of items x slots), None for a category without items."""
+    compiled = []
+    for fraction, items in categories:
+        if not items:
+            compiled.append((fraction, None))
+            continue
+        scores = numpy.zeros((len(items), SLOTS))
+        reviewer_weights = numpy.zeros((len(items), SLOTS))
+        for row, item in enumerate(items):
+            for slot, (score, reviewer_weight) in item[4].items():
+                scores[row, slot] = score
+                reviewer_weights[row, slot] = reviewer_weight
+        divisor = numpy.array([item[5] for item in items])
+        compiled.append((fraction, {
+            'weights': numpy.array([item[0] for item in items]),
+            'max_score': numpy.array([item[1] for item in items]),
+            'low': numpy.array([item[2] for item in items])[:, None],
+            'high': numpy.array([item[3] for item in items])[:, None],
+            'scores': scores,
+            'reviewer_weights': reviewer_weights,
+            'divisor': numpy.where(divisor > 0, divisor, 1.0),
+            'answered': divisor > 0,
+        }))
+    return compiled
+
+
+def _percent_numpy(plan, raw, max_score):
+    scoring = plan['scoring']
+    if scoring:
+        scale_min, scale_max = scoring[0], scoring[1]
+        if scale_max - scale_min <= 0:
+            return numpy.zeros_like(raw)
+        percent = (numpy.clip(raw, scale_min, scale_max) - scale_min) / (scale_max - scale_min) * 100.0
+    else:
+        safe = numpy.where(max_score > 0, max_score, 1.0)
+        percent = numpy.where(max_score > 0, raw / safe * 100.0, 0.0)
+    return numpy.round(percent, 2)
+
+
+def _batch_numpy(plan, compiled, rng, size, noise, bias):
+    reviewer_bias = rng.normal(0.0, bias, (size, 1, SLOTS)) if bias else 0.0
+    final = numpy.zeros(size)
+    for fraction, data in compiled:
+        if data is None:
+            continue
+        noisy = data['scores'][None, :, :] + reviewer_bias
+        if noise:
+            noisy = noisy + rng.normal(0.0, noise, (size,) + data['scores'].shape)
+        noisy = numpy.clip(noisy, data['low'][None], data['high'][None])
+        raw = (noisy * data['reviewer_weights'][None]).sum(axis=2) / data['divisor']
+        raw = numpy.where(data['answered'], raw, 0.0)
+        percent = _percent_numpy(plan, raw, data['max_score'])
+        category = numpy.round((percent * data['weights']).sum(axis=1) / data['weights'].sum(), 2)
+        final = final + category * fraction
+    return numpy.round(final, 2)
+
+
+def simulate_employee(plan, route, answers, samples, noise=0.5, bias=0.0, seed=0, key=0, use_numpy=True):
+    """
+    Score ``samples`` noisy copies of one employee's answers.
+
+    noise: standard deviation of the independent noise added to every reviewer
+        score, in raw scale points
+    bias: standard deviation of a per-reviewer offset shared by all items of a sample
+    Returns {'labels': {label: probability}, 'mean', 'std', 'min', 'max'} of the
+    simulated final percentages.
+    """
+    categories = compile_employee(plan, route, answers)
+    stream = _stream_seed(seed, key)
+    counts = {}
+    total = total_sq = 0.0
+    low, high = float('inf'), float('-inf')
+    label_cache = {}
+
+    def _count(final, occurrences=1):
+        label = label_cache.get(final)
+        if label is None:
+            label = label_cache[final] = scoring_kernel._final_label(plan, final)[1] or ''
+        counts[label] = counts.get(label, 0) + occurrences
+
+    if use_numpy and numpy is not None:
+        rng = numpy.random.default_rng(stream)
+        compiled = _to_matrices(categories)
+        cells = max(1, sum(len(data['weights']) for _f, data in compiled if data is not None) * SLOTS)
+        batch = max(1, min(samples, MAX_BATCH_CELLS // cells))
+        done = 0
+        while done < samples:
+            size = min(batch, samples - done)
+            finals = _batch_numpy(plan, compiled, rng, size, noise, bias)
+            values, occurrences = numpy.unique(finals, return_counts=True)
+            for value, occurrence in zip(values.tolist(), occurrences.tolist()):
+                _count(value, occurrence)
+            total += float(finals.sum())
+            total_sq += float((finals * finals).sum())
+            low = min(low, float(finals.min()))
+            high = max(high, float(finals.max()))
+            done += size
+    else:
+        rng = random.Random(stream)
+        for _sample in range(samples):
+            final = _sample_python(plan, categories, rng, noise, bias)
+            _count(final)
+            total += final
+            total_sq += final * final
+            low = min(low, final)
+            high = max(high, final)
+
+    if not samples:
+        return {'labels': {}, 'mean': 0.0, 'std': 0.0, 'min': 0.0, 'max': 0.0}
+    mean = total / samples
+    return {
+        'labels': {label: count / samples for label, count in counts.items()},
+        'mean': mean,
+        'std': math.sqrt(max(0.0, total_sq / samples - mean * mean)),
+        'min': low,
+        'max': high,
+    }
+
+
+def simulate_batch(plan, jobs, samples, noise=0.5, bias=0.0, seed=0, use_numpy=True):
+    """Simulate a list of (key, employee_id, route, answers) jobs; returns [(key, summary)]."""
+    return [(key, simulate_employee(plan, route, answers, samples, noise, bias, seed, key, use_numpy))
+            for key, _employee_id, route, answers in jobs]
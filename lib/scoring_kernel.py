@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Pure scoring helpers working on plain Python data (tuples, lists, dicts).
+
+Reviewer weights are "compiled" into a vector aligned with REVIEWER_TYPES so
+aggregation is a dot product instead of a walk over ORM lines.
+"""
+from collections import namedtuple
+
+REVIEWER_TYPES = ('self', 'peer', 'manager', 'subordinate', 'customer')
+
+MISSING_ZERO = 'zero'
+MISSING_RENORMALIZE = 'renormalize'
+
+# Result detail levels of compute_employee_score / score_plan
+DETAIL_TOTALS = 'totals'      # final percentage, scale value and label only
+DETAIL_CATEGORY = 'category'  # + per-category percentages and chosen templates
+DETAIL_FULL = 'full'          # + per-item breakdown
+DETAIL_LEVELS = (DETAIL_TOTALS, DETAIL_CATEGORY, DETAIL_FULL)
+
+# Compact row returned by the batch scoring APIs
+ScoreTotals = namedtuple('ScoreTotals', [
+    'employee_id', 'final_percentage', 'rating_label', 'functional', 'role', 'common',
+])
+
+
+def compile_weight_vector(weights_by_type):
+    """
+    Turn {reviewer_type: weight_percent} into a tuple of fractions aligned with
+    REVIEWER_TYPES. Repeated reviewer types are summed, unknown types ignored.
+    """
+    vector = [0.0] * len(REVIEWER_TYPES)
+    for typ, weight in (weights_by_type or {}).items():
+        if typ in REVIEWER_TYPES:
+            vector[REVIEWER_TYPES.index(typ)] += float(weight or 0.0) / 100.0
+    return tuple(vector)
+
+
+def _as_score(value):
+    """Return a float score, or None when the reviewer did not answer."""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def reviewer_row(scores):
+    """
+    Normalize one cell of reviewer scores to a tuple aligned with REVIEWER_TYPES.
+    Accepts a dict {reviewer_type: score} or an already aligned sequence; missing
+    reviewers are None.
+    """
+    if isinstance(scores, dict):
+        return tuple(_as_score(scores.get(typ)) for typ in REVIEWER_TYPES)
+    row = tuple(_as_score(v) for v in scores)
+    return row + (None,) * (len(REVIEWER_TYPES) - len(row))
+
+
+def aggregate_reviewers(vector, scores, policy=MISSING_ZERO):
+    """
+    Weighted raw value of one item from its reviewer scores.
+
+    policy 'zero': a missing reviewer contributes 0 (historic behaviour).
+    policy 'renormalize': weights are rescaled over the reviewers present, so
+    a missing peer review does not drag the item down. Returns 0.0 when no
+    weighted reviewer answered.
+    """
+    total = 0.0
+    present_weight = 0.0
+    for weight, value in zip(vector, reviewer_row(scores)):
+        if value is None or not weight:
+            continue
+        total += value * weight
+        present_weight += weight
+    if policy == MISSING_RENORMALIZE:
+        return total / present_weight if present_weight else 0.0
+    return total
+
+
+def aggregate_tensor(vector, tensor, policy=MISSING_ZERO):
+    """
+    Aggregate an employees x items x reviewers tensor in one call.
+
+    tensor: sequence (employees) of sequences (items) of reviewer cells, each
+    cell being a dict or an aligned sequence as accepted by reviewer_row().
+    Returns a list (employees) of lists (items) of raw aggregated values.
+    """
+    return [
+        [aggregate_reviewers(vector, cell, policy) for cell in items]
+        for items in tensor
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Whole-employee scoring from a serialisable plan
+#
+# A plan is everything compute_employee_score reads from the database, frozen
+# into plain data so employees can be scored without the ORM:
+#   {
+#     'weights': (functional_pct, role_pct, common_pct),
+#     'scoring': (scale_min, scale_max, ((min, max, label), ...)) or None,
+#     'scoring_id': int or False,
+#     'framework': (weight_vector, missing_policy) or None,
+#     'lines': {template_id: ((code, weight, max_score), ...)},
+#   }
+# A route is (department_template_id, role_template_id, common_template_ids),
+# the first two being False when the employee has none.
+# ---------------------------------------------------------------------------
+
+FALLBACK_LABELS = ((90.0, 'Outstanding'), (75.0, 'Exceeds'), (60.0, 'Meets'))
+FALLBACK_LABEL_DEFAULT = 'Needs Improvement'
+
+
+def normalize_to_percent(raw, scale_min, scale_max):
+    """Clamp ``raw`` to the scale and map it to 0..100."""
+    denom = scale_max - scale_min
+    if denom <= 0:
+        return 0.0
+    value = max(scale_min, min(raw, scale_max))
+    return ((value - scale_min) / denom) * 100.0
+
+
+def band_label(raw, bands):
+    """Label of the first band (sorted by min) containing ``raw``, '' when none does."""
+    for low, high, label in bands:
+        if low <= raw <= high:
+            return label
+    return ''
+
+
+def fallback_label(percent):
+    for threshold, label in FALLBACK_LABELS:
+        if percent >= threshold:
+            return label
+    return FALLBACK_LABEL_DEFAULT
+
+
+def item_raw(value, framework):
+    """Raw value of one answer: reviewer split aggregated, plain numbers as is."""
+    if isinstance(value, dict):
+        if framework:
+            vector, policy = framework
+            return float(aggregate_reviewers(vector, value, policy) or 0.0)
+        scores = [_as_score(v) for v in value.values()]
+        scores = [v for v in scores if v is not None]
+        return sum(scores) / len(scores) if scores else 0.0
+    score = _as_score(value)
+    return score if score is not None else 0.0
+
+
+def _raw_percent(plan, raw, max_score):
+    """Item percent (rounded to 2 decimals) of a raw value: on the plan's scale, else against max_score."""
+    scoring = plan['scoring']
+    if scoring:
+        percent = normalize_to_percent(raw, scoring[0], scoring[1])
+    else:
+        percent = (raw / max_score) * 100.0 if max_score > 0 else 0.0
+    return round(percent, 2)
+
+
+def _final_label(plan, final_percent):
+    """(final_raw_on_scale, rating_label) of a final percentage."""
+    scoring = plan['scoring']
+    if scoring:
+        scale_min, scale_max, bands = scoring
+        final_raw = (final_percent / 100.0) * (scale_max - scale_min) + scale_min
+        return final_raw, band_label(final_raw, bands)
+    return None, fallback_label(final_percent)
+
+
+def _category_lines(plan, template_ids):
+    lines = {}
+    for template_id in template_ids:
+        for code, weight, max_score in plan['lines'].get(template_id, ()):
+            lines[code] = (weight, max_score)
+    return lines
+
+
+def _route_categories(plan, route):
+    dept_id, role_id, common_ids = route
+    return (
+        ('functional', _category_lines(plan, [dept_id] if dept_id else [])),
+        ('role', _category_lines(plan, [role_id] if role_id else [])),
+        ('common', _category_lines(plan, common_ids or ())),
+    )
+
+
+def _score_category(plan, lines, answers, with_items=True):
+    framework = plan['framework']
+    total_weight = 0.0
+    weighted_sum = 0.0
+    items = {} if with_items else None
+    for code, (weight, max_score) in lines.items():
+        raw = item_raw(answers.get(code), framework)
+        percent = _raw_percent(plan, raw, max_score)
+        weight = weight or 1.0
+        weighted_sum += percent * weight
+        total_weight += weight
+        if with_items:
+            items[code] = {'percent': percent, 'raw': raw}
+    category_percent = round((weighted_sum / total_weight) if total_weight else 0.0, 2)
+    result = {'percent': category_percent, 'total_weight': total_weight}
+    if with_items:
+        result['items'] = items
+    return result
+
+
+def score_plan(plan, employee_id, route, answers, detail=DETAIL_FULL):
+    """
+    Score one employee against a plan. With detail 'full' this returns the
+    compact computation dict (the shape stored in oh.appraisal.result.data_json),
+    identical in numbers to oh.appraisal.master.compute_employee_score; lower
+    detail levels leave out the item breakdown, then the categories.
+    """
+    dept_id, role_id, common_ids = route
+    answers = answers or {}
+    with_items = detail == DETAIL_FULL
+    functional, role, common = (
+        _score_category(plan, lines, answers, with_items) for _name, lines in _route_categories(plan, route))
+
+    wf, wr, wc = (w / 100.0 for w in plan['weights'])
+    final_percent = round(functional['percent'] * wf + role['percent'] * wr + common['percent'] * wc, 2)
+    final_raw, rating_label = _final_label(plan, final_percent)
+
+    totals = {
+        'employee_id': employee_id,
+        'final_percentage': final_percent,
+        'final_raw_on_scale': round(final_raw, 4) if final_raw is not None else None,
+        'rating_label': rating_label,
+    }
+    if detail == DETAIL_TOTALS:
+        return totals
+    totals.update({
+        'templates': {
+            'department': dept_id or False,
+            'role': role_id or False,
+            'common': list(common_ids or ()),
+        },
+        'functional': functional,
+        'role': role,
+        'common': common,
+        'scoring_id': plan.get('scoring_id') or False,
+    })
+    return totals
+
+
+def score_totals(plan, employee_id, route, answers):
+    """Compact ScoreTotals row of one employee (no breakdown is built)."""
+    res = score_plan(plan, employee_id, route, answers, DETAIL_CATEGORY)
+    return ScoreTotals(employee_id, res['final_percentage'], res['rating_label'],
+                       res['functional']['percent'], res['role']['percent'], res['common']['percent'])
+
+
+def score_batch(plan, jobs, detail=DETAIL_FULL):
+    """Score a list of (key, employee_id, route, answers) jobs; returns [(key, result)]."""
+    return [(key, score_plan(plan, employee_id, route, answers, detail))
+            for key, employee_id, route, answers in jobs]
+
+
+# ---------------------------------------------------------------------------
+# Running (incremental) aggregate of one employee
+#
+# The state is JSON-serialisable:
+#   {
+#     'key': plan/route identity the cached percents were computed for,
+#     'answers': {item_code: {reviewer_type: [sum, count]}},
+#     'percents': {category: {item_code: percent}},
+#     'categories': {category: [weighted_sum, total_weight]},
+#   }
+# Feeding new answers only recomputes the touched items and shifts their
+# categories' sums by the difference.
+# ---------------------------------------------------------------------------
+
+def running_answers(state):
+    """Averaged answers {item_code: {reviewer_type: mean}} of a running state."""
+    return {
+        code: {typ: (total / count if count else 0.0) for typ, (total, count) in by_type.items()}
+        for code, by_type in (state.get('answers') or {}).items()
+    }
+
+
+def _running_item_percent(plan, state, code, max_score):
+    by_type = (state.get('answers') or {}).get(code)
+    value = {typ: (total / count if count else 0.0) for typ, (total, count) in by_type.items()} if by_type else None
+    return _raw_percent(plan, item_raw(value, plan['framework']), max_score)
+
+
+def update_running_state(plan, route, state, rows, key=None):
+    """
+    Fold answer rows [(item_code, reviewer_type, value)] into ``state`` (in place).
+    When ``key`` differs from the one the state was built for (new configuration
+    version or another route), every item is recomputed once; otherwise only the
+    items present in ``rows``. Returns the set of recomputed item codes.
+    """
+    answers = state.setdefault('answers', {})
+    touched = set()
+    for code, reviewer_type, value in rows:
+        score = _as_score(value)
+        if score is None:
+            continue
+        acc = answers.setdefault(code, {}).setdefault(reviewer_type, [0.0, 0])
+        acc[0] += score
+        acc[1] += 1
+        touched.add(code)
+
+    categories = _route_categories(plan, route)
+    if state.get('key') != key or 'categories' not in state:
+        state['key'] = key
+        state['percents'] = {}
+        state['categories'] = {}
+        recomputed = set()
+        for name, lines in categories:
+            percents = state['percents'][name] = {}
+            weighted_sum = total_weight = 0.0
+            for code, (weight, max_score) in lines.items():
+                percent = percents[code] = _running_item_percent(plan, state, code, max_score)
+                weight = weight or 1.0
+                weighted_sum += percent * weight
+                total_weight += weight
+                recomputed.add(code)
+            state['categories'][name] = [weighted_sum, total_weight]
+        return recomputed
+
+    recomputed = set()
+    for name, lines in categories:
+        percents = state['percents'].setdefault(name, {})
+        sums = state['categories'].setdefault(name, [0.0, 0.0])
+        for code in touched.intersection(lines):
+            weight, max_score = lines[code]
+            percent = _running_item_percent(plan, state, code, max_score)
+            sums[0] += (percent - percents.get(code, 0.0)) * (weight or 1.0)
+            percents[code] = percent
+            recomputed.add(code)
+    return recomputed
+
+
+def running_totals(plan, state):
+    """{'final_percentage', 'final_raw_on_scale', 'rating_label', 'functional', 'role', 'common'} of a running state."""
+    category_percents = {}
+    for name in ('functional', 'role', 'common'):
+        weighted_sum, total_weight = (state.get('categories') or {}).get(name, (0.0, 0.0))
+        category_percents[name] = round(weighted_sum / total_weight, 2) if total_weight else 0.0
+    wf, wr, wc = (w / 100.0 for w in plan['weights'])
+    final_percent = round(category_percents['functional'] * wf + category_percents['role'] * wr
+                          + category_percents['common'] * wc, 2)
+    final_raw, rating_label = _final_label(plan, final_percent)
+    return dict(category_percents,
+                final_percentage=final_percent,
+                final_raw_on_scale=round(final_raw, 4) if final_raw is not None else None,
+                rating_label=rating_label)
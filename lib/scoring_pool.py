@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Fan scoring jobs out to a multiprocessing pool.
+
+Workers are forked from the current process and only run scoring_kernel on
+the plan and answer sets they are given: they never touch the database
+cursor, the ORM or the registry. Anything that makes forking unsafe makes
+run_scoring() score sequentially instead, which is always the case inside
+the server; the ``oh_rescore`` command (cli/oh_rescore.py) is the way to
+use the pool.
+"""
+import logging
+import multiprocessing
+import threading
+
+from . import montecarlo, scoring_kernel
+
+_logger = logging.getLogger(__name__)
+
+# Plan (and simulation options) of the current pool, set once per forked worker by
+# the initializer so they are not pickled again with every chunk.
+_worker_plan = None
+_worker_options = None
+
+
+def _init_worker(plan, options=None):
+    global _worker_plan, _worker_options
+    _worker_plan = plan
+    _worker_options = options
+
+
+def _score_chunk(jobs):
+    return scoring_kernel.score_batch(_worker_plan, jobs)
+
+
+def _simulate_chunk(jobs):
+    return montecarlo.simulate_batch(_worker_plan, jobs, **_worker_options)
+
+
+def pool_unavailable_reason(prefork_workers=0):
+    """
+    Why a pool cannot be used here, or None when it can:
+      - no 'fork' start method (the workers cannot re-import the addon),
+      - daemonic process (not allowed to have children),
+      - not the main thread (forking a threaded server copies held locks),
+      - prefork HTTP/cron worker (memory and time limits apply per process).
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return "fork start method unavailable"
+    if multiprocessing.current_process().daemon:
+        return "daemonic process"
+    if threading.current_thread() is not threading.main_thread():
+        return "not running in the main thread"
+    if prefork_workers:
+        return "running inside a prefork worker"
+    return None
+
+
+def _chunks(jobs, size):
+    for start in range(0, len(jobs), size):
+        yield jobs[start:start + size]
+
+
+def _run(plan, jobs, chunk_func, sequential, workers, chunk_size, prefork_workers, options=None):
+    """
+    Run ``chunk_func`` over the chunks of ``jobs`` in a pool, or ``sequential(jobs)``
+    in this process when none can be used. The worker globals are only ever set
+    inside forked workers: in a threaded server several requests take the
+    sequential path at the same time.
+    """
+    jobs = list(jobs)
+    chunk_size = max(1, int(chunk_size or 1))
+    workers = max(1, int(workers or 1))
+    workers = min(workers, (len(jobs) + chunk_size - 1) // chunk_size or 1)
+    reason = None if workers > 1 else "single worker requested"
+    if reason is None:
+        reason = pool_unavailable_reason(prefork_workers)
+    if reason:
+        if workers > 1:
+            _logger.info("Running %s jobs sequentially: %s", len(jobs), reason)
+        return sequential(jobs), 1
+
+    results = []
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes=workers, initializer=_init_worker, initargs=(plan, options)) as pool:
+        # imap keeps job order and lets the parent consume results as chunks finish
+        for chunk_result in pool.imap(chunk_func, _chunks(jobs, chunk_size)):
+            results.extend(chunk_result)
+    return results, workers
+
+
+def run_scoring(plan, jobs, workers=1, chunk_size=500, prefork_workers=0):
+    """
+    Score ``jobs`` (see scoring_kernel.score_batch) with up to ``workers``
+    processes. Returns [(key, result)] in job order and the number of
+    processes actually used.
+    """
+    return _run(plan, jobs, _score_chunk, lambda batch: scoring_kernel.score_batch(plan, batch),
+                workers, chunk_size, prefork_workers)
+
+
+def run_simulation(plan, jobs, samples, noise=0.5, bias=0.0, seed=0, workers=1, chunk_size=20, prefork_workers=0):
+    """
+    Monte Carlo reviewer-noise simulation of ``jobs`` (see montecarlo.simulate_batch)
+    with up to ``workers`` processes. Every employee draws from its own seeded
+    stream, so the summaries are the same whatever the number of processes.
+    Returns [(key, summary)] in job order and the number of processes used.
+    """
+    options = {'samples': samples, 'noise': noise, 'bias': bias, 'seed': seed}
+    return _run(plan, jobs, _simulate_chunk, lambda batch: montecarlo.simulate_batch(plan, batch, **options),
+                workers, chunk_size, prefork_workers, options)
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Weight sensitivity of a scored population.
+
+Changing category or item weights never changes an item's percent, only how
+the percents are averaged. A population is therefore compiled once into a
+sparse per-item percent matrix per category (build_population) and can then
+be re-evaluated under any weights without touching the answers again.
+numpy is used when it is installed; the pure-Python path gives the same numbers.
+"""
+from collections import Counter
+
+from . import scoring_kernel
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+CATEGORIES = ('functional', 'role', 'common')
+
+
+def build_population(plan, jobs):
+    """
+    Compile ``jobs`` ((key, employee_id, route, answers), as for
+    scoring_kernel.score_batch) into:
+      keys: job keys in order,
+      items: [(template_id, code)] every item column,
+      item_weights: their weights in the plan,
+      columns: per category, {item index: ([row], [percent])},
+      rows: per category, [[(item index, percent)] per job].
+    """
+    items = []
+    item_index = {}
+    item_weights = []
+    rows = {category: [] for category in CATEGORIES}
+    columns = {category: {} for category in CATEGORIES}
+    framework = plan['framework']
+    keys = []
+    for row_number, (key, _employee_id, route, answers) in enumerate(jobs):
+        keys.append(key)
+        answers = answers or {}
+        dept_id, role_id, common_ids = route
+        template_sets = (
+            ('functional', [dept_id] if dept_id else []),
+            ('role', [role_id] if role_id else []),
+            ('common', list(common_ids or ())),
+        )
+        for category, template_ids in template_sets:
+            # same precedence as scoring_kernel._category_lines: a later template wins on a shared code
+            lines = {}
+            for template_id in template_ids:
+                for code, weight, max_score in plan['lines'].get(template_id, ()):
+                    lines[code] = (template_id, weight, max_score)
+            row = []
+            for code, (template_id, weight, max_score) in lines.items():
+                column = item_index.get((template_id, code))
+                if column is None:
+                    column = item_index[(template_id, code)] = len(items)
+                    items.append((template_id, code))
+                    item_weights.append(weight or 1.0)
+                raw = scoring_kernel.item_raw(answers.get(code), framework)
+                percent = scoring_kernel._raw_percent(plan, raw, max_score)
+                row.append((column, percent))
+                entry = columns[category].setdefault(column, ([], []))
+                entry[0].append(row_number)
+                entry[1].append(percent)
+            rows[category].append(row)
+    population = {
+        'keys': keys,
+        'items': items,
+        'item_weights': item_weights,
+        'rows': rows,
+        'columns': columns,
+    }
+    if numpy is not None:
+        population['arrays'] = _to_arrays(population)
+    return population
+
+
+def _to_arrays(population):
+    arrays = {}
+    for category in CATEGORIES:
+        row_ids, column_ids, percents = [], [], []
+        for row_number, row in enumerate(population['rows'][category]):
+            for column, percent in row:
+                row_ids.append(row_number)
+                column_ids.append(column)
+                percents.append(percent)
+        arrays[category] = (numpy.asarray(row_ids, dtype=numpy.int64),
+                            numpy.asarray(column_ids, dtype=numpy.int64),
+                            numpy.asarray(percents, dtype=float))
+    return arrays
+
+
+def _weight_vector(population, item_weights):
+    """Plan item weights with the overrides {(template_id, code): weight} applied ('0 means 1', as in scoring)."""
+    weights = list(population['item_weights'])
+    for column, item in enumerate(population['items']):
+        if item in (item_weights or {}):
+            weights[column] = item_weights[item] or 1.0
+    return weights
+
+
+def _category_sums(population, weights, use_numpy):
+    """Per category, ([weighted percent sum], [weight sum]) of every row."""
+    count = len(population['keys'])
+    sums = {}
+    if use_numpy:
+        vector = numpy.asarray(weights, dtype=float)
+        for category, (row_ids, column_ids, percents) in population['arrays'].items():
+            item_w = vector[column_ids]
+            sums[category] = (numpy.bincount(row_ids, weights=item_w * percents, minlength=count),
+                              numpy.bincount(row_ids, weights=item_w, minlength=count))
+        return sums
+    for category in CATEGORIES:
+        weighted = [0.0] * count
+        total = [0.0] * count
+        for row_number, row in enumerate(population['rows'][category]):
+            for column, percent in row:
+                weighted[row_number] += weights[column] * percent
+                total[row_number] += weights[column]
+        sums[category] = (weighted, total)
+    return sums
+
+
+def _finals(plan, sums, category_weights, use_numpy):
+    """Final percentages (rounded like score_plan) from the category sums."""
+    fractions = [w / 100.0 for w in category_weights]
+    if use_numpy:
+        final = 0.0
+        for category, fraction in zip(CATEGORIES, fractions):
+            weighted, total = sums[category]
+            percent = numpy.divide(weighted, total, out=numpy.zeros_like(weighted), where=total > 0)
+            final = final + numpy.round(percent, 2) * fraction
+        return numpy.round(final, 2).tolist()
+    count = len(sums['functional'][0])
+    finals = [0.0] * count
+    for category, fraction in zip(CATEGORIES, fractions):
+        weighted, total = sums[category]
+        for row_number in range(count):
+            percent = round(weighted[row_number] / total[row_number], 2) if total[row_number] else 0.0
+            finals[row_number] += percent * fraction
+    return [round(value, 2) for value in finals]
+
+
+def _label_of(plan, cache, final):
+    label = cache.get(final)
+    if label is None:
+        label = cache[final] = scoring_kernel._final_label(plan, final)[1] or ''
+    return label
+
+
+def _labels(plan, finals, cache=None):
+    cache = {} if cache is None else cache
+    return [_label_of(plan, cache, final) for final in finals]
+
+
+def evaluate(plan, population, category_weights=None, item_weights=None, use_numpy=True):
+    """([final_percentage], [rating_label]) of the population under the given weights."""
+    use_numpy = use_numpy and numpy is not None and 'arrays' in population
+    category_weights = category_weights or plan['weights']
+    weights = _weight_vector(population, item_weights)
+    finals = _finals(plan, _category_sums(population, weights, use_numpy), category_weights, use_numpy)
+    return finals, _labels(plan, finals)
+
+
+def item_sensitivity(plan, population, category_weights=None, item_weights=None, step=0.1, top=10,
+                     use_numpy=True):
+    """
+    Effect of raising each item's weight by ``step`` (a fraction of its weight)
+    on top of the given weights: [(item, mean |delta final|, band flips,
+    employees affected)], largest mean delta first, at most ``top`` items.
+    Only the rows containing the item are recomputed.
+    """
+    use_numpy = use_numpy and numpy is not None and 'arrays' in population
+    category_weights = category_weights or plan['weights']
+    weights = _weight_vector(population, item_weights)
+    sums = _category_sums(population, weights, use_numpy)
+    finals = _finals(plan, sums, category_weights, use_numpy)
+    cache = {}
+    labels = _labels(plan, finals, cache)
+    fractions = dict(zip(CATEGORIES, (w / 100.0 for w in category_weights)))
+    if use_numpy:
+        finals_array = numpy.asarray(finals)
+        labels_array = numpy.asarray(labels, dtype=object)
+
+    report = []
+    for category in CATEGORIES:
+        weighted, total = sums[category]
+        fraction = fractions[category]
+        for column, (row_ids, percents) in population['columns'][category].items():
+            if not row_ids:
+                continue
+            delta_w = weights[column] * step
+            if use_numpy:
+                rows = numpy.asarray(row_ids)
+                w_sum, t_sum = weighted[rows], total[rows]
+                old_percent = numpy.round(numpy.divide(w_sum, t_sum, out=numpy.zeros_like(w_sum), where=t_sum > 0), 2)
+                new_percent = numpy.round((w_sum + delta_w * numpy.asarray(percents)) / (t_sum + delta_w), 2)
+                new_finals = numpy.round(finals_array[rows] + (new_percent - old_percent) * fraction, 2)
+                mean_delta = float(numpy.abs(new_finals - finals_array[rows]).mean())
+                values, inverse = numpy.unique(new_finals, return_inverse=True)
+                new_labels = numpy.asarray([_label_of(plan, cache, float(v)) for v in values], dtype=object)[inverse]
+                flips = int((new_labels != labels_array[rows]).sum())
+            else:
+                deltas = 0.0
+                flips = 0
+                for row_number, percent in zip(row_ids, percents):
+                    old_total = total[row_number]
+                    old_percent = round(weighted[row_number] / old_total, 2) if old_total else 0.0
+                    new_percent = round((weighted[row_number] + delta_w * percent) / (old_total + delta_w), 2)
+                    new_final = round(finals[row_number] + (new_percent - old_percent) * fraction, 2)
+                    deltas += abs(new_final - finals[row_number])
+                    if _label_of(plan, cache, new_final) != labels[row_number]:
+                        flips += 1
+                mean_delta = deltas / len(row_ids)
+            report.append((population['items'][column], mean_delta, flips, len(row_ids)))
+    report.sort(key=lambda entry: (-entry[1], -entry[2]))
+    return report[:top]
+
+
+def compare(plan, population, category_weights=None, item_weights=None, use_numpy=True):
+    """
+    Baseline (plan weights) against the perturbed weights: band flips, the
+    flip matrix {(from_label, to_label): count} and score delta statistics.
+    """
+    base_finals, base_labels = evaluate(plan, population, use_numpy=use_numpy)
+    new_finals, new_labels = evaluate(plan, population, category_weights, item_weights, use_numpy=use_numpy)
+    deltas = [new - old for old, new in zip(base_finals, new_finals)]
+    flips = Counter((old, new) for old, new in zip(base_labels, new_labels) if old != new)
+    count = len(deltas)
+    return {
+        'population': count,
+        'flips': sum(flips.values()),
+        'flip_matrix': dict(flips),
+        'mean_delta': sum(deltas) / count if count else 0.0,
+        'mean_abs_delta': sum(abs(d) for d in deltas) / count if count else 0.0,
+        'max_increase': max(deltas) if deltas else 0.0,
+        'max_decrease': min(deltas) if deltas else 0.0,
+        'finals': new_finals,
+        'labels': new_labels,
+    }
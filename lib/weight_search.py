@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Random search of weight configurations toward a target rating distribution.
+
+Candidates are scored on a population compiled by sensitivity.build_population,
+so each one costs a re-evaluation of the cached percent matrices only. The
+category weights are drawn from a Dirichlet distribution restricted to the
+budget bounds: uniformly over the allowed simplex while exploring, then
+concentrated around the best candidates found so far. Categories whose budget
+is a single value stay fixed; the item weights are searched all the same.
+Item weights, when allowed to move, are scaled by random factors within
+``item_spread``.
+"""
+import math
+import random
+from collections import Counter
+
+from . import sensitivity
+
+# Share of the iterations spent exploring before refining around the best candidates
+EXPLORE_SHARE = 0.5
+# Dirichlet concentration used when refining: the higher, the closer to the parent candidate
+REFINE_CONCENTRATION = 400.0
+# Dirichlet draws tried before drawing straight inside the bounds
+MAX_DRAWS = 50
+
+
+def check_bounds(bounds):
+    """True when some category weights within ``bounds`` ((low, high) percents) add up to 100."""
+    return sum(low for low, _high in bounds) <= 100.0 + 1e-9 and sum(high for _low, high in bounds) >= 100.0 - 1e-9
+
+
+def _within(weights, bounds):
+    # weights are rounded to 2 decimals: a bound like 33.333 is met by 33.33
+    return all(low - 0.005 <= weight <= high + 0.005 for weight, (low, high) in zip(weights, bounds))
+
+
+def _round_weights(weights, bounds):
+    """Weights rounded to 2 decimals that still add up to exactly 100, or None outside the bounds."""
+    rounded = [round(weight, 2) for weight in weights]
+    rest = round(100.0 - sum(rounded), 2)
+    if rest:
+        for index in sorted(range(len(rounded)), key=lambda i: -rounded[i]):
+            low, high = bounds[index]
+            if low - 0.005 <= rounded[index] + rest <= high + 0.005:
+                rounded[index] = round(rounded[index] + rest, 2)
+                rest = 0.0
+                break
+    if rest or not _within(rounded, bounds):
+        return None
+    return tuple(rounded)
+
+
+def _sample_box(rng, bounds, free, rest):
+    """
+    Weights of the ``free`` categories adding up to ``rest``, each within its
+    bounds: drawn one at a time, in random order, from the range that still
+    leaves the others a feasible share. Never fails when check_bounds() holds.
+    """
+    order = list(free)
+    rng.shuffle(order)
+    weights = {}
+    for position, index in enumerate(order[:-1]):
+        others = order[position + 1:]
+        low = max(bounds[index][0], rest - sum(bounds[i][1] for i in others))
+        high = min(bounds[index][1], rest - sum(bounds[i][0] for i in others))
+        weights[index] = rng.uniform(low, high) if high > low else low
+        rest -= weights[index]
+    weights[order[-1]] = rest
+    return weights
+
+
+def sample_category_weights(rng, bounds, center=None, concentration=1.0):
+    """
+    Category weights (percents adding up to 100) within ``bounds``. Categories
+    whose bounds are a single value are fixed to it; the others are drawn from
+    a Dirichlet distribution over the remaining share (uniform without
+    ``center``, else centred on it), falling back to a draw straight inside
+    the bounds when the Dirichlet draws keep missing them. None only when the
+    bounds cannot add up to 100.
+    """
+    if not check_bounds(bounds):
+        return None
+    free = [i for i, (low, high) in enumerate(bounds) if high - low > 1e-9]
+    weights = [low for low, _high in bounds]
+    rest = 100.0 - sum(weights[i] for i in range(len(bounds)) if i not in free)
+    if len(free) == 1:
+        weights[free[0]] = rest
+        return _round_weights(weights, bounds)
+    if free:
+        if center:
+            alphas = [max(concentration * center[i] / 100.0, 0.05) for i in free]
+        else:
+            alphas = [1.0] * len(free)
+        for _draw in range(MAX_DRAWS):
+            draws = [rng.gammavariate(alpha, 1.0) for alpha in alphas]
+            total = sum(draws)
+            if not total:
+                continue
+            for index, draw in zip(free, draws):
+                weights[index] = rest * draw / total
+            rounded = _round_weights(weights, bounds)
+            if rounded:
+                return rounded
+        for index, weight in _sample_box(rng, bounds, free, rest).items():
+            weights[index] = weight
+    return _round_weights(weights, bounds)
+
+
+def sample_item_weights(rng, items, base_weights, spread, center=None, scale=1.0):
+    """{item: weight}: each weight of ``center`` (else the base weights) times a factor in [1/(1+s), 1+s]."""
+    if not spread:
+        return {}
+    limit = math.log1p(spread) * scale
+    weights = {}
+    for item, base in zip(items, base_weights):
+        origin = (center or {}).get(item, base)
+        value = origin * math.exp(rng.uniform(-limit, limit))
+        # never leave the spread around the configured weight
+        value = min(max(value, base / (1.0 + spread)), base * (1.0 + spread))
+        weights[item] = round(value, 2) or 0.01
+    return weights
+
+
+def distribution(labels):
+    counts = Counter(labels)
+    total = float(len(labels)) or 1.0
+    return {label: count / total for label, count in counts.items()}
+
+
+def distance(shares, target):
+    """Total variation distance (0..1) between two {label: share} distributions."""
+    labels = set(shares) | set(target)
+    return 0.5 * sum(abs(shares.get(label, 0.0) - target.get(label, 0.0)) for label in labels)
+
+
+def _candidate(plan, population, weights, item_weights, target, use_numpy):
+    finals, labels = sensitivity.evaluate(plan, population, weights, item_weights, use_numpy=use_numpy)
+    shares = distribution(labels)
+    count = len(finals)
+    mean = sum(finals) / count if count else 0.0
+    return {
+        'weights': weights,
+        'item_weights': item_weights,
+        'distance': distance(shares, target),
+        'distribution': shares,
+        'mean': mean,
+        'std': math.sqrt(max(0.0, sum(f * f for f in finals) / count - mean * mean)) if count else 0.0,
+    }
+
+
+def search(plan, population, target, bounds, iterations=200, item_spread=0.0, top=5, seed=0, use_numpy=True):
+    """
+    Look for weights whose ratings over ``population`` come closest to ``target``.
+
+    target: {label: share}, shares adding up to 1
+    bounds: ((low, high), ...) percent bounds of the functional, role and common weights
+    item_spread: how far item weights may move from the plan, as a fraction (0 keeps them)
+    Returns (baseline, [candidate]): the plan weights and the ``top`` best distinct
+    candidates, closest first. A candidate is {'weights', 'item_weights',
+    'distance', 'distribution', 'mean', 'std'}.
+    """
+    rng = random.Random(seed)
+    items = population['items']
+    base_item_weights = population['item_weights']
+    baseline = _candidate(plan, population, tuple(plan['weights']), {}, target, use_numpy)
+
+    seen = set()
+    found = []
+    if _within(baseline['weights'], bounds):
+        found.append(baseline)
+        seen.add((baseline['weights'], ()))
+    explore = int(iterations * EXPLORE_SHARE)
+    for iteration in range(iterations):
+        if iteration < explore or not found:
+            weights = sample_category_weights(rng, bounds)
+            item_weights = sample_item_weights(rng, items, base_item_weights, item_spread)
+        else:
+            parent = found[rng.randrange(min(len(found), max(1, top)))]
+            weights = sample_category_weights(rng, bounds, parent['weights'], REFINE_CONCENTRATION)
+            item_weights = sample_item_weights(rng, items, base_item_weights, item_spread,
+                                               parent['item_weights'], scale=0.25)
+        if weights is None:
+            continue
+        key = (weights, tuple(sorted(item_weights.items())))
+        if key in seen:
+            continue
+        seen.add(key)
+        found.append(_candidate(plan, population, weights, item_weights, target, use_numpy))
+        found.sort(key=lambda candidate: candidate['distance'])
+        # only the best ones are kept, as refinement parents and as the answer
+        del found[max(top, 1) * 4:]
+    return baseline, found[:top]
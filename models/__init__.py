@@ -1,14 +1,26 @@
 # -*- coding: utf-8 -*-
 
+from . import perf_sample
 from . import industry
 from . import res_users_inherit
 from . import appraisal_master
+from . import appraisal_master_version
 from . import appraisal_framework
 from . import appraisal_templates
 from . import appraisal_scoring
 from . import appraisal_result
+from . import result_archive
+from . import trend_report
+from . import result_distribution
+from . import calibration
+from . import weight_sensitivity
+from . import noise_simulation
+from . import weight_optimizer
 from . import hr_appraisal_inherit
+from . import survey_user_input
+from . import question_binding
 from . import appraisal_simulation
+from . import result_export
 from . import team
 from . import okr_template
 from . import okr_weightage
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models
+from odoo import api, fields, models, tools
+
+from ..lib import scoring_kernel
+
 
 class OHAppraisalFramework(models.Model):
     _name = 'oh.appraisal.framework'
@@ -12,20 +15,73 @@ class OHAppraisalFramework(models.Model):
     weight_line_ids = fields.One2many('oh.appraisal.framework.line','framework_id', string='Reviewer Weights',
                                      help="Define the weight (%) for each reviewer type. Percentages should sum to 100 for meaningful aggregation.")
 
+    missing_reviewer_policy = fields.Selection([
+        (scoring_kernel.MISSING_ZERO, 'Count as zero'),
+        (scoring_kernel.MISSING_RENORMALIZE, 'Renormalize over present reviewers'),
+    ], string='Missing Reviewers', required=True, default=scoring_kernel.MISSING_ZERO,
+        help="How to treat a configured reviewer type that gave no score: count it as 0, "
+             "or rescale the weights over the reviewer types that did answer.")
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'missing_reviewer_policy', 'weight_line_ids'} & set(vals):
+            self._touch()
+            self.env['oh.appraisal.master']._masters_using(frameworks=self)._bump_config_version()
+        return res
+
+    def _touch(self):
+        """
+        Move write_date, the key of the compiled weights. The wall clock, not the
+        transaction start the ORM uses, so two changes in one transaction differ.
+        """
+        if not self:
+            return
+        self.flush_recordset()
+        self.env.cr.execute(
+            "UPDATE oh_appraisal_framework SET write_date = (clock_timestamp() at time zone 'UTC') WHERE id IN %s",
+            (tuple(self.ids),),
+        )
+        self.invalidate_recordset(['write_date'])
+
+    def _get_compiled_weights(self):
+        """
+        Compile the framework once into (weight_vector, missing_reviewer_policy).
+        The vector is aligned with scoring_kernel.REVIEWER_TYPES and holds fractions.
+        Cached per write_date, which moves when the framework or one of its lines changes.
+        """
+        self.ensure_one()
+        return self._compile_weights(self.id, self.write_date)
+
+    @api.model
+    @tools.ormcache('framework_id', 'write_date')
+    def _compile_weights(self, framework_id, write_date):
+        framework = self.browse(framework_id)
+        weights = {}
+        for ln in framework.weight_line_ids:
+            weights[ln.reviewer_type] = weights.get(ln.reviewer_type, 0.0) + float(ln.weight or 0.0)
+        return scoring_kernel.compile_weight_vector(weights), framework.missing_reviewer_policy
+
     def compute_aggregate(self, scores_by_reviewer_type):
         """
         Aggregate a dict of reviewer_type -> numeric score (raw on same scale) into a single
-        weighted raw value using configured weight_line_ids.
-        If some configured reviewer type is missing from input, it contributes 0 (you may prefer different behavior).
+        weighted raw value using the compiled reviewer weight vector.
+        Missing reviewer types either contribute 0 or are renormalized away,
+        depending on missing_reviewer_policy.
         """
         self.ensure_one()
-        total = 0.0
-        for ln in self.weight_line_ids:
-            typ = ln.reviewer_type
-            wt = float(ln.weight or 0.0)
-            val = float(scores_by_reviewer_type.get(typ, 0.0) or 0.0)
-            total += (val * (wt / 100.0))
-        return total
+        vector, policy = self._get_compiled_weights()
+        return scoring_kernel.aggregate_reviewers(vector, scores_by_reviewer_type or {}, policy)
+
+    def compute_aggregate_batch(self, tensor):
+        """
+        Aggregate a whole employees x items x reviewers tensor in one call.
+        Each cell is a reviewer_type -> score dict or a sequence aligned with
+        scoring_kernel.REVIEWER_TYPES (None for a missing reviewer).
+        Returns nested lists of raw values with the same employees x items shape.
+        """
+        self.ensure_one()
+        vector, policy = self._get_compiled_weights()
+        return scoring_kernel.aggregate_tensor(vector, tensor, policy)
 
 
 class OHAppraisalFrameworkLine(models.Model):
@@ -41,3 +97,25 @@ class OHAppraisalFrameworkLine(models.Model):
         ('customer','Customer')
     ], required=True, string="Reviewer Type")
     weight = fields.Float(string='Weight %', help='Percentage weight assigned to this reviewer type. Ensure total of lines = 100 for correct aggregation.')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.framework_id._touch()
+        self.env['oh.appraisal.master']._masters_using(frameworks=records.framework_id)._bump_config_version()
+        return records
+
+    def write(self, vals):
+        frameworks = self.framework_id
+        res = super().write(vals)
+        (frameworks | self.framework_id)._touch()
+        self.env['oh.appraisal.master']._masters_using(frameworks=frameworks | self.framework_id)._bump_config_version()
+        return res
+
+    def unlink(self):
+        frameworks = self.framework_id
+        masters = self.env['oh.appraisal.master']._masters_using(frameworks=frameworks)
+        res = super().unlink()
+        frameworks.exists()._touch()
+        masters._bump_config_version()
+        return res
@@ -1,19 +1,59 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+from .perf_sample import perf_stage
+import datetime
 import json
 import logging
+import os
+
+from odoo.tools import config
+
+from ..lib import scoring_kernel, scoring_pool
 _logger = logging.getLogger(__name__)
 
+# Fields whose change alters how results are scored; writing any of them bumps config_version
+MASTER_CONFIG_FIELDS = (
+    'weight_functional', 'weight_role', 'weight_common',
+    'department_template_ids', 'role_template_ids', 'common_template_ids', 'master_template_id',
+    'scoring_template_id', 'assessment_framework_id',
+)
+
+# Fields that decide which master an appraisal resolves to; writing any of them clears the resolver cache
+MASTER_RESOLVER_FIELDS = ('active', 'company_id', 'sequence', 'date_start', 'date_end', 'department_template_ids')
+
+# Labels used when the master has no scoring scale (same thresholds as compute_employee_score)
+FALLBACK_LABEL_SQL = """
+    CASE WHEN s.pct >= 90 THEN 'Outstanding'
+         WHEN s.pct >= 75 THEN 'Exceeds'
+         WHEN s.pct >= 60 THEN 'Meets'
+         ELSE 'Needs Improvement' END
+"""
+
+SCALE_LABEL_SQL = """
+    COALESCE((
+        SELECT ln.label FROM oh_appraisal_scoring_line ln
+         WHERE ln.scoring_id = %(scoring_id)s
+           AND ln.min_value <= s.raw AND s.raw <= ln.max_value
+         ORDER BY ln.min_value
+         LIMIT 1
+    ), '')
+"""
+
 class OHAppraisalMaster(models.Model):
     _name = 'oh.appraisal.master'
     _description = 'Appraisal Master Control (Weightages & Engine)'
     _rec_name = 'name'
+    _order = 'sequence, id'
 
     name = fields.Char(required=True, help="Name of the master configuration (e.g., 'Sales Annual 2025').")
     active = fields.Boolean(default=True, tracking=True)
     company_id = fields.Many2one('res.company', string='Company', help="Company this master belongs to. Leave blank for global usage.")
     description = fields.Text(help="Optional notes and documentation for administrators.")
+    sequence = fields.Integer(default=10, help="When several masters match an appraisal, the lowest sequence wins.")
+    date_start = fields.Date(string='Valid From', help="First day appraisals are closed with this master. Leave empty for no lower bound.")
+    date_end = fields.Date(string='Valid To', help="Last day appraisals are closed with this master. Leave empty for no upper bound.")
 
     # Optional metadata to help users choose configurations
     industry_type = fields.Many2one('oh.appraisal.industry', string="Industry Type", 
@@ -47,10 +87,136 @@ class OHAppraisalMaster(models.Model):
     last_sim_final_percentage = fields.Float(string='Last Sim Final %', digits=(6,2), readonly=True)
     last_sim_rating = fields.Char(string='Last Sim Rating', readonly=True)
 
+    config_version = fields.Integer(string='Configuration Version', default=1, readonly=True, copy=False,
+                                    help="Incremented whenever weightages, templates or the scoring setup change. "
+                                         "Results store the number they were computed with; the matching "
+                                         "Configuration Version records the content, and several numbers "
+                                         "share one version when a change is reverted.")
+
+    version_ids = fields.One2many('oh.appraisal.master.version', 'master_id', string='Configuration Versions', readonly=True)
+
+    # Template routing: department/job -> template, rebuilt whenever the template links change
+    routing_index = fields.Text(string='Template Routing Index', compute='_compute_routing_index', store=True,
+                                help="JSON map of department and job position to template, used to pick templates per employee.")
+
     _sql_constraints = [
         ('name_company_uniq', 'unique(name, company_id)', 'A master config with this name already exists for the company.')
     ]
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        for rec in records:
+            rec._get_current_version()
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if any(fname in vals for fname in MASTER_RESOLVER_FIELDS):
+            self.env.registry.clear_cache()
+        if any(fname in vals for fname in MASTER_CONFIG_FIELDS):
+            self._bump_config_version()
+            for rec in self:
+                rec._get_current_version()
+        return res
+
+    # ------------- Configuration versions --------------
+    def _bump_config_version(self):
+        """
+        Count a change of what decides the masters' scores. config_version keys
+        the cached scoring plans, so every such change (here, or in the linked
+        templates, scoring scales and frameworks) must go through this.
+        """
+        if not self:
+            return
+        self.flush_recordset(['config_version'])
+        self.env.cr.execute("""
+            UPDATE oh_appraisal_master
+               SET config_version = COALESCE(config_version, 0) + 1,
+                   write_date = (now() at time zone 'UTC')
+             WHERE id IN %s
+        """, (tuple(self.ids),))
+        self.invalidate_recordset(['config_version', 'write_date'])
+
+    @api.model
+    def _masters_using(self, templates=None, scorings=None, frameworks=None):
+        """Masters, archived ones included, whose configuration includes any of the given records."""
+        domains = []
+        if templates:
+            domains += [[(fname, 'in', templates.ids)] for fname in
+                        ('master_template_id', 'department_template_ids', 'role_template_ids', 'common_template_ids')]
+        if scorings:
+            # masters without a scale are labelled with the first one, which may be any of them
+            domains += [[('scoring_template_id', 'in', scorings.ids)], [('scoring_template_id', '=', False)]]
+        if frameworks:
+            domains.append([('assessment_framework_id', 'in', frameworks.ids)])
+        if not domains:
+            return self.browse()
+        return self.sudo().with_context(active_test=False).search(expression.OR(domains))
+    def _get_config_snapshot(self):
+        """
+        Canonical description of everything that decides a score: category
+        weights, the lines of every linked template, the scoring bands and the
+        framework's reviewer weights. Its hash identifies a configuration version.
+        """
+        self.ensure_one()
+        templates = (self.master_template_id | self.department_template_ids
+                     | self.role_template_ids | self.common_template_ids)
+        scoring = self.scoring_template_id
+        framework = self.assessment_framework_id
+        framework_vector, framework_policy = framework._get_compiled_weights() if framework else (None, None)
+        return {
+            'weights': {
+                'functional': self.weight_functional or 0.0,
+                'role': self.weight_role or 0.0,
+                'common': self.weight_common or 0.0,
+            },
+            'templates': {
+                str(tmpl.id): {
+                    'name': tmpl.name,
+                    'type': tmpl.template_type,
+                    'department_id': tmpl.department_id.id,
+                    'job_id': tmpl.job_id.id,
+                    'lines': self._gather_template_lines(tmpl),
+                } for tmpl in templates
+            },
+            'links': {
+                'master': self.master_template_id.id,
+                'department': sorted(self.department_template_ids.ids),
+                'role': sorted(self.role_template_ids.ids),
+                'common': sorted(self.common_template_ids.ids),
+            },
+            'scoring': {
+                'id': scoring.id,
+                'scale_min': scoring.scale_min,
+                'scale_max': scoring.scale_max,
+                'bands': [[ln.min_value, ln.max_value, ln.label]
+                          for ln in scoring.rating_line_ids.sorted(key=lambda r: (r.min_value, r.id))],
+            } if scoring else None,
+            'framework': {
+                'id': framework.id,
+                'weights': list(framework_vector),
+                'missing_reviewer_policy': framework_policy,
+            } if framework else None,
+        }
+
+    def _get_current_version(self):
+        """Immutable version record matching the master's current configuration (created on first use)."""
+        self.ensure_one()
+        return self.env['oh.appraisal.master.version']._get_or_create(self, self._get_config_snapshot())
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    @api.constrains('date_start', 'date_end')
+    def _check_validity_dates(self):
+        for rec in self:
+            if rec.date_start and rec.date_end and rec.date_end < rec.date_start:
+                raise ValidationError(_("The validity end date of a master cannot be before its start date."))
+
     @api.constrains('weight_functional','weight_role','weight_common')
     def _check_weights_sum(self):
         for rec in self:
@@ -62,7 +228,112 @@ class OHAppraisalMaster(models.Model):
             if abs(total - 100.0) > 0.001:
                 raise ValidationError(_("Functional + Role + Common weightages must sum to 100%% (got %s). Please set the three weights appropriately.") % (total,))
 
+    @api.depends('department_template_ids.department_id', 'role_template_ids.job_id', 'common_template_ids')
+    def _compute_routing_index(self):
+        for rec in self:
+            departments = {}
+            for tmpl in rec.department_template_ids:
+                if tmpl.department_id:
+                    departments.setdefault(str(tmpl.department_id.id), tmpl.id)
+            roles = {}
+            for tmpl in rec.role_template_ids:
+                if tmpl.job_id:
+                    roles.setdefault(str(tmpl.job_id.id), tmpl.id)
+            rec.routing_index = json.dumps({
+                'department': departments,
+                'role': roles,
+                # first linked template, used when nothing matches the employee
+                'department_fallback': rec.department_template_ids[:1].id,
+                'role_fallback': rec.role_template_ids[:1].id,
+                'common': rec.common_template_ids.ids,
+            })
+
+    @api.model
+    @tools.ormcache('routing_index')
+    def _parse_routing_index(self, routing_index):
+        """Parsed routing index, cached per JSON value. Treat the result as read-only."""
+        try:
+            index = json.loads(routing_index or '{}')
+        except ValueError:
+            index = {}
+        return {
+            'department': {int(k): v for k, v in (index.get('department') or {}).items()},
+            'role': {int(k): v for k, v in (index.get('role') or {}).items()},
+            'department_fallback': index.get('department_fallback') or False,
+            'role_fallback': index.get('role_fallback') or False,
+            'common': tuple(index.get('common') or ()),
+        }
+
+    def _route_employee(self, index, employee, prefetch_ids=None):
+        """Template tuple for one employee from a parsed routing index: two dict lookups."""
+        Template = self.env['oh.appraisal.template']
+        dept_template = None
+        role_template = None
+        if employee.department_id:
+            dept_template = Template.browse(
+                index['department'].get(employee.department_id.id) or index['department_fallback']
+            ).with_prefetch(prefetch_ids)
+        if employee.job_id:
+            role_template = Template.browse(
+                index['role'].get(employee.job_id.id) or index['role_fallback']
+            ).with_prefetch(prefetch_ids)
+        return (dept_template, role_template, Template.browse(index['common']).with_prefetch(prefetch_ids))
+
+    # ------------- Master resolution --------------
+    @api.model
+    @tools.ormcache()
+    def _get_master_candidates(self):
+        """
+        Every active master as a plain tuple
+        (id, company_id, sequence, date_start, date_end, covered_department_ids),
+        read in one query and cached until a master or a template's department changes.
+        """
+        masters = self.sudo().search_fetch(
+            [('active', '=', True)],
+            ['company_id', 'sequence', 'date_start', 'date_end', 'routing_index'],
+            order='sequence, id',
+        )
+        return tuple(
+            (master.id, master.company_id.id, master.sequence, master.date_start, master.date_end,
+             frozenset(self._parse_routing_index(master.routing_index)['department']))
+            for master in masters
+        )
+
+    @api.model
+    def _resolve_masters(self, appraisals):
+        """
+        Master to close each appraisal with, as {appraisal_id: master (maybe empty)}.
+
+        A master qualifies when it belongs to the appraisal's company (or to no
+        company) and its validity window contains the appraisal date. Among those,
+        company-specific beats global, a master with a template for the employee's
+        department beats one without, then lowest sequence, then lowest id.
+        """
+        candidates = self._get_master_candidates()
+        prefetch_ids = tuple(c[0] for c in candidates)
+        today = fields.Date.context_today(self)
+        has_close_date = 'date_close' in appraisals._fields
+        result = {}
+        for app in appraisals:
+            ref_date = (has_close_date and app.date_close) or today
+            if isinstance(ref_date, datetime.datetime):
+                ref_date = ref_date.date()
+            company_id = app.company_id.id
+            department_id = app.employee_id.department_id.id
+            best_id, best_key = False, None
+            for master_id, master_company_id, sequence, date_start, date_end, departments in candidates:
+                if master_company_id and master_company_id != company_id:
+                    continue
+                if (date_start and ref_date < date_start) or (date_end and ref_date > date_end):
+                    continue
+                key = (not master_company_id, department_id not in departments, sequence, master_id)
+                if best_key is None or key < best_key:
+                    best_id, best_key = master_id, key
+            result[app.id] = self.browse(best_id).with_prefetch(prefetch_ids)
+        return result
+
     # ------------- Helper utilities --------------
+    @perf_stage('template_lines')
     def _gather_template_lines(self, templates):
         """
         Build mapping of template items by code -> metadata:
@@ -71,9 +342,7 @@ class OHAppraisalMaster(models.Model):
         lines = {}
         for tmpl in templates:
             for ln in tmpl.line_ids:
-                code = (ln.code or ln.name or str(ln.id)).strip()
-                if not code:
-                    code = str(ln.id)
+                code = ln._get_item_code()
                 lines[code] = {
                     'name': ln.name,
                     'max_score': float(ln.max_score or 0.0),
@@ -83,6 +352,7 @@ class OHAppraisalMaster(models.Model):
                 }
         return lines
 
+    @perf_stage('template_resolution')
     def get_templates_for_employee(self, employee):
         """
         Choose best-matching templates for an employee:
@@ -91,24 +361,29 @@ class OHAppraisalMaster(models.Model):
          - common templates: return all configured common templates
         Returns tuple (dept_template, role_template, common_templates_recordset)
         """
+        self.ensure_one()
+        index = self._parse_routing_index(self.routing_index)
         if not employee:
-            return (None, None, self.common_template_ids or self.env['oh.appraisal.template'].browse([]))
+            return (None, None, self.env['oh.appraisal.template'].browse(index['common']))
+        return self._route_employee(index, employee)
 
-        dept_template = None
-        role_template = None
-        if employee.department_id:
-            dept_template = (self.department_template_ids.filtered(lambda t: t.department_id == employee.department_id)[:1] or self.department_template_ids[:1])
-            if isinstance(dept_template, list):
-                dept_template = dept_template[0] if dept_template else None
-        if employee.job_id:
-            role_template = (self.role_template_ids.filtered(lambda t: t.job_id == employee.job_id)[:1] or self.role_template_ids[:1])
-            if isinstance(role_template, list):
-                role_template = role_template[0] if role_template else None
-
-        return (dept_template, role_template, (self.common_template_ids or self.env['oh.appraisal.template'].browse([])))
+    @perf_stage('template_resolution')
+    def get_templates_for_employees(self, employees):
+        """
+        Batch variant of get_templates_for_employee.
+        Returns {employee_id: (dept_template, role_template, common_templates)}.
+        """
+        self.ensure_one()
+        index = self._parse_routing_index(self.routing_index)
+        template_ids = set(index['department'].values()) | set(index['role'].values()) | set(index['common'])
+        template_ids |= {index['department_fallback'], index['role_fallback']} - {False}
+        # one prefetch set for every template the batch can be routed to
+        prefetch_ids = tuple(sorted(template_ids))
+        return {employee.id: self._route_employee(index, employee, prefetch_ids) for employee in employees}
 
     # ------------- Core scoring pipeline --------------
-    def compute_employee_score(self, employee, answers_by_item=None, template_selection=None):
+    @perf_stage('scoring')
+    def compute_employee_score(self, employee, answers_by_item=None, template_selection=None, detail='full'):
         """
         Compute the final appraisal for an employee based on:
          - selected templates (department/role/common),
@@ -121,9 +396,17 @@ class OHAppraisalMaster(models.Model):
 
         template_selection: optional dict: {'department': id, 'role': id, 'common': [ids]}
 
-        Returns comprehensive dict with breakdowns and final percentage.
+        detail: 'full' (default) returns the comprehensive dict with breakdowns;
+            'category' drops the per-item breakdown, weights and explanation;
+            'totals' only returns employee_id, final_percentage, final_raw_on_scale
+            and rating_label. Call again with 'full' to get the breakdown on demand.
+
+        Returns dict with final percentage (and breakdowns depending on detail).
         """
         self.ensure_one()
+        if detail not in scoring_kernel.DETAIL_LEVELS:
+            raise ValidationError(_("Unknown detail level %s.") % detail)
+        with_items = detail == scoring_kernel.DETAIL_FULL
         answers = dict(answers_by_item or {})
 
         # choose templates (explicit selection takes precedence)
@@ -138,7 +421,7 @@ class OHAppraisalMaster(models.Model):
         role_lines = self._gather_template_lines(role and self.env['oh.appraisal.template'].browse(role.id) or self.env['oh.appraisal.template'].browse([]))
         common_lines = self._gather_template_lines(common_templates)
 
-        scoring = self.scoring_template_id or (self.env['oh.appraisal.scoring'].search([], limit=1))
+        scoring = self._get_scoring_scale()
 
         def _compute_item_percent(code, meta, value):
             """
@@ -156,6 +439,13 @@ class OHAppraisalMaster(models.Model):
                     raw = float(self.assessment_framework_id.compute_aggregate(value) or 0.0)
                 except Exception:
                     raw = 0.0
+            elif isinstance(value, dict):
+                # reviewer split without a framework: plain mean of the reviewers who answered
+                scores = [v for v in value.values() if v not in (None, '')]
+                try:
+                    raw = (sum(float(v) for v in scores) / len(scores)) if scores else 0.0
+                except Exception:
+                    raw = 0.0
             else:
                 # numeric (or None)
                 try:
@@ -164,7 +454,7 @@ class OHAppraisalMaster(models.Model):
                     raw = 0.0
 
             # compute percent
-            if scoring and scoring.exists():
+            if scoring:
                 p = scoring.normalize_to_percent(raw)
             else:
                 max_score = float(meta.get('max_score') or 0.0)
@@ -181,6 +471,8 @@ class OHAppraisalMaster(models.Model):
                 w = float(meta.get('weight') or 1.0)
                 weighted_sum += (pct * w)
                 total_weight += w
+                if not with_items:
+                    continue
                 items[code] = {
                     'name': meta.get('name'),
                     'percent': pct,
@@ -190,6 +482,8 @@ class OHAppraisalMaster(models.Model):
                     'template_id': meta.get('template_id'),
                 }
             category_percent = round((weighted_sum / total_weight) if total_weight else 0.0, 2)
+            if not with_items:
+                return {'percent': category_percent, 'total_weight': total_weight}
             return {'percent': category_percent, 'items': items, 'total_weight': total_weight}
 
         func_res = aggregate_category(func_lines)
@@ -204,7 +498,7 @@ class OHAppraisalMaster(models.Model):
 
         final_raw_on_scale = None
         rating_label = ''
-        if scoring and scoring.exists():
+        if scoring:
             final_raw_on_scale = (final_percent / 100.0) * (scoring.scale_max - scoring.scale_min) + scoring.scale_min
             rating_label = scoring.to_label(final_raw_on_scale) or ''
         else:
@@ -218,8 +512,15 @@ class OHAppraisalMaster(models.Model):
             else:
                 rating_label = 'Needs Improvement'
 
-        return {
+        result = {
             'employee_id': employee.id if employee else False,
+            'final_percentage': final_percent,
+            'final_raw_on_scale': round(final_raw_on_scale,4) if final_raw_on_scale is not None else None,
+            'rating_label': rating_label,
+        }
+        if detail == scoring_kernel.DETAIL_TOTALS:
+            return result
+        result.update({
             'templates': {
                 'department': dept.id if dept else False,
                 'role': role.id if role else False,
@@ -228,14 +529,260 @@ class OHAppraisalMaster(models.Model):
             'functional': func_res,
             'role': role_res,
             'common': common_res,
-            'weights': {'functional': self.weight_functional, 'role': self.weight_role, 'common': self.weight_common},
-            'final_percentage': final_percent,
-            'final_raw_on_scale': round(final_raw_on_scale,4) if final_raw_on_scale is not None else None,
-            'rating_label': rating_label,
             'scoring_id': scoring.id if scoring else False,
+        })
+        if detail == scoring_kernel.DETAIL_CATEGORY:
+            return result
+        result.update({
+            'weights': {'functional': self.weight_functional, 'role': self.weight_role, 'common': self.weight_common},
             'explanation': {
                 'note': 'Dynamic scoring computed via templates, per-item weights and optional reviewer-framework aggregation.'
             }
+        })
+        return result
+
+    def compute_employee_scores(self, employees, answers_by_employee=None):
+        """
+        Batch scoring for dashboards, rankings and mass simulations.
+
+        answers_by_employee: {employee_id: answers_by_item}.
+        Returns a list of scoring_kernel.ScoreTotals tuples
+        (employee_id, final_percentage, rating_label, functional, role, common)
+        in employee order. No per-item breakdown is built; use
+        compute_employee_score(employee, answers, detail='full') for the
+        employees whose breakdown is actually displayed.
+        """
+        self.ensure_one()
+        answers_by_employee = answers_by_employee or {}
+        plan = self._get_scoring_plan()
+        routes = self.get_templates_for_employees(employees)
+        rows = []
+        for employee in employees:
+            dept, role, common = routes[employee.id]
+            route = (dept.id if dept else False, role.id if role else False, tuple(common.ids))
+            rows.append(scoring_kernel.score_totals(plan, employee.id, route, answers_by_employee.get(employee.id)))
+        return rows
+
+    def _get_scoring_scale(self):
+        """Scale results of this master are labelled with: its own, else the first one defined."""
+        self.ensure_one()
+        return self.scoring_template_id or self.env['oh.appraisal.scoring'].search([], limit=1)
+
+    # ------------- Parallel recomputation --------------
+    def _get_scoring_plan(self):
+        """
+        Everything compute_employee_score reads from the database, as the plain
+        data plan scoring_kernel.score_plan works on (picklable for a pool).
+        """
+        self.ensure_one()
+        scoring = self._get_scoring_scale()
+        framework = self.assessment_framework_id
+        templates = self.department_template_ids | self.role_template_ids | self.common_template_ids
+        return {
+            'weights': (self.weight_functional or 0.0, self.weight_role or 0.0, self.weight_common or 0.0),
+            'scoring': (
+                scoring.scale_min, scoring.scale_max,
+                tuple((ln.min_value, ln.max_value, ln.label)
+                      for ln in scoring.rating_line_ids.sorted(key=lambda r: r.min_value)),
+            ) if scoring else None,
+            'scoring_id': scoring.id,
+            'framework': framework._get_compiled_weights() if framework else None,
+            'lines': {
+                tmpl.id: tuple((code, meta['weight'], meta['max_score'])
+                               for code, meta in self._gather_template_lines(tmpl).items())
+                for tmpl in templates
+            },
+        }
+
+    def _get_cached_scoring_plan(self):
+        """
+        (plan, config_hash) of the master's current configuration, built once per
+        configuration version and shared by the workers. Treat the plan as read-only.
+        """
+        self.ensure_one()
+        return self._load_scoring_plan(self.id, self.config_version, self.write_date)
+
+    @api.model
+    @tools.ormcache('master_id', 'config_version', 'write_date')
+    def _load_scoring_plan(self, master_id, config_version, write_date):
+        # write_date tells apart equal version numbers reached by a transaction that was rolled back
+        master = self.sudo().browse(master_id)
+        return master._get_scoring_plan(), master._get_current_version().config_hash
+
+    def _get_scored_appraisal_domain(self):
+        """Appraisals scored with this master, whether their result is live or already archived."""
+        self.ensure_one()
+        return ['|', ('result_id.master_id', '=', self.id), ('result_archive_id.master_id', '=', self.id)]
+
+    def _get_scoring_jobs(self, appraisals):
+        """(appraisal_id, employee_id, route, answers) of every appraisal, the job shape of lib.scoring_kernel."""
+        self.ensure_one()
+        routes = self.get_templates_for_employees(appraisals.employee_id)
+        answers = appraisals._collect_reviewer_answers()
+        jobs = []
+        for app in appraisals:
+            dept, role, common = routes[app.employee_id.id]
+            route = (dept.id if dept else False, role.id if role else False, tuple(common.ids))
+            jobs.append((app.id, app.employee_id.id, route, answers.get(app.id, {})))
+        return jobs
+
+    def _get_scoring_workers(self, workers=None):
+        if workers is None:
+            param = self.env['ir.config_parameter'].sudo().get_param('oh_appraisal_ext.scoring_workers')
+            workers = int(param or 0) or os.cpu_count() or 1
+        return max(1, int(workers))
+
+    def action_recompute_parallel(self, appraisals=None, workers=None, chunk_size=500, prefork_workers=None):
+        """
+        Rescore appraisals without going through compute_employee_score per record.
+
+        The configuration is frozen into a scoring plan and the answers of all
+        appraisals are extracted in one pass; the pure scoring then runs in a
+        process pool of ``workers`` processes (system parameter
+        oh_appraisal_ext.scoring_workers, else one per CPU) and the results are
+        written back in bulk here. Inside prefork workers, threads or daemonic
+        processes the scoring runs sequentially in this process: server requests
+        and crons always do, the pool is for the ``oh_rescore`` command (see
+        cli/oh_rescore.py), which runs outside the server workers.
+
+        appraisals: defaults to the appraisals whose live result was computed with this
+        master; archived ones are left alone, rescoring would bring them back.
+        prefork_workers: the server's worker count, read from the configuration
+        when not given; callers running outside the server pass 0.
+        Returns {'scored': n, 'workers': processes_used}.
+        """
+        self.ensure_one()
+        if appraisals is None:
+            appraisals = self.env['hr.appraisal'].search([('result_id.master_id', '=', self.id)])
+        if not appraisals:
+            return {'scored': 0, 'workers': 0}
+
+        plan = self._get_scoring_plan()
+        jobs = self._get_scoring_jobs(appraisals)
+        if prefork_workers is None:
+            prefork_workers = config.get('workers') or 0
+        results, used = scoring_pool.run_scoring(
+            plan, jobs, workers=self._get_scoring_workers(workers), chunk_size=chunk_size,
+            prefork_workers=prefork_workers)
+        scored = self.env['oh.appraisal.result']._store_computed_results(self, appraisals, dict(results))
+        _logger.info("Rescored %s appraisals of master %s with %s process(es)", scored, self.id, used)
+        return {'scored': scored, 'workers': used}
+
+    # ------------- Re-weighting stored results --------------
+    def _reweight_results(self, only_stale=True):
+        """
+        Recompute final_percentage and rating_label of this master's stored results
+        from their category scores and the current weightages, without re-scoring
+        any answer. One UPDATE per master does the arithmetic and the label lookup,
+        a second one mirrors the values to the linked appraisals.
+
+        only_stale: skip results already computed with the current config_version.
+        Returns the number of results updated.
+        """
+        Result = self.env['oh.appraisal.result']
+        Result.flush_model()
+        self.env['hr.appraisal'].flush_model(['result_id', 'final_percentage', 'final_rating', 'final_result_json'])
+        self.flush_recordset()
+        updated = 0
+        for master in self:
+            scoring = master._get_scoring_scale()
+            params = {
+                'master_id': master.id,
+                'version': master.config_version,
+                'only_stale': bool(only_stale),
+                # fractions, multiplied in the same order as scoring_kernel.score_plan
+                'wf': (master.weight_functional or 0.0) / 100.0,
+                'wr': (master.weight_role or 0.0) / 100.0,
+                'wc': (master.weight_common or 0.0) / 100.0,
+                'scoring_id': scoring.id or None,
+                'scale_min': scoring.scale_min if scoring else 0.0,
+                'scale_max': scoring.scale_max if scoring else 0.0,
+            }
+            params['version_id'] = master._get_current_version().id
+            label_sql = SCALE_LABEL_SQL if scoring else FALLBACK_LABEL_SQL
+            # same float arithmetic as scoring_kernel._final_label; bands are matched on the unrounded value
+            raw_sql = "(s.pct / 100.0::float8) * (%(scale_max)s::float8 - %(scale_min)s::float8) + %(scale_min)s::float8" \
+                if scoring else "NULL::float"
+            self.env.cr.execute("""
+                WITH candidates AS (
+                    -- (appraisal, version) is unique: move only the latest result of an
+                    -- appraisal to the current version, and none when it already has one
+                    SELECT DISTINCT ON (COALESCE(r.appraisal_id, -r.id)) r.*
+                      FROM oh_appraisal_result r
+                     WHERE r.master_id = %(master_id)s
+                       AND (NOT %(only_stale)s OR r.config_version IS DISTINCT FROM %(version)s)
+                       AND NOT EXISTS (SELECT 1 FROM oh_appraisal_result o
+                                        WHERE o.appraisal_id = r.appraisal_id
+                                          AND o.version_id = %(version_id)s
+                                          AND o.id <> r.id)
+                  ORDER BY COALESCE(r.appraisal_id, -r.id), r.id DESC
+                ), scored AS (
+                    SELECT id,
+                           ROUND((COALESCE(functional_score, 0)::float8 * %(wf)s::float8
+                                + COALESCE(role_score, 0)::float8 * %(wr)s::float8
+                                + COALESCE(common_score, 0)::float8 * %(wc)s::float8)::numeric, 2)::float AS pct
+                      FROM candidates
+                ), ranged AS (
+                    SELECT s.id, s.pct, """ + raw_sql + """ AS raw
+                      FROM scored s
+                ), labelled AS (
+                    SELECT s.id, s.pct, s.raw, """ + label_sql + """ AS label
+                      FROM ranged s
+                )
+                UPDATE oh_appraisal_result r
+                   SET final_percentage = l.pct,
+                       rating_label = l.label,
+                       config_version = %(version)s,
+                       version_id = %(version_id)s,
+                       -- only the category weights were re-applied: the next close-out must rescore
+                       answers_hash = NULL,
+                       calibrated_label = NULL,
+                       calibration_run_id = NULL,
+                       uncalibrated_label = NULL,
+                       -- weights now come from the version, drop any embedded copy
+                       data_json = CASE WHEN r.data_json IS NULL OR r.data_json = '' THEN r.data_json
+                                        ELSE ((r.data_json::jsonb - 'weights') || jsonb_build_object(
+                                                'final_percentage', l.pct,
+                                                'final_raw_on_scale', ROUND(l.raw::numeric, 4)::float,
+                                                'rating_label', l.label,
+                                                'config_version', %(version)s))::text END
+                  FROM labelled l
+                 WHERE r.id = l.id
+             RETURNING r.id, r.company_id
+            """, params)
+            rows = self.env.cr.fetchall()
+            result_ids = [row[0] for row in rows]
+            if not result_ids:
+                continue
+            self.env.cr.execute("""
+                UPDATE hr_appraisal a
+                   SET final_percentage = r.final_percentage,
+                       final_rating = r.rating_label,
+                       final_result_json = r.data_json
+                  FROM oh_appraisal_result r
+                 WHERE a.result_id = r.id
+                   AND r.id IN %s
+            """, (tuple(result_ids),))
+            updated += len(result_ids)
+            self.env['oh.appraisal.distribution']._queue_refresh({row[1] for row in rows})
+            _logger.info("Re-weighted %s results of master %s (config version %s)",
+                         len(result_ids), master.id, master.config_version)
+        Result.invalidate_model(['final_percentage', 'rating_label', 'config_version', 'version_id', 'data_json',
+                                 'answers_hash', 'calibrated_label', 'calibration_run_id', 'uncalibrated_label'])
+        self.env['hr.appraisal'].invalidate_model(['final_percentage', 'final_rating', 'final_result_json'])
+        return updated
+
+    def action_reweight_results(self):
+        count = self._reweight_results()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Results re-weighted"),
+                'message': _("%s stored results were updated to the current weightages.") % count,
+                'type': 'success',
+                'sticky': False,
+            },
         }
 
     def action_run_simulation(self, employee_id=None, answers_by_item=None):
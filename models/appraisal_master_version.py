@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+
+from psycopg2 import IntegrityError
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class OHAppraisalMasterVersion(models.Model):
+    _name = 'oh.appraisal.master.version'
+    _description = 'Appraisal Master Configuration Version'
+    _order = 'master_id, version_number desc'
+    _rec_name = 'display_label'
+
+    master_id = fields.Many2one('oh.appraisal.master', string='Master', required=True, ondelete='cascade', index=True)
+    version_number = fields.Integer(string='Version', required=True, readonly=True)
+    config_hash = fields.Char(string='Configuration Hash', required=True, readonly=True, index=True,
+                              help="SHA-256 of the canonical configuration JSON (weights, template lines, scoring bands, framework weights).")
+    config_json = fields.Text(string='Configuration', readonly=True)
+    display_label = fields.Char(compute='_compute_display_label')
+
+    _sql_constraints = [
+        ('master_hash_uniq', 'unique(master_id, config_hash)', 'This configuration is already recorded for the master.'),
+        ('master_number_uniq', 'unique(master_id, version_number)', 'Version numbers must be unique per master.'),
+    ]
+
+    @api.depends('master_id', 'version_number', 'config_hash')
+    def _compute_display_label(self):
+        for rec in self:
+            rec.display_label = "%s v%s (%s)" % (rec.master_id.name or '', rec.version_number, (rec.config_hash or '')[:8])
+
+    def write(self, vals):
+        raise UserError(_("Master configuration versions are immutable."))
+
+    @api.model
+    def _hash_config(self, config):
+        canonical = json.dumps(config, sort_keys=True, separators=(',', ':'))
+        return canonical, hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @api.model
+    def _get_or_create(self, master, config):
+        """
+        Version of ``master`` matching ``config``, created when the configuration
+        has not been seen before. Identical configurations share one version.
+        """
+        canonical, digest = self._hash_config(config)
+        Version = self.sudo()
+        version = Version.search([('master_id', '=', master.id), ('config_hash', '=', digest)], limit=1)
+        if version:
+            return version
+        last = Version.search([('master_id', '=', master.id)], order='version_number desc', limit=1)
+        try:
+            with self.env.cr.savepoint():
+                version = Version.create({
+                    'master_id': master.id,
+                    'version_number': (last.version_number or 0) + 1,
+                    'config_hash': digest,
+                    'config_json': canonical,
+                })
+        except IntegrityError:
+            # another transaction recorded the same configuration first
+            version = Version.search([('master_id', '=', master.id), ('config_hash', '=', digest)], limit=1)
+            if not version:
+                raise
+        _logger.info("Recorded configuration version %s for master %s", version.version_number, master.id)
+        return version
+
+    def get_config(self):
+        self.ensure_one()
+        return json.loads(self.config_json or '{}')
@@ -1,6 +1,20 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models
+from odoo import api, fields, models, tools
+from odoo.osv import expression
+from psycopg2.extras import execute_values
+import hashlib
 import json
+import logging
+from .perf_sample import perf_stage
+_logger = logging.getLogger(__name__)
+
+# Parts of a computation that describe the configuration rather than the employee;
+# they live on the configuration version and are dropped from data_json.
+RESULT_CONFIG_KEYS = ('weights', 'explanation')
+ITEM_CONFIG_KEYS = ('name', 'max', 'weight', 'template_id')
+RESULT_CATEGORIES = (('functional', 'department'), ('role', 'role'), ('common', 'common'))
+# First key of the two-key advisory locks taken per appraisal while its result is computed
+RESULT_LOCK_NAMESPACE = 0x4F48
 
 class OHAppraisalResult(models.Model):
     _name = 'oh.appraisal.result'
@@ -9,8 +23,15 @@ class OHAppraisalResult(models.Model):
 
     name = fields.Char(string='Reference', required=True, copy=False, help="Generated reference for audit.")
     appraisal_id = fields.Many2one('hr.appraisal', string='Appraisal', ondelete='cascade')
+    current_appraisal_ids = fields.One2many('hr.appraisal', 'result_id', string='Current Result Of', readonly=True,
+                                            help="The appraisal this is the current result of; empty for older "
+                                                 "or superseded results.")
     employee_id = fields.Many2one('hr.employee', string='Employee', required=True, ondelete='cascade')
     master_id = fields.Many2one('oh.appraisal.master', string='Master')
+    version_id = fields.Many2one('oh.appraisal.master.version', string='Configuration Version', readonly=True,
+                                 ondelete='set null', index=True,
+                                 help="Immutable snapshot of the master configuration this result was computed with. "
+                                      "Emptied when the master, and with it its versions, is deleted.")
     date = fields.Datetime(default=lambda self: fields.Datetime.now())
     data_json = fields.Text(string='Result JSON', help='Raw result JSON for audit')
     functional_score = fields.Float(string='Functional (0..100)', digits=(6,2))
@@ -21,18 +42,117 @@ class OHAppraisalResult(models.Model):
     notes = fields.Text(string='Manager Notes / Improvement Plan')
     state = fields.Selection([('draft','Draft'),('confirmed','Confirmed')], default='draft')
     company_id = fields.Many2one('res.company', default=lambda self: self.env.company, required=True)
+    config_version = fields.Integer(string='Master Config Version', readonly=True,
+                                    help="config_version of the master when this result was last computed or re-weighted. "
+                                         "The counter moves on every configuration change, while the Configuration "
+                                         "Version is shared by all the counter values with identical content, so "
+                                         "reverting a change brings back the same version.")
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True, index=True,
+                                    help="Department of the employee when the result was computed.")
+    department_percentile = fields.Float(string='Department Percentile', digits=(5,2), readonly=True, copy=False,
+                                         aggregator='avg',
+                                         help="Share of the department's confirmed results of the cycle scoring lower (0..100).")
+    company_percentile = fields.Float(string='Company Percentile', digits=(5,2), readonly=True, copy=False,
+                                      aggregator='avg',
+                                      help="Share of the company's confirmed results of the cycle scoring lower (0..100).")
+    percentile_date = fields.Datetime(string='Percentiles Updated', readonly=True, copy=False)
+    calibrated_label = fields.Char(string='Calibrated Rating', readonly=True, copy=False,
+                                   help="Label assigned by the last forced-distribution calibration run.")
+    calibration_run_id = fields.Many2one('oh.appraisal.calibration.run', string='Calibration Run', readonly=True,
+                                         copy=False, ondelete='set null', index='btree_not_null')
+    uncalibrated_label = fields.Char(string='Rating Before Calibration', readonly=True, copy=False)
+    answers_hash = fields.Char(string='Answers Hash', readonly=True, copy=False,
+                               help="Hash of the answers and templates this result was scored from; "
+                                    "a close-out with the same hash and version does not score again.")
 
-    @api.model
-    def create_result(self, master, appraisal, employee, computation_result, notes=''):
+    def init(self):
         """
-        Persist computation_result (the dict returned by compute_employee_score) as a result record.
+        Indexes for the current-period lists and per-employee lookups, and one
+        result per (appraisal, configuration version). Duplicates left by
+        earlier close-outs are removed first, keeping the one the appraisal
+        points at, else the newest.
         """
-        vals = {
+        cr = self.env.cr
+        tools.create_index(cr, 'oh_appraisal_result_company_employee_date_idx',
+                           self._table, ['company_id', 'employee_id', 'date'])
+        # matches _order, so recent pages are read from the index instead of sorting the history
+        tools.create_index(cr, 'oh_appraisal_result_date_id_idx', self._table, ['date DESC', 'id DESC'])
+        cr.execute("""
+            UPDATE oh_appraisal_result r
+               SET department_id = e.department_id
+              FROM hr_employee e
+             WHERE e.id = r.employee_id
+               AND r.department_id IS NULL
+               AND e.department_id IS NOT NULL
+        """)
+        cr.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'oh_appraisal_result_appraisal_version_uniq'")
+        if cr.fetchone():
+            return
+        cr.execute("""
+            WITH ranked AS (
+                SELECT r.id,
+                       row_number() OVER (PARTITION BY r.appraisal_id, r.version_id
+                                          ORDER BY (a.id IS NOT NULL) DESC, r.id DESC) AS rank
+                  FROM oh_appraisal_result r
+             LEFT JOIN hr_appraisal a ON a.result_id = r.id
+                 WHERE r.appraisal_id IS NOT NULL AND r.version_id IS NOT NULL
+            )
+            DELETE FROM oh_appraisal_result WHERE id IN (SELECT id FROM ranked WHERE rank > 1)
+        """)
+        if cr.rowcount:
+            _logger.info("Removed %s duplicate appraisal results before adding the unique index", cr.rowcount)
+        cr.execute("""
+            CREATE UNIQUE INDEX oh_appraisal_result_appraisal_version_uniq
+                ON oh_appraisal_result (appraisal_id, version_id)
+             WHERE appraisal_id IS NOT NULL AND version_id IS NOT NULL
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        results = super().create(vals_list)
+        confirmed = results.filtered(lambda r: r.state == 'confirmed')
+        if confirmed:
+            self.env['oh.appraisal.distribution']._queue_refresh(confirmed.company_id.ids)
+        return results
+
+    def write(self, vals):
+        # companies before and after, so a result moving away is re-ranked on both sides
+        companies = self.company_id
+        res = super().write(vals)
+        if {'state', 'final_percentage', 'company_id', 'department_id', 'date'} & set(vals):
+            self.env['oh.appraisal.distribution']._queue_refresh((companies | self.company_id).ids)
+        return res
+
+    @api.model
+    def _compact_computation(self, computation_result):
+        """computation_result without the configuration parts stored on the version."""
+        data = {k: v for k, v in computation_result.items() if k not in RESULT_CONFIG_KEYS}
+        for category, _selection in RESULT_CATEGORIES:
+            if not isinstance(data.get(category), dict):
+                continue
+            cat_data = dict(data[category])
+            cat_data['items'] = {
+                code: {k: v for k, v in item.items() if k not in ITEM_CONFIG_KEYS}
+                for code, item in (cat_data.get('items') or {}).items()
+            }
+            data[category] = cat_data
+        return data
+
+    @api.model
+    def _prepare_result_vals(self, master, appraisal, employee, computation_result, notes='', version=None):
+        """Values for a result record built from a compute_employee_score dict."""
+        if version is None:
+            version = master._get_current_version() if master else self.env['oh.appraisal.master.version']
+        data = self._compact_computation(computation_result) if version else computation_result
+        return {
             'name': f"AR-{employee.id}-{fields.Date.today()}",
             'appraisal_id': appraisal.id if appraisal else False,
             'employee_id': employee.id,
+            'department_id': employee.department_id.id,
             'master_id': master.id if master else False,
-            'data_json': json.dumps(computation_result),
+            'config_version': master.config_version if master else 0,
+            'version_id': version.id if version else False,
+            'data_json': json.dumps(data),
             'functional_score': round((computation_result.get('functional', {}).get('percent', 0.0) or 0.0), 2),
             'role_score': round((computation_result.get('role', {}).get('percent', 0.0) or 0.0), 2),
             'common_score': round((computation_result.get('common', {}).get('percent', 0.0) or 0.0), 2),
@@ -40,6 +160,304 @@ class OHAppraisalResult(models.Model):
             'company_id': appraisal.company_id.id if appraisal and appraisal.company_id else self.env.company.id,
             'notes': notes,
             'state': 'confirmed',
-            'rating_label': computation_result.get('rating_label') or ''
+            'rating_label': computation_result.get('rating_label') or '',
+            # a fresh label supersedes any calibration of the previous one
+            'calibrated_label': False,
+            'calibration_run_id': False,
+            'uncalibrated_label': False,
         }
-        return self.create(vals)
+
+    @api.model
+    @perf_stage('result_persistence')
+    def create_result(self, master, appraisal, employee, computation_result, notes=''):
+        """
+        Persist computation_result (the dict returned by compute_employee_score) as a result record.
+        """
+        return self.create(self._prepare_result_vals(master, appraisal, employee, computation_result, notes=notes))
+
+    @api.model
+    @perf_stage('result_persistence')
+    def create_results(self, entries):
+        """
+        Batch variant of create_result: ``entries`` is a list of
+        (master, appraisal, employee, computation_result, notes) tuples.
+        Returns the created records in the same order.
+        """
+        versions = {}
+        vals_list = []
+        for master, appraisal, employee, computation_result, notes in entries:
+            if master.id not in versions:
+                versions[master.id] = master._get_current_version() if master else None
+            vals_list.append(self._prepare_result_vals(
+                master, appraisal, employee, computation_result, notes, version=versions[master.id]))
+        return self.create(vals_list) if vals_list else self.browse()
+
+    @api.model
+    def _lock_appraisals(self, appraisal_ids):
+        """
+        Take transaction-scoped advisory locks on the given appraisals, in id
+        order so overlapping batches closed concurrently wait for each other
+        instead of deadlocking. The locks are released at commit or rollback.
+        """
+        if not appraisal_ids:
+            return
+        self.env.cr.execute("""
+            SELECT pg_advisory_xact_lock(%s, s.id)
+              FROM (SELECT DISTINCT unnest(%s::int[]) AS id ORDER BY 1) s
+        """, (RESULT_LOCK_NAMESPACE, list(appraisal_ids)))
+
+    @api.model
+    def _answers_hash(self, answers, route):
+        """Stable hash of the answers and template route a result is scored from."""
+        canonical = json.dumps({'answers': answers, 'route': route}, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @api.model
+    def _get_existing_results(self, appraisals, version):
+        """{appraisal_id: result} of the results stored for ``appraisals`` with ``version``."""
+        if not appraisals or not version:
+            return {}
+        results = self.search([('appraisal_id', 'in', appraisals.ids), ('version_id', '=', version.id)])
+        return {rec.appraisal_id.id: rec for rec in results}
+
+    @api.model
+    @perf_stage('result_persistence')
+    def upsert_results(self, entries):
+        """
+        Store ``entries`` ((master, appraisal, employee, computation_result, notes,
+        answers_hash) tuples) keeping one result per (appraisal, configuration
+        version): a stored result is updated in place, the others are created in
+        one create() call. Returns the results in entry order.
+
+        Callers that may run concurrently should hold _lock_appraisals() first.
+        """
+        versions = {}
+        vals_list = []
+        for master, appraisal, employee, computation_result, notes, answers_hash in entries:
+            if master.id not in versions:
+                versions[master.id] = master._get_current_version() if master else None
+            vals = self._prepare_result_vals(
+                master, appraisal, employee, computation_result, notes, version=versions[master.id])
+            vals['answers_hash'] = answers_hash
+            vals_list.append(vals)
+
+        existing = {}
+        keyed = [vals for vals in vals_list if vals['appraisal_id'] and vals['version_id']]
+        if keyed:
+            stored = self.search([
+                ('appraisal_id', 'in', list({vals['appraisal_id'] for vals in keyed})),
+                ('version_id', 'in', list({vals['version_id'] for vals in keyed})),
+            ])
+            existing = {(rec.appraisal_id.id, rec.version_id.id): rec for rec in stored}
+
+        result_ids = []
+        to_create = {}
+        for vals in vals_list:
+            if vals['appraisal_id'] and vals['version_id']:
+                key = (vals['appraisal_id'], vals['version_id'])
+            else:
+                key = ('new', len(result_ids))
+            rec = existing.get(key)
+            if rec:
+                # keep the reference of the stored result
+                rec.write({k: v for k, v in vals.items() if k != 'name'})
+                result_ids.append(rec.id)
+            else:
+                # the same appraisal twice in one batch: the last computation wins
+                to_create[key] = vals
+                result_ids.append(key)
+        created = dict(zip(to_create, self.create(list(to_create.values())).ids))
+        return self.browse([created.get(item, item) for item in result_ids])
+
+    def _link_to_appraisals(self):
+        """Point each result's appraisal at it and mirror the final figures."""
+        for result in self:
+            result.appraisal_id.write({
+                'result_id': result.id,
+                'is_result_computed': True,
+                'final_percentage': result.final_percentage,
+                'final_rating': result.rating_label,
+                'final_result_json': result.data_json,
+            })
+        # the result they replace leaves the ranked population
+        self.env['oh.appraisal.distribution']._queue_refresh(self.company_id.ids)
+
+    @api.model
+    def _store_computed_results(self, master, appraisals, computations, batch_size=1000):
+        """
+        Write back compact computations {appraisal_id: computation} (as returned
+        by scoring_kernel.score_plan) for ``appraisals``. Existing results are
+        updated with one UPDATE ... FROM (VALUES ...) per batch and mirrored to
+        their appraisals in SQL; appraisals without a result get one through
+        upsert_results(). Returns the number of results written.
+        """
+        version = master._get_current_version()
+        existing = self._get_existing_results(appraisals, version)
+        updates = []
+        entries = []
+        for app in appraisals:
+            comp = computations.get(app.id)
+            if comp is None:
+                continue
+            # the result of the current version if there is one, so (appraisal, version) stays unique
+            target = existing.get(app.id) or app.result_id
+            if target:
+                vals = self._prepare_result_vals(master, app, app.employee_id, comp, version=version)
+                updates.append((
+                    target.id, vals['functional_score'], vals['role_score'], vals['common_score'],
+                    vals['final_percentage'], vals['rating_label'], vals['data_json'],
+                ))
+            else:
+                entries.append((master, app, app.employee_id, comp, app.final_interview or '', None))
+
+        self.flush_model()
+        self.env['hr.appraisal'].flush_model(['result_id', 'is_result_computed', 'final_percentage',
+                                              'final_rating', 'final_result_json'])
+        cr = self.env.cr
+        for start in range(0, len(updates), batch_size):
+            batch = updates[start:start + batch_size]
+            execute_values(cr, """
+                UPDATE oh_appraisal_result r
+                   SET functional_score = v.functional_score,
+                       role_score = v.role_score,
+                       common_score = v.common_score,
+                       final_percentage = v.final_percentage,
+                       rating_label = v.rating_label,
+                       data_json = v.data_json,
+                       master_id = %s,
+                       version_id = %s,
+                       config_version = %s,
+                       answers_hash = NULL,
+                       calibrated_label = NULL,
+                       calibration_run_id = NULL,
+                       uncalibrated_label = NULL,
+                       write_uid = %s,
+                       write_date = (now() at time zone 'UTC')
+                  FROM (VALUES %%s) AS v(id, functional_score, role_score, common_score,
+                                         final_percentage, rating_label, data_json)
+                 WHERE r.id = v.id
+            """ % (int(master.id), int(version.id), int(master.config_version or 0), int(self.env.uid)),
+                batch, template="(%s, %s::float8, %s::float8, %s::float8, %s::float8, %s, %s)")
+            cr.execute("""
+                UPDATE hr_appraisal a
+                   SET result_id = r.id,
+                       final_percentage = r.final_percentage,
+                       final_rating = r.rating_label,
+                       final_result_json = r.data_json,
+                       is_result_computed = TRUE
+                  FROM oh_appraisal_result r
+                 WHERE a.id = r.appraisal_id
+                   AND r.id IN %s
+            """, (tuple(row[0] for row in batch),))
+        if updates:
+            self.invalidate_model()
+            self.env['hr.appraisal'].invalidate_model(['result_id', 'is_result_computed', 'final_percentage',
+                                                       'final_rating', 'final_result_json'])
+        if updates:
+            self.env['oh.appraisal.distribution']._queue_refresh(appraisals.company_id.ids)
+        if entries:
+            self.upsert_results(entries)._link_to_appraisals()
+        return len(updates) + len(entries)
+
+    def get_full_result(self):
+        """
+        The complete computation dict: data_json merged with the weights and item
+        metadata of the configuration version. Results stored before versions
+        existed already embed everything and are returned as is.
+        """
+        self.ensure_one()
+        try:
+            data = json.loads(self.data_json or '{}')
+        except ValueError:
+            return {}
+        if not self.version_id:
+            return data
+        return self._merge_version_config(data, self.version_id.get_config())
+
+    @api.model
+    def _merge_version_config(self, data, config):
+        """Fill a decoded data_json in place with the weights and item metadata of a version config."""
+        data.setdefault('weights', config.get('weights'))
+        templates = config.get('templates') or {}
+        selection = data.get('templates') or {}
+        for category, selection_key in RESULT_CATEGORIES:
+            template_ids = selection.get(selection_key)
+            if not isinstance(template_ids, list):
+                template_ids = [template_ids] if template_ids else []
+            lines = {}
+            for template_id in template_ids:
+                lines.update((templates.get(str(template_id)) or {}).get('lines') or {})
+            for code, item in ((data.get(category) or {}).get('items') or {}).items():
+                meta = lines.get(code)
+                if meta:
+                    item.setdefault('name', meta.get('name'))
+                    item.setdefault('max', meta.get('max_score'))
+                    item.setdefault('weight', meta.get('weight'))
+                    item.setdefault('template_id', meta.get('template_id'))
+        return data
+
+    # ------------- Streaming iteration --------------
+    @api.model
+    def _iter_chunks(self, domain, fnames, chunk_size=1000):
+        """
+        Yield the results matching ``domain`` as recordsets of at most
+        ``chunk_size`` records, walking the table by id (keyset pagination).
+        The cache is cleared between chunks, so memory does not grow with
+        the number of rows.
+        """
+        last_id = 0
+        while True:
+            chunk = self.search_fetch(
+                expression.AND([domain, [('id', '>', last_id)]]), fnames, order='id', limit=chunk_size)
+            if not chunk:
+                return
+            last_id = chunk[-1].id
+            yield chunk
+            self.env.invalidate_all()
+
+    @api.model
+    def iter_export_rows(self, domain, with_breakdown=False, chunk_size=1000):
+        """
+        Yield one plain dict per result matching ``domain``, chunk by chunk.
+        data_json is only decoded when ``with_breakdown`` is set; the row then
+        gets a 'breakdown' entry {category: {item_code: item}} completed from the
+        configuration version, whose decoded config is kept once per version.
+        """
+        fnames = ['name', 'employee_id', 'company_id', 'master_id', 'version_id', 'date',
+                  'functional_score', 'role_score', 'common_score', 'final_percentage',
+                  'rating_label', 'state']
+        if with_breakdown:
+            fnames.append('data_json')
+        configs = {}
+        for chunk in self._iter_chunks(domain, fnames, chunk_size=chunk_size):
+            for rec in chunk:
+                row = {
+                    'id': rec.id,
+                    'reference': rec.name,
+                    'employee': rec.employee_id.name,
+                    'company': rec.company_id.name,
+                    'master': rec.master_id.name or '',
+                    'version': rec.version_id.version_number or '',
+                    'date': fields.Datetime.to_string(rec.date) if rec.date else '',
+                    'functional_score': rec.functional_score,
+                    'role_score': rec.role_score,
+                    'common_score': rec.common_score,
+                    'final_percentage': rec.final_percentage,
+                    'rating_label': rec.rating_label or '',
+                    'state': rec.state,
+                }
+                if with_breakdown:
+                    try:
+                        data = json.loads(rec.data_json or '{}')
+                    except ValueError:
+                        data = {}
+                    version_id = rec.version_id.id
+                    if version_id:
+                        if version_id not in configs:
+                            configs[version_id] = rec.version_id.get_config()
+                        data = self._merge_version_config(data, configs[version_id])
+                    row['breakdown'] = {
+                        category: (data.get(category) or {}).get('items') or {}
+                        for category, _selection in RESULT_CATEGORIES
+                    }
+                yield row
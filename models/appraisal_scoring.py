@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
+from .perf_sample import perf_stage
 
 class OHAppraisalScoring(models.Model):
     _name = 'oh.appraisal.scoring'
@@ -26,6 +27,25 @@ class OHAppraisalScoring(models.Model):
         help="Define ranges on the scoring scale and corresponding human-readable labels (e.g. 4.5-5 => 'Outstanding')."
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        # a new scale may become the first one, used by masters without a scale
+        self.env['oh.appraisal.master']._masters_using(scorings=records)._bump_config_version()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'scale_min', 'scale_max', 'rating_line_ids'} & set(vals):
+            self.env['oh.appraisal.master']._masters_using(scorings=self)._bump_config_version()
+        return res
+
+    def unlink(self):
+        masters = self.env['oh.appraisal.master']._masters_using(scorings=self)
+        res = super().unlink()
+        masters._bump_config_version()
+        return res
+
     @api.constrains('scale_min', 'scale_max')
     def _check_scale(self):
         for rec in self:
@@ -45,6 +65,7 @@ class OHAppraisalScoring(models.Model):
         v = max(self.scale_min, min(v, self.scale_max))
         return ((v - self.scale_min) / denom) * 100.0
 
+    @perf_stage('label_lookup')
     def to_label(self, raw_value):
         """
         Map a raw numeric value (on this scoring scale) to a rating label by
@@ -81,6 +102,24 @@ class OHAppraisalScoringLine(models.Model):
     max_value = fields.Float(string="Max value", required=True, help="Upper bound (inclusive) on the scoring scale.")
     label = fields.Char(string="Label", required=True, help="Label returned when raw value falls into the defined range.")
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['oh.appraisal.master']._masters_using(scorings=records.scoring_id)._bump_config_version()
+        return records
+
+    def write(self, vals):
+        scorings = self.scoring_id
+        res = super().write(vals)
+        self.env['oh.appraisal.master']._masters_using(scorings=scorings | self.scoring_id)._bump_config_version()
+        return res
+
+    def unlink(self):
+        masters = self.env['oh.appraisal.master']._masters_using(scorings=self.scoring_id)
+        res = super().unlink()
+        masters._bump_config_version()
+        return res
+
     @api.constrains('min_value', 'max_value')
     def _check_value_range(self):
         for rec in self:
@@ -26,6 +26,15 @@ class OHAppraisalTemplate(models.Model):
     description = fields.Text("Description")
 
     line_ids = fields.One2many('oh.appraisal.template.line', 'template_id', 'Lines')
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'department_id' in vals:
+            # department coverage is part of the cached master resolution
+            self.env.registry.clear_cache()
+        if {'name', 'template_type', 'department_id', 'job_id'} & set(vals):
+            self.env['oh.appraisal.master']._masters_using(templates=self)._bump_config_version()
+        return res
     
     @api.onchange('template_type')
     def _onchange_template_type(self):
@@ -53,4 +62,33 @@ class OHAppraisalTemplateLine(models.Model):
     code = fields.Char('Code')
     max_score = fields.Float('Max Score', default=5.0)
     weight = fields.Float('Weight', default=1.0)
-    description = fields.Text("Description")
\ No newline at end of file
+    description = fields.Text("Description")
+
+    def _get_item_code(self):
+        """Code answers and scores are keyed by: the line code, else its name, else its id."""
+        self.ensure_one()
+        return (self.code or self.name or '').strip() or str(self.id)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['oh.appraisal.question.binding'].generate_bindings(lines=lines)
+        self.env['oh.appraisal.master']._masters_using(templates=lines.template_id)._bump_config_version()
+        return lines
+
+    def write(self, vals):
+        templates = self.template_id
+        res = super().write(vals)
+        if 'code' in vals or 'name' in vals:
+            self.env['oh.appraisal.question.binding'].generate_bindings(lines=self)
+        # defer_config_bump: the caller bumps the masters once after a batch of writes
+        if {'code', 'name', 'weight', 'max_score', 'template_id'} & set(vals) \
+                and not self.env.context.get('defer_config_bump'):
+            self.env['oh.appraisal.master']._masters_using(templates=templates | self.template_id)._bump_config_version()
+        return res
+
+    def unlink(self):
+        masters = self.env['oh.appraisal.master']._masters_using(templates=self.template_id)
+        res = super().unlink()
+        masters._bump_config_version()
+        return res
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import time
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import float_compare
+
+from ..lib import calibration
+
+_logger = logging.getLogger(__name__)
+
+# Original label of a calibrated result, as long as its label is still the calibrated one
+RESTORE_LABEL_SQL = """
+    CASE WHEN uncalibrated_label IS NOT NULL AND rating_label IS NOT DISTINCT FROM calibrated_label
+         THEN uncalibrated_label ELSE rating_label END
+"""
+
+TIE_BREAK_ORDERS = {
+    'functional_role_common': ('functional', 'role', 'common'),
+    'role_functional_common': ('role', 'functional', 'common'),
+    'common_functional_role': ('common', 'functional', 'role'),
+    'none': (),
+}
+
+
+class OHAppraisalCalibrationRun(models.Model):
+    _name = 'oh.appraisal.calibration.run'
+    _description = 'Forced Distribution Calibration Run'
+    _order = 'id desc'
+
+    name = fields.Char(string='Name', required=True, default=lambda self: _("Calibration %s") % fields.Date.today())
+    scoring_id = fields.Many2one('oh.appraisal.scoring', string='Scoring Scale', required=True,
+                                 help="Its rating labels are the bands the results are distributed over.")
+    company_id = fields.Many2one('res.company', string='Company', required=True, default=lambda self: self.env.company)
+    scope = fields.Selection([
+        ('department', 'Per Department'),
+        ('company', 'Whole Company'),
+    ], string='Population', required=True, default='department',
+        help="Quotas are applied to each department separately, or to the company as a whole.")
+    date_from = fields.Date(string='From', required=True,
+                            default=lambda self: self.env['oh.appraisal.distribution']._cycle_bounds()[0])
+    date_to = fields.Date(string='To', required=True, default=fields.Date.context_today)
+    tie_break = fields.Selection([
+        ('functional_role_common', 'Functional, then Role, then Common'),
+        ('role_functional_common', 'Role, then Functional, then Common'),
+        ('common_functional_role', 'Common, then Functional, then Role'),
+        ('none', 'No tie-break (oldest result first)'),
+    ], string='Tie-break', required=True, default='functional_role_common',
+        help="Category scores compared between results with the same final percentage.")
+    update_rating = fields.Boolean(string='Finalize Ratings', default=False,
+                                   help="Also replace the rating label of the results and appraisals. "
+                                        "The original label is kept and restored by Reset.")
+    quota_ids = fields.One2many('oh.appraisal.calibration.quota', 'run_id', string='Band Quotas', copy=True)
+    state = fields.Selection([('draft', 'Draft'), ('done', 'Applied')], default='draft', required=True, readonly=True)
+    population = fields.Integer(string='Results Calibrated', readonly=True)
+    group_count = fields.Integer(string='Populations', readonly=True)
+    duration_ms = fields.Float(string='Compute Time (ms)', digits=(12, 1), readonly=True)
+    summary_json = fields.Text(string='Band Counts (JSON)', readonly=True,
+                               help="{population key: {label: results}} of the last application.")
+    applied_on = fields.Datetime(string='Applied On', readonly=True)
+
+    @api.constrains('quota_ids')
+    def _check_quotas(self):
+        for rec in self:
+            if not rec.quota_ids:
+                continue
+            if any(q.quota_percent < 0 for q in rec.quota_ids):
+                raise ValidationError(_("Band quotas cannot be negative."))
+            if float_compare(sum(rec.quota_ids.mapped('quota_percent')), 100.0, precision_digits=2) != 0:
+                raise ValidationError(_("The band quotas of %s must add up to 100%%.") % rec.name)
+
+    @api.onchange('scoring_id')
+    def _onchange_scoring_id(self):
+        if self.scoring_id and not self.quota_ids:
+            self.quota_ids = [(0, 0, vals) for vals in self._default_quota_vals(self.scoring_id)]
+
+    @api.model
+    def _default_quota_vals(self, scoring):
+        """One band per rating label, best first, sharing 100% evenly."""
+        lines = scoring.rating_line_ids.sorted(key=lambda ln: ln.max_value, reverse=True)
+        if not lines:
+            return []
+        share = round(100.0 / len(lines), 2)
+        vals = [{'sequence': index, 'label': ln.label, 'quota_percent': share} for index, ln in enumerate(lines)]
+        vals[-1]['quota_percent'] = round(100.0 - share * (len(lines) - 1), 2)
+        return vals
+
+    def _get_domain(self):
+        self.ensure_one()
+        return [
+            ('company_id', '=', self.company_id.id),
+            ('state', '=', 'confirmed'),
+            ('current_appraisal_ids', '!=', False),
+            ('date', '>=', fields.Datetime.to_string(self.date_from)),
+            ('date', '<', fields.Datetime.to_string(fields.Date.add(self.date_to, days=1))),
+        ]
+
+    def _fetch_rows(self):
+        """(id, population key, final, functional, role, common) of the results in scope, in one query."""
+        Result = self.env['oh.appraisal.result']
+        query = Result._search(self._get_domain())
+        group_sql = 'COALESCE("oh_appraisal_result"."department_id", 0)' if self.scope == 'department' else '0'
+        self.env.cr.execute(query.select(
+            '"oh_appraisal_result"."id"', group_sql,
+            '"oh_appraisal_result"."final_percentage"', '"oh_appraisal_result"."functional_score"',
+            '"oh_appraisal_result"."role_score"', '"oh_appraisal_result"."common_score"'))
+        return self.env.cr.fetchall()
+
+    def action_apply(self):
+        """
+        Rank every population of the run, cut it into the band quotas and store
+        the calibrated labels with one UPDATE per label.
+        """
+        for run in self:
+            if not run.quota_ids:
+                raise UserError(_("Define the band quotas of %s first.") % run.name)
+            bands = tuple((q.label, q.quota_percent) for q in run.quota_ids.sorted('sequence'))
+            self.env['oh.appraisal.result'].flush_model()
+            rows = run._fetch_rows()
+
+            start = time.perf_counter()
+            assigned, counts = calibration.calibrate(rows, bands, tie_break=TIE_BREAK_ORDERS[run.tie_break])
+            duration_ms = (time.perf_counter() - start) * 1000.0
+
+            run._write_labels(assigned)
+            run.write({
+                'state': 'done',
+                'population': len(rows),
+                'group_count': len(counts),
+                'duration_ms': duration_ms,
+                'summary_json': json.dumps({str(key): value for key, value in counts.items()}),
+                'applied_on': fields.Datetime.now(),
+            })
+            _logger.info("Calibration run %s: %s results in %s populations, ranked in %.1f ms",
+                         run.id, len(rows), len(counts), duration_ms)
+        return True
+
+    def _write_labels(self, assigned):
+        self.ensure_one()
+        cr = self.env.cr
+        result_ids = [rid for ids in assigned.values() for rid in ids]
+        if not result_ids:
+            return
+        # results an earlier application of this run calibrated that are no longer in scope
+        cr.execute("""
+            UPDATE oh_appraisal_result
+               SET rating_label = """ + RESTORE_LABEL_SQL + """,
+                   uncalibrated_label = NULL,
+                   calibrated_label = NULL,
+                   calibration_run_id = NULL
+             WHERE calibration_run_id = %s AND NOT (id = ANY(%s))
+         RETURNING id
+        """, (self.id, result_ids))
+        released_ids = [row[0] for row in cr.fetchall()]
+        for label, ids in assigned.items():
+            if not ids:
+                continue
+            if self.update_rating:
+                cr.execute("""
+                    UPDATE oh_appraisal_result
+                       SET calibrated_label = %s,
+                           calibration_run_id = %s,
+                           uncalibrated_label = COALESCE(uncalibrated_label, rating_label),
+                           rating_label = %s
+                     WHERE id = ANY(%s)
+                """, (label, self.id, label, ids))
+            else:
+                cr.execute("""
+                    UPDATE oh_appraisal_result
+                       SET calibrated_label = %s,
+                           calibration_run_id = %s,
+                           rating_label = """ + RESTORE_LABEL_SQL + """,
+                           uncalibrated_label = NULL
+                     WHERE id = ANY(%s)
+                """, (label, self.id, ids))
+        self._mirror_ratings(result_ids + released_ids)
+        self.env['oh.appraisal.result'].invalidate_model(
+            ['calibrated_label', 'calibration_run_id', 'uncalibrated_label', 'rating_label'])
+
+    def _mirror_ratings(self, result_ids):
+        self.env['hr.appraisal'].flush_model(['result_id', 'final_rating'])
+        self.env.cr.execute("""
+            UPDATE hr_appraisal a
+               SET final_rating = r.rating_label
+              FROM oh_appraisal_result r
+             WHERE a.result_id = r.id
+               AND r.id = ANY(%s)
+        """, (list(result_ids),))
+        self.env['hr.appraisal'].invalidate_model(['final_rating'])
+
+    def action_reset(self):
+        """Remove the calibrated labels of the run and restore the original ratings."""
+        Result = self.env['oh.appraisal.result']
+        Result.flush_model()
+        for run in self:
+            self.env.cr.execute("""
+                UPDATE oh_appraisal_result
+                   SET rating_label = """ + RESTORE_LABEL_SQL + """,
+                       uncalibrated_label = NULL,
+                       calibrated_label = NULL,
+                       calibration_run_id = NULL
+                 WHERE calibration_run_id = %s
+             RETURNING id
+            """, (run.id,))
+            result_ids = [row[0] for row in self.env.cr.fetchall()]
+            if result_ids:
+                run._mirror_ratings(result_ids)
+            run.write({'state': 'draft'})
+        Result.invalidate_model(['calibrated_label', 'calibration_run_id', 'uncalibrated_label', 'rating_label'])
+        return True
+
+
+class OHAppraisalCalibrationQuota(models.Model):
+    _name = 'oh.appraisal.calibration.quota'
+    _description = 'Calibration Band Quota'
+    _order = 'sequence, id'
+
+    run_id = fields.Many2one('oh.appraisal.calibration.run', required=True, ondelete='cascade', index=True)
+    sequence = fields.Integer(string='Rank', default=10, help="Bands are filled best first, in this order.")
+    label = fields.Char(string='Rating Label', required=True)
+    quota_percent = fields.Float(string='Quota %', digits=(5, 2), required=True)
+
+    _sql_constraints = [
+        ('run_label_uniq', 'unique(run_id, label)', 'Each rating label can only have one quota per run.'),
+    ]
@@ -91,6 +91,23 @@ class OHAppraisalDepartmentWeightage(models.Model):
             _logger.error("Error saving department configuration: %s", str(e))
             return False
 
+    @api.model
+    def _get_configs_by_department(self, departments, companies):
+        """
+        Fetch active configurations for several departments in one query.
+        Returns {(department_id, company_id): config}.
+        """
+        if not departments:
+            return {}
+        configs = self.search([
+            ('department_id', 'in', departments.ids),
+            ('company_id', 'in', companies.ids),
+        ], order='id')
+        result = {}
+        for config in configs:
+            result.setdefault((config.department_id.id, config.company_id.id), config)
+        return result
+
     @api.model
     def get_department_config(self, department_id, company_id):
         """Get weightage configuration for a department"""
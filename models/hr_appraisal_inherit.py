@@ -1,51 +1,323 @@
 # -*- coding: utf-8 -*-
 from odoo import api, fields, models
+from ..lib import scoring_kernel
+from .perf_sample import perf_stage
+import json
 import logging
 _logger = logging.getLogger(__name__)
 
+# Field of survey.user_input.line holding the answer, per answer_type; the
+# other answer types (dates, suggestions) carry no score.
+SURVEY_ANSWER_VALUE_FIELDS = {
+    'numerical_box': 'value_numerical_box',
+    'scale': 'value_scale',
+    'char_box': 'value_char_box',
+    'text_box': 'value_text_box',
+}
+# Single value field of survey versions without answer_type (older ones, and oh_appraisal)
+SURVEY_LEGACY_VALUE_FIELD = 'value'
+NUMBER_PATTERN = r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+
+
 class HRAppraisalInherited(models.Model):
     _inherit = 'hr.appraisal'
 
     result_id = fields.Many2one('oh.appraisal.result', string='Appraisal Result', copy=False)
+    result_archive_id = fields.Many2one('oh.appraisal.result.archive', string='Archived Result', readonly=True,
+                                        copy=False, index='btree_not_null',
+                                        help="The appraisal's result once it was archived; Appraisal Result is then "
+                                             "empty and the final values stay on the appraisal.")
     is_result_computed = fields.Boolean(string='Result Computed', default=False)
     final_percentage = fields.Float(string='Final Percentage', digits=(6,2), readonly=True)
     final_rating = fields.Char(string='Final Rating', readonly=True)
     final_result_json = fields.Text(string='Final Result JSON', readonly=True)
 
-    def action_done(self):
-        res = super(HRAppraisalInherited, self).action_done()
+    # Provisional score, updated as survey responses are submitted
+    provisional_percentage = fields.Float(string='Provisional Percentage', digits=(6,2), readonly=True, copy=False)
+    provisional_rating = fields.Char(string='Provisional Rating', readonly=True, copy=False)
+    provisional_date = fields.Datetime(string='Provisional Score Updated', readonly=True, copy=False)
+    provisional_state_json = fields.Text(string='Running Aggregate (JSON)', readonly=True, copy=False,
+                                         help="Per-item answer sums of the submitted survey responses, see scoring_kernel.update_running_state.")
+
+    # ------------- Survey answer extraction --------------
+    @api.model
+    def _survey_item_key(self, question):
+        """Item code an answer is matched against (template line code)."""
+        return (getattr(question, 'variable', '') or '').strip() or str(question.id)
+
+    @api.model
+    def _survey_line_value(self, line):
+        """
+        Numeric value of a survey answer line, None when it was skipped or is not
+        numeric. A real answer of 0 is a value like any other.
+        """
+        if 'skipped' in line._fields and line.skipped:
+            return None
+        if 'answer_type' in line._fields:
+            fname = SURVEY_ANSWER_VALUE_FIELDS.get(line.answer_type)
+        else:
+            fname = SURVEY_LEGACY_VALUE_FIELD
+        if not fname or fname not in line._fields:
+            return None
+        raw = line[fname]
+        if raw is None or raw is False or (isinstance(raw, str) and not raw.strip()):
+            return None
+        try:
+            return float(raw)
+        except (TypeError, ValueError):
+            return None
+
+    def _reviewer_partner_map(self):
+        """
+        Map each appraisal to {partner_id: reviewer_type} for the people whose
+        role is known from the org chart: the employee (self), their manager(s)
+        and direct reports. Anyone else answering is treated as a peer.
+        """
+        result = {}
         for app in self:
-            try:
-                master = self.env['oh.appraisal.master'].search([('company_id','=',app.company_id.id)], limit=1)
-                if not master:
-                    _logger.debug("No oh.appraisal.master found for company %s", app.company_id.id)
+            emp = app.employee_id
+            partners = {}
+            for sub in emp.child_ids:
+                for partner in (sub.work_contact_id | sub.user_id.partner_id):
+                    partners[partner.id] = 'subordinate'
+            managers = app.manager_ids if 'manager_ids' in app._fields else self.env['hr.employee']
+            for manager in (managers | emp.parent_id):
+                for partner in (manager.work_contact_id | manager.user_id.partner_id):
+                    partners[partner.id] = 'manager'
+            for partner in (emp.work_contact_id | emp.user_id.partner_id):
+                partners[partner.id] = 'self'
+            result[app.id] = partners
+        return result
+
+    @api.model
+    def _input_reviewer_type(self, user_input, partner_roles):
+        """Reviewer type of a survey response: its own field when the survey sets it, else the org chart."""
+        if 'reviewer_type' in user_input._fields and user_input.reviewer_type:
+            return user_input.reviewer_type
+        return partner_roles.get(user_input.partner_id.id) or 'peer'
+
+    @api.model
+    def _survey_value_sql(self):
+        """
+        SQL expression (on alias ``l``) equivalent to _survey_line_value: the
+        value of the field matching the answer type, NULL for skipped answers,
+        answer types without a score and non-numeric text.
+        """
+        Line = self.env['survey.user_input.line']
+
+        def value_sql(fname):
+            field = Line._fields.get(fname)
+            if not field or not field.store:
+                return None
+            if field.type in ('integer', 'float', 'monetary'):
+                return 'l."%s"::float' % fname
+            if field.type in ('char', 'text'):
+                return "CASE WHEN l.\"%s\" ~ '%s' THEN l.\"%s\"::float END" % (fname, NUMBER_PATTERN, fname)
+            return None
+
+        answer_type = Line._fields.get('answer_type')
+        if answer_type and answer_type.store:
+            cases = []
+            for atype, fname in SURVEY_ANSWER_VALUE_FIELDS.items():
+                sql = value_sql(fname)
+                if sql:
+                    cases.append("WHEN l.answer_type = '%s' THEN %s" % (atype, sql))
+            expr = 'CASE %s END' % ' '.join(cases) if cases else 'NULL::float'
+        else:
+            expr = value_sql(SURVEY_LEGACY_VALUE_FIELD) or 'NULL::float'
+        skipped = Line._fields.get('skipped')
+        if skipped and skipped.store:
+            expr = 'CASE WHEN l.skipped THEN NULL ELSE %s END' % expr
+        return expr
+
+    @perf_stage('answer_extraction')
+    def _collect_reviewer_answers(self):
+        """
+        Gather every survey answer of the appraisals in ``self`` and average them
+        per item and reviewer type. Answers are matched to template items through
+        oh.appraisal.question.binding in a single aggregate query; answers to
+        unbound questions are not scored (see the binding validation report),
+        and skipped or non-numeric answers do not count in the average.
+
+        Returns {appraisal_id: {item_code: {reviewer_type: average_score}}}, the
+        reviewer-split shape compute_employee_score understands.
+        """
+        if not self:
+            return {}
+        UserInput = self.env['survey.user_input']
+        surveys = UserInput._read_group([('appraisal_id', 'in', self.ids)], ['survey_id'])
+        if not surveys:
+            return {}
+        Binding = self.env['oh.appraisal.question.binding']
+        Binding._ensure_bindings(self.env['survey.survey'].browse([survey.id for survey, in surveys if survey]))
+        partner_roles = self._reviewer_partner_map()
+
+        rtype_field = UserInput._fields.get('reviewer_type')
+        rtype_sql = 'ui.reviewer_type' if rtype_field and rtype_field.store else 'NULL'
+        UserInput.flush_model()
+        self.env['survey.user_input.line'].flush_model()
+        Binding.flush_model()
+        value_sql = self._survey_value_sql()
+        self.env.cr.execute("""
+            SELECT ui.appraisal_id, ui.partner_id, %s, b.item_code, SUM(%s), COUNT(%s)
+              FROM survey_user_input ui
+              JOIN survey_user_input_line l ON l.user_input_id = ui.id
+              JOIN (SELECT DISTINCT question_id, item_code
+                      FROM oh_appraisal_question_binding
+                     WHERE active AND item_code IS NOT NULL) b ON b.question_id = l.question_id
+             WHERE ui.appraisal_id IN %%s
+          GROUP BY 1, 2, 3, 4
+            HAVING COUNT(%s) > 0
+        """ % (rtype_sql, value_sql, value_sql, value_sql), (tuple(self.ids),))
+
+        sums = {}
+        for app_id, partner_id, reviewer_type, code, total, count in self.env.cr.fetchall():
+            reviewer_type = reviewer_type or partner_roles.get(app_id, {}).get(partner_id) or 'peer'
+            acc = sums.setdefault(app_id, {}).setdefault(code, {}).setdefault(reviewer_type, [0.0, 0])
+            acc[0] += total or 0.0
+            acc[1] += count
+
+        return {
+            app_id: {
+                code: {typ: (total / count if count else 0.0) for typ, (total, count) in by_type.items()}
+                for code, by_type in items.items()
+            }
+            for app_id, items in sums.items()
+        }
+
+    # ------------- Incremental scoring --------------
+    def _apply_survey_inputs(self, user_inputs):
+        """
+        Fold newly submitted survey responses into each appraisal's running
+        aggregate and refresh the provisional score. Only the items answered
+        in ``user_inputs`` are recomputed; responses already folded in are skipped.
+        """
+        masters = self.env['oh.appraisal.master']._resolve_masters(self)
+        partner_roles = self._reviewer_partner_map()
+        Binding = self.env['oh.appraisal.question.binding']
+        Binding._ensure_bindings(user_inputs.survey_id)
+        item_codes = Binding._question_item_codes(user_inputs.user_input_line_ids.question_id.ids)
+        for app in self:
+            master = masters.get(app.id)
+            if not master:
+                continue
+            state = json.loads(app.provisional_state_json or '{}')
+            seen = set(state.get('inputs') or [])
+            rows = []
+            new_ids = []
+            for su in user_inputs:
+                if su.appraisal_id != app or su.id in seen:
                     continue
+                reviewer_type = self._input_reviewer_type(su, partner_roles.get(app.id, {}))
+                for line in su.user_input_line_ids:
+                    value = self._survey_line_value(line)
+                    for code in item_codes.get(line.question_id.id, ()):
+                        rows.append((code, reviewer_type, value))
+                new_ids.append(su.id)
+            if not new_ids:
+                continue
+            plan, config_hash = master._get_cached_scoring_plan()
+            dept, role, common = master.get_templates_for_employee(app.employee_id)
+            route = (dept.id if dept else False, role.id if role else False, tuple(common.ids))
+            key = '%s:%s:%s:%s' % (config_hash, route[0], route[1], ','.join(map(str, route[2])))
+            scoring_kernel.update_running_state(plan, route, state, rows, key)
+            state['inputs'] = sorted(seen.union(new_ids))
+            totals = scoring_kernel.running_totals(plan, state)
+            app.write({
+                'provisional_state_json': json.dumps(state, separators=(',', ':')),
+                'provisional_percentage': totals['final_percentage'],
+                'provisional_rating': totals['rating_label'],
+                'provisional_date': fields.Datetime.now(),
+            })
+
+    def _collect_final_answers(self):
+        """
+        Answers for close-out. An appraisal whose running aggregate already
+        covers every one of its survey responses is finalized from that state;
+        the others have their surveys extracted as before.
+        """
+        inputs = self.env['survey.user_input']._read_group(
+            [('appraisal_id', 'in', self.ids)], ['appraisal_id'], ['id:array_agg'])
+        input_ids = {appraisal.id: set(ids) for appraisal, ids in inputs}
+        answers = {}
+        to_extract = self.browse()
+        for app in self:
+            state = json.loads(app.provisional_state_json) if app.provisional_state_json else {}
+            seen = set(state.get('inputs') or [])
+            if seen and seen == input_ids.get(app.id, set()):
+                answers[app.id] = scoring_kernel.running_answers(state)
+            else:
+                to_extract |= app
+        if to_extract:
+            answers.update(to_extract._collect_reviewer_answers())
+        return answers
+
+    def _compute_appraisal_results(self):
+        """
+        Score the appraisals in ``self`` and upsert their results, one per
+        (appraisal, configuration version). Answers come from the running
+        aggregates when they are complete, otherwise they are collected once
+        for the batch; masters come from the cached resolver.
+
+        Overlapping batches closed at the same time wait on per-appraisal
+        advisory locks. An appraisal whose stored result for the current
+        version was scored from the same answers and templates is only
+        re-linked, so repeated or retried close-outs do no extra work.
+        """
+        Result = self.env['oh.appraisal.result']
+        Result._lock_appraisals(self.ids)
+        answers_by_appraisal = self._collect_final_answers()
+        masters = self.env['oh.appraisal.master']._resolve_masters(self)
+        by_master = {}
+        for app in self:
+            master = masters.get(app.id)
+            if not master:
+                _logger.debug("No oh.appraisal.master found for appraisal %s (company %s)", app.id, app.company_id.id)
+                continue
+            by_master.setdefault(master, []).append(app)
 
-                answers = {}
-                survey_inputs = self.env['survey.user_input'].search([('appraisal_id','=', app.id)])
-                for su in survey_inputs:
-                    for line in su.user_input_line_ids:
-                        q = line.question_id
-                        key = (q.variable or '').strip() or str(q.id)
-                        try:
-                            val = float(line.value) if line.value not in (None, '') else 0.0
-                        except Exception:
-                            try:
-                                val = float(getattr(line, 'value', 0) or 0.0)
-                            except Exception:
-                                val = 0.0
-                        answers[key] = val
-
-                comp = master.compute_employee_score(app.employee_id, answers_by_item=answers)
-                result = self.env['oh.appraisal.result'].create_result(master, app, app.employee_id, comp, notes=app.final_interview or '')
-                app.result_id = result.id
-                app.is_result_computed = True
-                app.final_percentage = result.final_percentage
-                app.final_rating = result.rating_label
+        entries = []
+        unchanged = Result
+        for master, apps in by_master.items():
+            apps = self.browse([app.id for app in apps])
+            routes = master.get_templates_for_employees(apps.employee_id)
+            existing = Result._get_existing_results(apps, master._get_current_version())
+            for app in apps:
+                answers = answers_by_appraisal.get(app.id, {})
+                dept, role, common = routes[app.employee_id.id]
+                route = (dept.id if dept else False, role.id if role else False, common.ids)
+                answers_hash = Result._answers_hash(answers, route)
+                stored = existing.get(app.id)
+                if stored and stored.answers_hash == answers_hash:
+                    unchanged |= stored
+                    continue
                 try:
-                    app.final_result_json = result.data_json
-                except Exception:
-                    app.final_result_json = str(comp)
+                    comp = master.compute_employee_score(app.employee_id, answers_by_item=answers)
+                except Exception as e:
+                    _logger.exception("Failed to compute appraisal result for appraisal %s: %s", app.id, e)
+                    continue
+                entries.append((master, app, app.employee_id, comp, app.final_interview or '', answers_hash))
+
+        results = Result
+        if entries:
+            try:
+                with self.env.cr.savepoint():
+                    results = Result.upsert_results(entries)
             except Exception as e:
-                _logger.exception("Failed to compute/store appraisal result for appraisal %s: %s", app.id, e)
+                # One bad record should not block the whole batch: retry one by one
+                _logger.warning("Batch result upsert failed (%s), falling back to per-appraisal upsert", e)
+                for entry in entries:
+                    try:
+                        with self.env.cr.savepoint():
+                            results |= Result.upsert_results([entry])
+                    except Exception as e:
+                        _logger.exception("Failed to store appraisal result for appraisal %s: %s", entry[1].id, e)
+
+        unchanged = unchanged.filtered(lambda r: r.appraisal_id.result_id != r)
+        (results | unchanged)._link_to_appraisals()
+
+    @perf_stage('close_out')
+    def action_done(self):
+        res = super(HRAppraisalInherited, self).action_done()
+        self._compute_appraisal_results()
         return res
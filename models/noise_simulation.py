@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import time
+
+from odoo import fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import config
+
+from ..lib import scoring_kernel, scoring_pool
+
+_logger = logging.getLogger(__name__)
+
+
+class OHAppraisalMasterNoise(models.Model):
+    _inherit = 'oh.appraisal.master'
+
+    def action_open_noise_simulation(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Reviewer Noise Simulation"),
+            'res_model': 'oh.appraisal.noise.simulation',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'default_master_id': self.id},
+        }
+
+
+class OHAppraisalNoiseSimulation(models.TransientModel):
+    _name = 'oh.appraisal.noise.simulation'
+    _description = 'Reviewer Noise Simulation'
+
+    master_id = fields.Many2one('oh.appraisal.master', string='Master', required=True,
+                                domain=[('assessment_framework_id', '!=', False)])
+    framework_id = fields.Many2one(related='master_id.assessment_framework_id', string='Assessment Framework')
+    appraisal_ids = fields.Many2many('hr.appraisal', string='Appraisals',
+                                     help="Leave empty to simulate every appraisal scored with the master.")
+    samples = fields.Integer(string='Samples per Employee', default=2000, required=True)
+    noise = fields.Float(string='Score Noise (σ)', digits=(6, 3), default=0.5, required=True,
+                         help="Standard deviation of the noise added to every reviewer score, in scale points.")
+    bias = fields.Float(string='Reviewer Bias (σ)', digits=(6, 3), default=0.0,
+                        help="Standard deviation of an offset shared by all the scores of one reviewer type "
+                             "(a lenient or harsh reviewer).")
+    seed = fields.Integer(string='Seed', default=1, required=True,
+                          help="The same seed, samples and answers always give the same probabilities.")
+    workers = fields.Integer(string='Processes', default=0,
+                             help="0 uses the scoring worker setting (oh_appraisal_ext.scoring_workers).")
+    stability_threshold = fields.Float(string='Stable Above %', default=80.0,
+                                       help="Employees keeping their rating in fewer samples than this are flagged.")
+
+    line_ids = fields.One2many('oh.appraisal.noise.simulation.line', 'simulation_id', string='Employees', readonly=True)
+    population = fields.Integer(string='Employees Simulated', readonly=True)
+    unstable_count = fields.Integer(string='Unstable Ratings', readonly=True)
+    expected_bands = fields.Text(string='Expected Band Counts', readonly=True)
+    processes_used = fields.Integer(string='Processes Used', readonly=True)
+    duration_ms = fields.Float(string='Simulation Time (ms)', digits=(12, 1), readonly=True)
+    simulated = fields.Boolean(readonly=True)
+
+    def action_simulate(self):
+        """
+        Sample noisy reviewer scores for every appraisal, score them through the
+        master's framework and scoring scale and store, per employee, how often
+        each rating band came out.
+        """
+        self.ensure_one()
+        master = self.master_id
+        if not master.assessment_framework_id:
+            raise UserError(_("%s has no assessment framework: there are no reviewer scores to perturb.") % master.name)
+        if self.samples < 1:
+            raise UserError(_("Simulate at least one sample per employee."))
+        if self.noise < 0 or self.bias < 0:
+            raise UserError(_("Noise and bias are standard deviations and cannot be negative."))
+        appraisals = self.appraisal_ids or self.env['hr.appraisal'].search(
+            master._get_scored_appraisal_domain(), order='id')
+        if not appraisals:
+            raise UserError(_("No appraisal has been scored with %s yet.") % master.name)
+
+        plan = master._get_scoring_plan()
+        jobs = master._get_scoring_jobs(appraisals)
+        baseline = dict(scoring_kernel.score_batch(plan, jobs, scoring_kernel.DETAIL_TOTALS))
+
+        start = time.perf_counter()
+        summaries, used = scoring_pool.run_simulation(
+            plan, jobs, self.samples, noise=self.noise, bias=self.bias, seed=self.seed,
+            workers=master._get_scoring_workers(self.workers or None),
+            prefork_workers=config.get('workers') or 0)
+        duration_ms = (time.perf_counter() - start) * 1000.0
+
+        threshold = self.stability_threshold / 100.0
+        expected = {}
+        lines = []
+        employees = {app.id: app.employee_id.id for app in appraisals}
+        for app_id, summary in summaries:
+            probabilities = sorted(summary['labels'].items(), key=lambda entry: -entry[1])
+            for label, probability in probabilities:
+                expected[label] = expected.get(label, 0.0) + probability
+            base = baseline[app_id]
+            stability = summary['labels'].get(base['rating_label'] or '', 0.0)
+            lines.append((0, 0, {
+                'appraisal_id': app_id,
+                'employee_id': employees[app_id],
+                'baseline_percentage': base['final_percentage'],
+                'baseline_label': base['rating_label'],
+                'likely_label': probabilities[0][0] if probabilities else False,
+                'stability': stability * 100.0,
+                'unstable': stability < threshold,
+                'mean_percentage': summary['mean'],
+                'std_percentage': summary['std'],
+                'min_percentage': summary['min'],
+                'max_percentage': summary['max'],
+                'band_probabilities': ', '.join('%s %.1f%%' % (label or '-', probability * 100.0)
+                                                for label, probability in probabilities),
+                'probabilities_json': json.dumps(summary['labels']),
+            }))
+
+        self.line_ids.unlink()
+        self.write({
+            'line_ids': lines,
+            'population': len(lines),
+            'unstable_count': sum(1 for _cmd, _id, vals in lines if vals['unstable']),
+            'expected_bands': '\n'.join('%s: %.1f' % (label or '-', count)
+                                        for label, count in sorted(expected.items(), key=lambda entry: -entry[1])),
+            'processes_used': used,
+            'duration_ms': duration_ms,
+            'simulated': True,
+        })
+        _logger.info("Noise simulation of master %s: %s employees x %s samples with %s process(es) in %.1f ms",
+                     master.id, len(lines), self.samples, used, duration_ms)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Reviewer Noise Simulation"),
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class OHAppraisalNoiseSimulationLine(models.TransientModel):
+    _name = 'oh.appraisal.noise.simulation.line'
+    _description = 'Reviewer Noise Simulation Employee'
+    _order = 'stability, id'
+
+    simulation_id = fields.Many2one('oh.appraisal.noise.simulation', required=True, ondelete='cascade')
+    appraisal_id = fields.Many2one('hr.appraisal', string='Appraisal', readonly=True)
+    employee_id = fields.Many2one('hr.employee', string='Employee', readonly=True)
+    baseline_percentage = fields.Float(string='Score %', digits=(6, 2), readonly=True)
+    baseline_label = fields.Char(string='Rating', readonly=True)
+    likely_label = fields.Char(string='Most Likely Rating', readonly=True)
+    stability = fields.Float(string='Same Rating %', digits=(5, 1), readonly=True,
+                             help="Share of the samples that kept the noise-free rating.")
+    unstable = fields.Boolean(string='Unstable', readonly=True)
+    mean_percentage = fields.Float(string='Mean %', digits=(6, 2), readonly=True)
+    std_percentage = fields.Float(string='Std. Dev.', digits=(6, 2), readonly=True)
+    min_percentage = fields.Float(string='Min %', digits=(6, 2), readonly=True)
+    max_percentage = fields.Float(string='Max %', digits=(6, 2), readonly=True)
+    band_probabilities = fields.Char(string='Band Probabilities', readonly=True)
+    probabilities_json = fields.Text(string='Band Probabilities (JSON)', readonly=True)
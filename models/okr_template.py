@@ -162,6 +162,10 @@ class OHAppraisalOKRTemplate(models.Model):
     key_result_count = fields.Integer('Key Results Count', 
                                     compute='_compute_key_result_count')
 
+    # Distributed weightage per result type and team, for the weightage widget:
+    # {result_type: {team_id: distributed_total}}
+    key_result_distribution = fields.Text(compute='_compute_key_result_distribution')
+
     
     department_distributed_total = fields.Float(
         compute='_compute_distributed_totals',
@@ -239,16 +243,21 @@ class OHAppraisalOKRTemplate(models.Model):
                 'role_key_result_ids.distributed_weightage',
                 'common_key_result_ids.distributed_weightage')
     def _compute_distributed_totals(self):
-        for record in self:
-            record.department_distributed_total = sum(
-                record.department_key_result_ids.mapped('distributed_weightage')
-            )
-            record.role_distributed_total = sum(
-                record.role_key_result_ids.mapped('distributed_weightage')
-            )
-            record.common_distributed_total = sum(
-                record.common_key_result_ids.mapped('distributed_weightage')
+        # One grouped query for the whole batch instead of reading every key result
+        totals = {}
+        template_ids = self.filtered('id').ids
+        if template_ids:
+            groups = self.env['oh.appraisal.okr.key.result']._read_group(
+                [('okr_template_id', 'in', template_ids)],
+                ['okr_template_id', 'result_type'],
+                ['distributed_weightage:sum'],
             )
+            for template, result_type, total in groups:
+                totals[(template.id, result_type)] = total or 0.0
+        for record in self:
+            record.department_distributed_total = totals.get((record.id, 'department'), 0.0)
+            record.role_distributed_total = totals.get((record.id, 'role'), 0.0)
+            record.common_distributed_total = totals.get((record.id, 'common'), 0.0)
 
     @api.constrains('department_distributed_total', 'role_distributed_total', 'common_distributed_total')
     def _check_distributed_totals(self):
@@ -273,22 +282,16 @@ class OHAppraisalOKRTemplate(models.Model):
 
     @api.depends('department_id', 'company_id')
     def _compute_department_budget(self):
+        configs = self.env['oh.appraisal.department.weightage']._get_configs_by_department(
+            self.department_id, self.company_id)
         for record in self:
-            if record.department_id and record.company_id:
-                config = self.env['oh.appraisal.department.weightage'].search([
-                    ('department_id', '=', record.department_id.id),
-                    ('company_id', '=', record.company_id.id),
-                    ('active', '=', True)
-                ], limit=1)
+            config = configs.get((record.department_id.id, record.company_id.id)) \
+                if record.department_id and record.company_id else None
                 
-                if config:
-                    record.department_budget_functional = config.functional_weightage
-                    record.department_budget_role = config.role_weightage
-                    record.department_budget_common = config.common_weightage
-                else:
-                    record.department_budget_functional = 0.0
-                    record.department_budget_role = 0.0
-                    record.department_budget_common = 0.0
+            if config:
+                record.department_budget_functional = config.functional_weightage
+                record.department_budget_role = config.role_weightage
+                record.department_budget_common = config.common_weightage
             else:
                 record.department_budget_functional = 0.0
                 record.department_budget_role = 0.0
@@ -305,8 +308,30 @@ class OHAppraisalOKRTemplate(models.Model):
 
     @api.depends('key_result_ids')
     def _compute_key_result_count(self):
+        counts = {}
+        template_ids = self.filtered('id').ids
+        if template_ids:
+            groups = self.env['oh.appraisal.okr.key.result']._read_group(
+                [('okr_template_id', 'in', template_ids)], ['okr_template_id'], ['__count'])
+            counts = {template.id: count for template, count in groups}
         for record in self:
-            record.key_result_count = len(record.key_result_ids)
+            record.key_result_count = counts.get(record.id, 0)
+
+    @api.depends('key_result_ids.team_id', 'key_result_ids.distributed_weightage', 'key_result_ids.result_type')
+    def _compute_key_result_distribution(self):
+        distribution = {}
+        template_ids = self.filtered('id').ids
+        if template_ids:
+            groups = self.env['oh.appraisal.okr.key.result']._read_group(
+                [('okr_template_id', 'in', template_ids), ('team_id', '!=', False)],
+                ['okr_template_id', 'result_type', 'team_id'],
+                ['distributed_weightage:sum'],
+            )
+            for template, result_type, team, total in groups:
+                by_type = distribution.setdefault(template.id, {}).setdefault(result_type, {})
+                by_type[str(team.id)] = total or 0.0
+        for record in self:
+            record.key_result_distribution = json.dumps(distribution.get(record.id, {}))
 
     @api.constrains('start_date', 'end_date')
     def _check_dates(self):
@@ -496,38 +521,40 @@ class OHAppraisalOKRTemplate(models.Model):
             self._redistribute_common_weightage()
     
 
+    @api.model
+    def _split_common_weightage(self, total_common, team_count):
+        """
+        Split the common budget equally among teams, rounded to 2 decimals.
+        Any rounding discrepancy goes to the first team. The OKR template form
+        widget (okr_weightage_budget) applies the same rule client-side.
+        """
+        if team_count <= 0:
+            return []
+        weight_per_team = round(total_common / team_count, 2)
+        shares = [weight_per_team] * team_count
+        difference = total_common - (weight_per_team * team_count)
+        if abs(difference) > 0.01:
+            shares[0] = weight_per_team + round(difference, 2)
+        return shares
+
     def _redistribute_common_weightage(self):
         """
         Redistribute common weightage equally among teams.
         The total common weightage from department budget will be divided equally among all teams.
+        Only lines whose share actually changes are written, grouped by value, so a save
+        coming from the form (which already sends the split) does not write anything.
         """
         for record in self:
             if not record.weightage_ids or not record.department_id:
                 continue
 
-            # Get total common weightage from department budget
-            total_common = record.department_budget_common
-            team_count = len(record.weightage_ids)
-            
-            if team_count > 0:
-                # Calculate equal share for each team
-                weight_per_team = total_common / team_count
-                # Round to 2 decimal places
-                weight_per_team = round(weight_per_team, 2)
-                
-                # Update all weightage records
-                for weightage in record.weightage_ids:
-                    weightage.write({'common_weightage': weight_per_team})
-                
-                # Handle any rounding discrepancy
-                total_allocated = sum(record.weightage_ids.mapped('common_weightage'))
-                if abs(total_allocated - total_common) > 0.01:
-                    # Distribute the remaining amount to the first record
-                    difference = total_common - total_allocated
-                    if record.weightage_ids:
-                        record.weightage_ids[0].write({
-                            'common_weightage': record.weightage_ids[0].common_weightage + round(difference, 2)
-                        })
+            shares = record._split_common_weightage(record.department_budget_common, len(record.weightage_ids))
+            to_write = {}
+            for weightage, share in zip(record.weightage_ids, shares):
+                if abs((weightage.common_weightage or 0.0) - share) > 0.001:
+                    to_write[share] = to_write.get(share, weightage.browse()) | weightage
+            for share, weightages in to_write.items():
+                weightages.write({'common_weightage': share})
 
     @api.model
     def _ensure_common_weightage_distribution(self):
@@ -604,23 +631,6 @@ class OHAppraisalOKRTemplate(models.Model):
                 domain.append(('department_id', '=', record.department_id.id))
             record.available_team_ids = self.env['oh.appraisal.team'].search(domain)
 
-    @api.onchange('weightage_ids')
-    def _onchange_weightage_ids(self):
-        """When weightages change, redistribute common weightage and recompute"""
-        for record in self:
-            # First redistribute common weightage
-            record._redistribute_common_weightage()
-            # Then trigger recompute of available weightages
-            if record.department_key_result_ids:
-                for kr in record.department_key_result_ids:
-                    kr._compute_available_weightage()
-            if record.role_key_result_ids:
-                for kr in record.role_key_result_ids:
-                    kr._compute_available_weightage()
-            if record.common_key_result_ids:
-                for kr in record.common_key_result_ids:
-                    kr._compute_available_weightage()
-
     @api.depends('objective_breakdown_ids')
     def _compute_breakdown_count(self):
         for record in self:
@@ -650,21 +660,14 @@ class OHAppraisalOKRTemplate(models.Model):
         return record
 
     def write(self, vals):
-        """Override write to handle weightage updates and redistribution"""
+        """
+        Override write to handle weightage updates and redistribution.
+        Key result available weightages are stored computes depending on
+        weightage_ids/allocated_*, so the ORM recomputes them on flush.
+        """
         res = super().write(vals)
         if 'weightage_ids' in vals:
             self._redistribute_common_weightage()
-            # Update available weightages for all key results
-            for record in self:
-                if record.department_key_result_ids:
-                    for kr in record.department_key_result_ids:
-                        kr._compute_available_weightage()
-                if record.role_key_result_ids:
-                    for kr in record.role_key_result_ids:
-                        kr._compute_available_weightage()
-                if record.common_key_result_ids:
-                    for kr in record.common_key_result_ids:
-                        kr._compute_available_weightage()
         return res
 
 
@@ -703,6 +706,10 @@ class OHAppraisalOKRKeyResult(models.Model):
                              domain="[('company_id', '=', parent.company_id), "
                                    "('department_id', '=', parent.department_id)]")
     sequence = fields.Integer('Sequence', default=10)
+
+    # Template context for domains when key results are edited outside the template form
+    template_company_id = fields.Many2one(related='okr_template_id.company_id', string='Template Company')
+    template_department_id = fields.Many2one(related='okr_template_id.department_id', string='Template Department')
     
     key_objective_breakdown = fields.Many2one(
         'oh.appraisal.objective.breakdown',
@@ -829,6 +836,37 @@ class OHAppraisalOKRKeyResult(models.Model):
             }
         return {'domain': {'team_id': []}}
 
+    def _get_allocated_budget(self):
+        """Template-level allocation for this key result's type."""
+        self.ensure_one()
+        if self.result_type == 'role':
+            return self.okr_template_id.allocated_role
+        elif self.result_type == 'common':
+            return self.okr_template_id.allocated_common
+        return self.okr_template_id.allocated_functional  # department
+
+    def _get_team_distributed_totals(self):
+        """
+        Stored distributed weightage summed per (template, team, result_type) for
+        all templates of the key results in ``self``, in a single grouped query.
+        """
+        template_ids = [tid for tid in self.okr_template_id._origin.ids if tid]
+        if not template_ids:
+            return {}
+        groups = self.env['oh.appraisal.okr.key.result']._read_group(
+            [('okr_template_id', 'in', template_ids), ('team_id', '!=', False)],
+            ['okr_template_id', 'team_id', 'result_type'],
+            ['distributed_weightage:sum'],
+        )
+        return {
+            (template.id, team.id, result_type): total or 0.0
+            for template, team, result_type, total in groups
+        }
+
+    def _get_team_distributed_key(self):
+        self.ensure_one()
+        return (self.okr_template_id._origin.id, self.team_id._origin.id, self.result_type)
+
     @api.depends('team_id', 'okr_template_id.weightage_ids', 
             'okr_template_id.allocated_functional',
             'okr_template_id.allocated_role',
@@ -836,25 +874,14 @@ class OHAppraisalOKRKeyResult(models.Model):
             'result_type')
     def _compute_available_weightage(self):
         """Compute available weightage based on allocated weightages"""
+        totals = self._get_team_distributed_totals()
         for record in self:
             if record.team_id and record.okr_template_id:
-                # Get allocated weightage based on type
-                if record.result_type == 'role':
-                    total_available = record.okr_template_id.allocated_role
-                elif record.result_type == 'common':
-                    total_available = record.okr_template_id.allocated_common
-                else:  # department
-                    total_available = record.okr_template_id.allocated_functional
+                total_available = record._get_allocated_budget()
 
-                # Get already distributed amount for this team
-                domain = [
-                    ('okr_template_id', '=', record.okr_template_id.id),
-                    ('team_id', '=', record.team_id.id),
-                    ('result_type', '=', record.result_type),
-                    ('id', '!=', record.id)
-                ]
-                other_records = self.search(domain)
-                total_distributed = sum(other_records.mapped('distributed_weightage'))
+                # Already distributed by the other key results of this team
+                own_stored = record._origin.distributed_weightage if record._origin else 0.0
+                total_distributed = totals.get(record._get_team_distributed_key(), 0.0) - own_stored
                 
                 # Set available as remaining amount
                 record.available_weightage = max(0, total_available - total_distributed)
@@ -864,58 +891,17 @@ class OHAppraisalOKRKeyResult(models.Model):
     @api.constrains('distributed_weightage', 'team_id', 'result_type')
     def _check_distributed_weightage(self):
         """Validate distributed weightage against allocated budget"""
+        totals = None
         for record in self:
             if record.distributed_weightage < 0:
                 raise ValidationError(_("Distributed weightage cannot be negative."))
             
             if record.team_id and record.distributed_weightage > 0:
-                # Get all records for this team and type
-                domain = [
-                    ('okr_template_id', '=', record.okr_template_id.id),
-                    ('team_id', '=', record.team_id.id),
-                    ('result_type', '=', record.result_type)
-                ]
-                all_records = self.search(domain)
-                total_distributed = sum(all_records.mapped('distributed_weightage'))
-                
-                # Get allocated budget based on type
-                if record.result_type == 'role':
-                    allocated_budget = record.okr_template_id.allocated_role
-                elif record.result_type == 'common':
-                    allocated_budget = record.okr_template_id.allocated_common
-                else:  # department
-                    allocated_budget = record.okr_template_id.allocated_functional
-                
-                if total_distributed > allocated_budget:
-                    raise ValidationError(_(
-                        "Total distributed weightage (%.2f%%) for %s objectives cannot exceed "
-                        "the allocated weightage (%.2f%%)"
-                    ) % (
-                        total_distributed,
-                        dict(record._fields['result_type'].selection).get(record.result_type),
-                        allocated_budget
-                    ))
-
-    @api.constrains('distributed_weightage', 'team_id', 'result_type')
-    def _check_total_distributed_weightage(self):
-        """Ensure total distributed weightage doesn't exceed allocated budget"""
-        for record in self:
-            if record.team_id and record.distributed_weightage > 0:
-                domain = [
-                    ('okr_template_id', '=', record.okr_template_id.id),
-                    ('team_id', '=', record.team_id.id),
-                    ('result_type', '=', record.result_type)
-                ]
-                all_records = self.search(domain)
-                total_distributed = sum(all_records.mapped('distributed_weightage'))
-                
-                # Get allocated budget based on type
-                if record.result_type == 'role':
-                    allocated_budget = record.okr_template_id.allocated_role
-                elif record.result_type == 'common':
-                    allocated_budget = record.okr_template_id.allocated_common
-                else:  # department
-                    allocated_budget = record.okr_template_id.allocated_functional
+                if totals is None:
+                    # one grouped query for the whole batch
+                    totals = self._get_team_distributed_totals()
+                total_distributed = totals.get(record._get_team_distributed_key(), 0.0)
+                allocated_budget = record._get_allocated_budget()
                 
                 if total_distributed > allocated_budget:
                     raise ValidationError(_(
@@ -34,11 +34,12 @@ class OHAppraisalOKRWeightage(models.Model):
 
     @api.depends('okr_template_id.department_id', 'okr_template_id.company_id')
     def _compute_available_weightages(self):
+        templates = self.okr_template_id
+        configs = self.env['oh.appraisal.department.weightage']._get_configs_by_department(
+            templates.department_id, templates.company_id)
         for record in self:
-            dept_config = self.env['oh.appraisal.department.weightage'].search([
-                ('department_id', '=', record.okr_template_id.department_id.id),
-                ('company_id', '=', record.okr_template_id.company_id.id)
-            ], limit=1)
+            dept_config = configs.get((record.okr_template_id.department_id.id,
+                                       record.okr_template_id.company_id.id))
             
             if dept_config:
                 record.available_dept_weightage = dept_config.functional_weightage
@@ -51,28 +52,27 @@ class OHAppraisalOKRWeightage(models.Model):
 
     @api.constrains('department_weightage', 'role_weightage', 'common_weightage')
     def _check_weightages(self):
-        for record in self:
-            if not record.okr_template_id.department_id:
-                continue
-                
-            dept_config = self.env['oh.appraisal.department.weightage'].search([
-                ('department_id', '=', record.okr_template_id.department_id.id),
-                ('company_id', '=', record.okr_template_id.company_id.id)
-            ], limit=1)
-            
+        templates = self.okr_template_id.filtered('department_id')
+        if not templates:
+            return
+        configs = self.env['oh.appraisal.department.weightage']._get_configs_by_department(
+            templates.department_id, templates.company_id)
+
+        # Total allocated weightages per OKR template, one grouped query for the batch
+        totals = {
+            template.id: (dept or 0.0, role or 0.0, common or 0.0)
+            for template, dept, role, common in self._read_group(
+                [('okr_template_id', 'in', templates.ids)],
+                ['okr_template_id'],
+                ['department_weightage:sum', 'role_weightage:sum', 'common_weightage:sum'],
+            )
+        }
+        for template in templates:
+            dept_config = configs.get((template.department_id.id, template.company_id.id))
             if not dept_config:
                 raise ValidationError(_("No weightage configuration found for the department."))
-            
-            # Calculate total allocated weightages for this OKR template
-            domain = [
-                ('okr_template_id', '=', record.okr_template_id.id),
-                ('id', '!=', record.id)  # Exclude current record
-            ]
-            other_weightages = self.search(domain)
-            
-            total_dept = sum(other_weightages.mapped('department_weightage')) + record.department_weightage
-            total_role = sum(other_weightages.mapped('role_weightage')) + record.role_weightage
-            total_common = sum(other_weightages.mapped('common_weightage')) + record.common_weightage
+
+            total_dept, total_role, total_common = totals.get(template.id, (0.0, 0.0, 0.0))
             
             if total_dept > dept_config.functional_weightage:
                 raise ValidationError(_("Total department weightage exceeds available budget (%.2f%%)") 
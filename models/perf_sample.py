@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import functools
+import logging
+import time
+
+from odoo import api, fields, models, tools
+
+_logger = logging.getLogger(__name__)
+
+PERF_PARAM = 'oh_appraisal_ext.perf_instrumentation'
+PERF_BUFFER_KEY = 'oh_appraisal_ext.perf_samples'
+
+PERF_STAGES = [
+    ('close_out', 'Close-out (action_done)'),
+    ('answer_extraction', 'Answer Extraction'),
+    ('template_resolution', 'Template Resolution'),
+    ('template_lines', 'Template Lines'),
+    ('scoring', 'Employee Scoring'),
+    ('label_lookup', 'Label Lookup'),
+    ('result_persistence', 'Result Persistence'),
+]
+
+
+def perf_stage(stage):
+    """
+    Time a method as pipeline stage ``stage`` when instrumentation is switched on
+    (system parameter oh_appraisal_ext.perf_instrumentation). When it is off the
+    only overhead is a cached parameter lookup.
+
+    Durations and query counts are inclusive: a stage that calls another
+    instrumented stage also counts the inner one.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            Sample = self.env['oh.appraisal.perf.sample']
+            if not Sample._is_enabled():
+                return method(self, *args, **kwargs)
+            cr = self.env.cr
+            queries = cr.sql_log_count
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                Sample._buffer(stage, (time.perf_counter() - start) * 1000.0, cr.sql_log_count - queries)
+        return wrapper
+    return decorator
+
+
+class OHAppraisalPerfSample(models.Model):
+    _name = 'oh.appraisal.perf.sample'
+    _description = 'Appraisal Pipeline Timing Sample'
+    _order = 'id desc'
+    _log_access = False
+
+    stage = fields.Selection(PERF_STAGES, string='Stage', required=True, index=True)
+    duration_ms = fields.Float(string='Duration (ms)', digits=(12, 3))
+    query_count = fields.Integer(string='Queries')
+    user_id = fields.Many2one('res.users', string='User', ondelete='set null')
+    company_id = fields.Many2one('res.company', string='Company', ondelete='cascade')
+    date = fields.Datetime(string='Date', default=fields.Datetime.now, index=True)
+
+    @api.model
+    def _is_enabled(self):
+        # get_param is ormcached, so this stays cheap on every instrumented call
+        return tools.str2bool(self.env['ir.config_parameter'].sudo().get_param(PERF_PARAM, 'False'))
+
+    @api.model
+    def _buffer(self, stage, duration_ms, query_count):
+        """
+        Queue a sample on the cursor; the queue is written in one batch just
+        before the transaction commits, so measuring does not add inserts to
+        the stages being measured. Samples of a rolled back transaction are dropped.
+        """
+        cr = self.env.cr
+        samples = cr.precommit.data.get(PERF_BUFFER_KEY)
+        if samples is None:
+            samples = cr.precommit.data[PERF_BUFFER_KEY] = []
+            env = self.env
+            cr.precommit.add(lambda: env['oh.appraisal.perf.sample']._flush_buffer())
+        samples.append({
+            'stage': stage,
+            'duration_ms': duration_ms,
+            'query_count': query_count,
+            'user_id': self.env.uid,
+            'company_id': self.env.company.id,
+            'date': fields.Datetime.now(),
+        })
+
+    @api.model
+    def _flush_buffer(self):
+        samples = self.env.cr.precommit.data.pop(PERF_BUFFER_KEY, None)
+        if samples:
+            self.sudo().create(samples)
+
+    @api.autovacuum
+    def _gc_old_samples(self):
+        """Keep the last 30 days of samples."""
+        limit = fields.Datetime.subtract(fields.Datetime.now(), days=30)
+        self.sudo().search([('date', '<', limit)]).unlink()
+
+
+class OHAppraisalPerfReport(models.Model):
+    _name = 'oh.appraisal.perf.report'
+    _description = 'Appraisal Pipeline Timing Percentiles'
+    _auto = False
+    _order = 'stage'
+
+    stage = fields.Selection(PERF_STAGES, string='Stage', readonly=True)
+    sample_count = fields.Integer(string='Samples', readonly=True)
+    p50_ms = fields.Float(string='p50 (ms)', digits=(12, 3), readonly=True)
+    p95_ms = fields.Float(string='p95 (ms)', digits=(12, 3), readonly=True)
+    p99_ms = fields.Float(string='p99 (ms)', digits=(12, 3), readonly=True)
+    max_ms = fields.Float(string='Max (ms)', digits=(12, 3), readonly=True)
+    avg_queries = fields.Float(string='Avg Queries', digits=(12, 1), readonly=True)
+    p95_queries = fields.Float(string='p95 Queries', digits=(12, 1), readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT
+                    row_number() OVER (ORDER BY stage) AS id,
+                    stage,
+                    count(*) AS sample_count,
+                    percentile_cont(0.50) WITHIN GROUP (ORDER BY duration_ms) AS p50_ms,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms) AS p95_ms,
+                    percentile_cont(0.99) WITHIN GROUP (ORDER BY duration_ms) AS p99_ms,
+                    max(duration_ms) AS max_ms,
+                    avg(query_count) AS avg_queries,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY query_count) AS p95_queries
+                FROM oh_appraisal_perf_sample
+                GROUP BY stage
+            )
+        """ % self._table)
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, _
+import logging
+_logger = logging.getLogger(__name__)
+
+
+class OHAppraisalQuestionBinding(models.Model):
+    _name = 'oh.appraisal.question.binding'
+    _description = 'Survey Question to Template Item Binding'
+    _order = 'survey_id, question_id, template_id, id'
+    _rec_name = 'item_code'
+
+    question_id = fields.Many2one('survey.question', string='Question', required=True, ondelete='cascade', index=True)
+    survey_id = fields.Many2one('survey.survey', string='Survey', related='question_id.survey_id', store=True, index=True)
+    template_line_id = fields.Many2one('oh.appraisal.template.line', string='Template Item', required=True,
+                                       ondelete='cascade', index=True)
+    template_id = fields.Many2one('oh.appraisal.template', string='Template', related='template_line_id.template_id',
+                                  store=True, index=True)
+    item_code = fields.Char(string='Item Code', compute='_compute_item_code', store=True, index=True,
+                            help="Code the scoring engine uses for the template item (code, else name, else id).")
+    match_type = fields.Selection([
+        ('auto', 'Generated from Codes'),
+        ('manual', 'Manual'),
+    ], string='Origin', default='manual', required=True)
+    active = fields.Boolean(default=True)
+
+    _sql_constraints = [
+        ('question_line_uniq', 'unique(question_id, template_line_id)',
+         'This question is already bound to this template item.'),
+    ]
+
+    @api.depends('template_line_id.code', 'template_line_id.name')
+    def _compute_item_code(self):
+        for rec in self:
+            rec.item_code = rec.template_line_id._get_item_code() if rec.template_line_id else False
+
+    # ------------- Generation --------------
+    @api.model
+    def _get_appraisal_surveys(self):
+        """Surveys answered for at least one appraisal."""
+        groups = self.env['survey.user_input'].sudo()._read_group(
+            [('appraisal_id', '!=', False)], ['survey_id'])
+        return self.env['survey.survey'].browse([survey.id for survey, in groups if survey])
+
+    @api.model
+    def generate_bindings(self, surveys=None, lines=None):
+        """
+        Create 'auto' bindings between the questions of ``surveys`` (default: every
+        survey used by an appraisal) and the template lines (default: all) whose
+        item code equals the question's key. Auto bindings that no longer match
+        are removed; manual bindings are never touched. Returns the number of
+        bindings created.
+        """
+        surveys = self._get_appraisal_surveys() if surveys is None else surveys
+        if not surveys:
+            return 0
+        questions = self.env['survey.question'].sudo().search([('survey_id', 'in', surveys.ids)])
+        if lines is None:
+            lines = self.env['oh.appraisal.template.line'].sudo().search([])
+        Appraisal = self.env['hr.appraisal']
+        lines_by_code = {}
+        for line in lines:
+            lines_by_code.setdefault(line._get_item_code(), []).append(line.id)
+
+        existing = self.sudo().with_context(active_test=False).search([
+            ('question_id', 'in', questions.ids),
+            ('template_line_id', 'in', lines.ids),
+        ])
+        existing_pairs = {(b.question_id.id, b.template_line_id.id): b for b in existing}
+
+        wanted = set()
+        for question in questions:
+            for line_id in lines_by_code.get(Appraisal._survey_item_key(question), ()):
+                wanted.add((question.id, line_id))
+
+        stale = existing.filtered(lambda b: b.match_type == 'auto'
+                                  and (b.question_id.id, b.template_line_id.id) not in wanted)
+        stale.unlink()
+        to_create = [
+            {'question_id': question_id, 'template_line_id': line_id, 'match_type': 'auto'}
+            for question_id, line_id in sorted(wanted - set(existing_pairs))
+        ]
+        self.sudo().create(to_create)
+        if to_create or stale:
+            _logger.info("Question bindings: %s created, %s removed", len(to_create), len(stale))
+        return len(to_create)
+
+    @api.model
+    def _ensure_bindings(self, surveys):
+        """Generate bindings for the surveys in ``surveys`` that have none yet (e.g. right after install)."""
+        if not surveys:
+            return
+        bound = {survey.id for survey, in self.sudo()._read_group([('survey_id', 'in', surveys.ids)], ['survey_id'])}
+        missing = surveys.filtered(lambda s: s.id not in bound)
+        if missing:
+            self.generate_bindings(surveys=missing)
+
+    def action_generate_bindings(self):
+        count = self.generate_bindings()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Question bindings generated"),
+                'message': _("%s new bindings were created from matching codes.") % count,
+                'type': 'success',
+                'sticky': False,
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            },
+        }
+
+    @api.model
+    def _question_item_codes(self, question_ids):
+        """{question_id: [item_code, ...]} of the active bindings, in one query."""
+        if not question_ids:
+            return {}
+        self.flush_model(['question_id', 'item_code', 'active'])
+        self.env.cr.execute("""
+            SELECT DISTINCT question_id, item_code
+              FROM oh_appraisal_question_binding
+             WHERE active AND question_id IN %s AND item_code IS NOT NULL
+        """, (tuple(question_ids),))
+        result = {}
+        for question_id, code in self.env.cr.fetchall():
+            result.setdefault(question_id, []).append(code)
+        return result
+
+
+class OHAppraisalBindingReport(models.TransientModel):
+    _name = 'oh.appraisal.binding.report'
+    _description = 'Question Binding Validation Report'
+
+    line_ids = fields.One2many('oh.appraisal.binding.report.line', 'report_id', string='Issues', readonly=True)
+    issue_count = fields.Integer(string='Issues', compute='_compute_issue_count')
+
+    @api.depends('line_ids')
+    def _compute_issue_count(self):
+        for rec in self:
+            rec.issue_count = len(rec.line_ids)
+
+    @api.model
+    def _collect_issues(self, surveys=None):
+        """
+        Problems that make answers get lost or scored against the wrong item:
+         - questions of appraisal surveys bound to no template item,
+         - template items no question is bound to,
+         - several questions of one survey sharing an item key,
+         - several lines of one template sharing an item code (only the last is scored).
+        """
+        Binding = self.env['oh.appraisal.question.binding'].sudo()
+        Appraisal = self.env['hr.appraisal']
+        surveys = Binding._get_appraisal_surveys() if surveys is None else surveys
+        questions = self.env['survey.question'].sudo().search([('survey_id', 'in', surveys.ids)])
+        lines = self.env['oh.appraisal.template.line'].sudo().search([('template_id.active', '=', True)])
+        bindings = Binding.search([('active', '=', True)])
+        bound_questions = set(bindings.question_id.ids)
+        bound_lines = set(bindings.template_line_id.ids)
+
+        issues = []
+        keys = {}
+        for question in questions:
+            key = Appraisal._survey_item_key(question)
+            keys.setdefault((question.survey_id.id, key), []).append(question)
+            if question.id not in bound_questions:
+                issues.append({'issue': 'unmatched_question', 'survey_id': question.survey_id.id,
+                               'question_id': question.id, 'code': key})
+        for (survey_id, key), same in keys.items():
+            if len(same) > 1:
+                for question in same:
+                    issues.append({'issue': 'duplicate_question_code', 'survey_id': survey_id,
+                                   'question_id': question.id, 'code': key})
+        codes = {}
+        for line in lines:
+            code = line._get_item_code()
+            codes.setdefault((line.template_id.id, code), []).append(line)
+            if line.id not in bound_lines:
+                issues.append({'issue': 'unmatched_line', 'template_id': line.template_id.id,
+                               'template_line_id': line.id, 'code': code})
+        for (template_id, code), same in codes.items():
+            if len(same) > 1:
+                for line in same:
+                    issues.append({'issue': 'duplicate_line_code', 'template_id': template_id,
+                                   'template_line_id': line.id, 'code': code})
+        return issues
+
+    @api.model
+    def action_open_report(self):
+        report = self.create({'line_ids': [(0, 0, vals) for vals in self._collect_issues()]})
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Question Binding Validation"),
+            'res_model': self._name,
+            'res_id': report.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+
+class OHAppraisalBindingReportLine(models.TransientModel):
+    _name = 'oh.appraisal.binding.report.line'
+    _description = 'Question Binding Validation Issue'
+    _order = 'issue, code'
+
+    report_id = fields.Many2one('oh.appraisal.binding.report', required=True, ondelete='cascade')
+    issue = fields.Selection([
+        ('unmatched_question', 'Question without template item'),
+        ('unmatched_line', 'Template item without question'),
+        ('duplicate_question_code', 'Duplicate question key in survey'),
+        ('duplicate_line_code', 'Duplicate item code in template'),
+    ], string='Issue', required=True)
+    code = fields.Char(string='Code')
+    survey_id = fields.Many2one('survey.survey', string='Survey')
+    question_id = fields.Many2one('survey.question', string='Question')
+    template_id = fields.Many2one('oh.appraisal.template', string='Template')
+    template_line_id = fields.Many2one('oh.appraisal.template.line', string='Template Item')
+
+
+class SurveyQuestionInherited(models.Model):
+    _inherit = 'survey.question'
+
+    def _refresh_appraisal_bindings(self):
+        """Regenerate auto bindings for the appraisal surveys (those already bound) of these questions."""
+        Binding = self.env['oh.appraisal.question.binding'].sudo()
+        surveys = self.survey_id
+        if not surveys:
+            return
+        bound = Binding._read_group([('survey_id', 'in', surveys.ids)], ['survey_id'])
+        if bound:
+            Binding.generate_bindings(surveys=self.env['survey.survey'].browse([survey.id for survey, in bound]))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        questions = super().create(vals_list)
+        questions._refresh_appraisal_bindings()
+        return questions
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'variable' in vals or 'survey_id' in vals:
+            self._refresh_appraisal_bindings()
+        return res
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models, tools
+
+_logger = logging.getLogger(__name__)
+
+ARCHIVE_HORIZON_PARAM = 'oh_appraisal_ext.result_archive_months'
+DEFAULT_ARCHIVE_MONTHS = 36
+
+# Columns copied from oh_appraisal_result; data_json, notes and the audit
+# columns are dropped when a result is archived.
+ARCHIVE_COLUMNS = (
+    'name', 'appraisal_id', 'employee_id', 'department_id', 'company_id', 'master_id', 'version_id', 'config_version',
+    'date', 'functional_score', 'role_score', 'common_score', 'final_percentage', 'rating_label', 'state',
+)
+
+
+class OHAppraisalResultArchive(models.Model):
+    _name = 'oh.appraisal.result.archive'
+    _description = 'Archived Appraisal Result (aggregates only)'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    result_ref = fields.Integer(string='Original Result ID', readonly=True, index=True)
+    name = fields.Char(string='Reference', readonly=True)
+    appraisal_id = fields.Many2one('hr.appraisal', string='Appraisal', readonly=True, ondelete='set null')
+    employee_id = fields.Many2one('hr.employee', string='Employee', readonly=True, ondelete='cascade')
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True, ondelete='set null')
+    company_id = fields.Many2one('res.company', string='Company', readonly=True, required=True)
+    master_id = fields.Many2one('oh.appraisal.master', string='Master', readonly=True, ondelete='set null')
+    version_id = fields.Many2one('oh.appraisal.master.version', string='Configuration Version', readonly=True,
+                                 ondelete='set null')
+    config_version = fields.Integer(string='Master Config Version', readonly=True)
+    date = fields.Datetime(string='Date', readonly=True)
+    functional_score = fields.Float(string='Functional (0..100)', digits=(6,2), readonly=True)
+    role_score = fields.Float(string='Role (0..100)', digits=(6,2), readonly=True)
+    common_score = fields.Float(string='Common (0..100)', digits=(6,2), readonly=True)
+    final_percentage = fields.Float(string='Final %', digits=(6,2), readonly=True)
+    rating_label = fields.Char(string='Rating', readonly=True)
+    state = fields.Selection([('draft','Draft'),('confirmed','Confirmed')], readonly=True)
+    archived_on = fields.Datetime(string='Archived On', readonly=True)
+
+    def init(self):
+        cr = self.env.cr
+        tools.create_index(cr, 'oh_appraisal_result_archive_company_employee_date_idx',
+                           self._table, ['company_id', 'employee_id', 'date'])
+        tools.create_index(cr, 'oh_appraisal_result_archive_date_idx', self._table, ['date DESC', 'id DESC'])
+
+    @api.model
+    def _get_horizon_months(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(ARCHIVE_HORIZON_PARAM)
+        try:
+            return int(value) if value else DEFAULT_ARCHIVE_MONTHS
+        except ValueError:
+            _logger.warning("Invalid %s value %r, using %s months", ARCHIVE_HORIZON_PARAM, value, DEFAULT_ARCHIVE_MONTHS)
+            return DEFAULT_ARCHIVE_MONTHS
+
+    @api.model
+    def _archive_results(self, before, batch_size=5000):
+        """
+        Move one batch of results dated before ``before`` to the archive: a
+        single statement deletes them, inserts the archive rows and points the
+        appraisals whose current result was moved at its archive row, so a
+        result is never in both tables. The appraisals keep their final_*
+        values; result_id is emptied. Returns the number of results moved.
+        """
+        Result = self.env['oh.appraisal.result']
+        Result.flush_model()
+        self.env['hr.appraisal'].flush_model(['result_id', 'result_archive_id'])
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        self.env.cr.execute("""
+            WITH moved AS (
+                DELETE FROM oh_appraisal_result
+                 WHERE id IN (SELECT id FROM oh_appraisal_result
+                               WHERE date < %%s
+                            ORDER BY date, id
+                               LIMIT %%s)
+             RETURNING id, %s
+            ),
+            archived AS (
+                INSERT INTO oh_appraisal_result_archive (result_ref, %s, archived_on)
+                SELECT id, %s, (now() at time zone 'UTC') FROM moved
+             RETURNING id, result_ref
+            ),
+            relinked AS (
+                UPDATE hr_appraisal a
+                   SET result_archive_id = ar.id,
+                       result_id = NULL
+                  FROM archived ar
+                 WHERE a.result_id = ar.result_ref
+             RETURNING a.id
+            )
+            SELECT (SELECT count(*) FROM archived), (SELECT count(*) FROM relinked)
+        """ % (columns, columns, columns), (before, batch_size))
+        moved, relinked = self.env.cr.fetchone()
+        if moved:
+            Result.invalidate_model()
+        if relinked:
+            self.env['hr.appraisal'].invalidate_model(['result_id', 'result_archive_id'])
+        return moved
+
+    @api.model
+    def _cron_archive_results(self, batch_size=5000, max_batches=20):
+        """
+        Archive results older than the horizon (system parameter
+        oh_appraisal_ext.result_archive_months, default 36). Runs at most
+        ``max_batches`` batches and asks the scheduler to come back for the rest.
+        """
+        before = fields.Datetime.subtract(fields.Datetime.now(), months=self._get_horizon_months())
+        total = 0
+        for _batch in range(max_batches):
+            moved = self._archive_results(before, batch_size=batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+        remaining = self.env['oh.appraisal.result'].search_count([('date', '<', before)]) if total else 0
+        if total:
+            _logger.info("Archived %s appraisal results dated before %s (%s remaining)", total, before, remaining)
+        self.env['ir.cron']._notify_progress(done=total, remaining=remaining)
+        return total
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+DISTRIBUTION_CYCLE_PARAM = 'oh_appraisal_ext.distribution_cycle'
+EXACT_LIMIT_PARAM = 'oh_appraisal_ext.distribution_exact_limit'
+DEFAULT_EXACT_LIMIT = 50000
+REFRESH_QUEUE_KEY = 'oh_appraisal_ext.percentile_refresh'
+# First key of the two-key advisory locks taken per company while its percentiles are refreshed
+REFRESH_LOCK_NAMESPACE = 0x4F50
+
+# Scores live in 0..100, so a fixed-width histogram is a quantile sketch whose
+# rank error is bounded by one bin (0.1 percentage point).
+SKETCH_BINS = 1000
+SKETCH_BIN_SQL = "LEAST(GREATEST(width_bucket(COALESCE(final_percentage, 0), 0, 100, %d), 1), %d)" % (
+    SKETCH_BINS, SKETCH_BINS)
+
+# A result counts while its appraisal points to it: older versions and
+# superseded results of the same appraisal are left out.
+CURRENT_RESULT_SQL = """
+    EXISTS (SELECT 1 FROM hr_appraisal a WHERE a.result_id = oh_appraisal_result.id)
+"""
+
+# Current confirmed results of the cycle in the companies being refreshed
+CYCLE_RESULTS_SQL = """
+    SELECT id, company_id, department_id, final_percentage, """ + SKETCH_BIN_SQL + """ AS bin
+      FROM oh_appraisal_result
+     WHERE company_id = ANY(%(company_ids)s::int[])
+       AND state = 'confirmed'
+       AND date >= %(start)s AND date < %(end)s
+       AND """ + CURRENT_RESULT_SQL + """
+"""
+
+
+class OHAppraisalDistribution(models.AbstractModel):
+    _name = 'oh.appraisal.distribution'
+    _description = 'Appraisal Result Distribution Service'
+
+    @api.model
+    def _cycle_bounds(self, day=None):
+        """[start, end) of the cycle containing ``day`` (default today); the cycle length is a system parameter."""
+        granularity = self.env['ir.config_parameter'].sudo().get_param(DISTRIBUTION_CYCLE_PARAM, 'year')
+        if granularity not in ('year', 'quarter', 'month'):
+            granularity = 'year'
+        day = day or fields.Date.context_today(self)
+        start = fields.Date.start_of(day, granularity)
+        return start, fields.Date.add(fields.Date.end_of(day, granularity), days=1)
+
+    @api.model
+    def _exact_limit(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(EXACT_LIMIT_PARAM)
+        try:
+            return int(value) if value else DEFAULT_EXACT_LIMIT
+        except ValueError:
+            return DEFAULT_EXACT_LIMIT
+
+    # ------------- Incremental refresh --------------
+    @api.model
+    def _queue_refresh(self, company_ids):
+        """
+        Have the percentile cron refresh the current cycle soon after the
+        transaction commits, once however many results of ``company_ids`` were
+        confirmed in it: the ranking runs outside the user's transaction.
+        """
+        if not any(company_ids):
+            return
+        cr = self.env.cr
+        if cr.precommit.data.get(REFRESH_QUEUE_KEY):
+            return
+        cr.precommit.data[REFRESH_QUEUE_KEY] = True
+        cron = self.env.ref('oh_appraisal_ext.ir_cron_refresh_percentiles', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def refresh_percentiles(self, company_ids=None, day=None):
+        """
+        Recompute department and company percentile ranks of the current
+        confirmed results (the ones their appraisal points to) of the cycle containing ``day``, for ``company_ids`` (default: all), and
+        rebuild their sketches. Companies whose cycle population is at most the
+        exact limit (system parameter oh_appraisal_ext.distribution_exact_limit)
+        are ranked with percent_rank(); larger ones are ranked from the histogram
+        sketch, which needs no sort. Only rows whose percentile changed are written.
+        Returns the number of results updated.
+        """
+        Result = self.env['oh.appraisal.result']
+        Result.flush_model(['company_id', 'department_id', 'state', 'date', 'final_percentage'])
+        self.env['hr.appraisal'].flush_model(['result_id'])
+        start, end = self._cycle_bounds(day)
+        params = {
+            'start': fields.Datetime.to_string(start),
+            'end': fields.Datetime.to_string(end),
+            'now': fields.Datetime.now(),
+        }
+        if company_ids is None:
+            self.env.cr.execute("""
+                SELECT DISTINCT company_id FROM oh_appraisal_result
+                 WHERE company_id IS NOT NULL AND state = 'confirmed'
+                   AND date >= %(start)s AND date < %(end)s
+            """, params)
+            company_ids = [row[0] for row in self.env.cr.fetchall()]
+        company_ids = sorted(set(company_ids))
+        if not company_ids:
+            return 0
+        # a concurrent refresh of the same companies waits here instead of
+        # interleaving its ranking and sketch rebuild with this one
+        self.env.cr.execute("""
+            SELECT pg_advisory_xact_lock(%s, s.id)
+              FROM (SELECT unnest(%s::int[]) AS id ORDER BY 1) s
+        """, (REFRESH_LOCK_NAMESPACE, company_ids))
+        params['company_ids'] = company_ids
+        self.env.cr.execute("""
+            SELECT company_id, count(*) FROM (""" + CYCLE_RESULTS_SQL + """) cycle GROUP BY company_id
+        """, params)
+        populations = dict(self.env.cr.fetchall())
+        limit = self._exact_limit()
+        exact = [company_id for company_id, count in populations.items() if count <= limit]
+        approximate = [company_id for company_id, count in populations.items() if count > limit]
+
+        updated = self._clear_superseded(params)
+        if exact:
+            updated += self._update_exact(dict(params, company_ids=exact))
+        if approximate:
+            updated += self._update_from_sketch(dict(params, company_ids=approximate))
+        self.env['oh.appraisal.distribution.sketch']._rebuild(company_ids, start, params)
+        if updated:
+            Result.invalidate_model(['department_percentile', 'company_percentile', 'percentile_date'])
+        _logger.debug("Refreshed percentiles of %s results (%s exact, %s sketched companies)",
+                      updated, len(exact), len(approximate))
+        return updated
+
+    @api.model
+    def _clear_superseded(self, params):
+        """Drop the percentiles of the cycle's results that left the ranked population (superseded or unconfirmed)."""
+        self.env.cr.execute("""
+            UPDATE oh_appraisal_result
+               SET department_percentile = NULL,
+                   company_percentile = NULL,
+                   percentile_date = NULL
+             WHERE company_id = ANY(%(company_ids)s::int[])
+               AND date >= %(start)s AND date < %(end)s
+               AND (department_percentile IS NOT NULL OR company_percentile IS NOT NULL)
+               AND NOT (state = 'confirmed' AND """ + CURRENT_RESULT_SQL + """)
+        """, params)
+        return self.env.cr.rowcount
+
+    @api.model
+    def _update_exact(self, params):
+        self.env.cr.execute("""
+            WITH cycle AS (""" + CYCLE_RESULTS_SQL + """),
+                 ranked AS (
+                    SELECT id,
+                           ROUND((100 * percent_rank() OVER (PARTITION BY company_id, department_id
+                                                             ORDER BY final_percentage))::numeric, 2)::float AS dept_pct,
+                           ROUND((100 * percent_rank() OVER (PARTITION BY company_id
+                                                             ORDER BY final_percentage))::numeric, 2)::float AS company_pct
+                      FROM cycle
+                 )
+            UPDATE oh_appraisal_result r
+               SET department_percentile = k.dept_pct,
+                   company_percentile = k.company_pct,
+                   percentile_date = %(now)s
+              FROM ranked k
+             WHERE r.id = k.id
+               AND (r.department_percentile IS DISTINCT FROM k.dept_pct
+                    OR r.company_percentile IS DISTINCT FROM k.company_pct)
+        """, params)
+        return self.env.cr.rowcount
+
+    @api.model
+    def _update_from_sketch(self, params):
+        """
+        Percentile rank from per-bin counts: the results below the bin plus half
+        of the bin's other results (mid-rank), over the population minus one,
+        the same scale as percent_rank().
+        """
+        self.env.cr.execute("""
+            WITH cycle AS (""" + CYCLE_RESULTS_SQL + """),
+                 dept_bins AS (
+                    SELECT company_id, department_id, bin, count(*) AS n
+                      FROM cycle GROUP BY company_id, department_id, bin
+                 ),
+                 dept_cum AS (
+                    SELECT b.*, SUM(n) OVER (PARTITION BY company_id, department_id ORDER BY bin) - n AS below,
+                           SUM(n) OVER (PARTITION BY company_id, department_id) AS total
+                      FROM dept_bins b
+                 ),
+                 company_bins AS (
+                    SELECT company_id, bin, count(*) AS n
+                      FROM cycle GROUP BY company_id, bin
+                 ),
+                 company_cum AS (
+                    SELECT b.*, SUM(n) OVER (PARTITION BY company_id ORDER BY bin) - n AS below,
+                           SUM(n) OVER (PARTITION BY company_id) AS total
+                      FROM company_bins b
+                 ),
+                 ranked AS (
+                    SELECT c.id,
+                           CASE WHEN d.total > 1
+                                THEN ROUND((100.0 * (d.below + (d.n - 1) / 2.0) / (d.total - 1))::numeric, 2)::float
+                                ELSE 0.0 END AS dept_pct,
+                           CASE WHEN k.total > 1
+                                THEN ROUND((100.0 * (k.below + (k.n - 1) / 2.0) / (k.total - 1))::numeric, 2)::float
+                                ELSE 0.0 END AS company_pct
+                      FROM cycle c
+                      JOIN dept_cum d ON d.company_id = c.company_id
+                                     AND d.department_id IS NOT DISTINCT FROM c.department_id
+                                     AND d.bin = c.bin
+                      JOIN company_cum k ON k.company_id = c.company_id AND k.bin = c.bin
+                 )
+            UPDATE oh_appraisal_result r
+               SET department_percentile = k.dept_pct,
+                   company_percentile = k.company_pct,
+                   percentile_date = %(now)s
+              FROM ranked k
+             WHERE r.id = k.id
+               AND (r.department_percentile IS DISTINCT FROM k.dept_pct
+                    OR r.company_percentile IS DISTINCT FROM k.company_pct)
+        """, params)
+        return self.env.cr.rowcount
+
+    @api.model
+    def _cron_refresh_percentiles(self):
+        """Full pass over the current cycle: triggered by confirmed results, and daily for writes outside the ORM."""
+        return self.refresh_percentiles()
+
+    # ------------- Histograms --------------
+    @api.model
+    def rating_histogram(self, company_ids=None, department_ids=None, date_from=None, date_to=None):
+        """
+        [(rating_label, count)] of the current confirmed results (the population
+        the percentiles rank), most frequent first; the dates default to the
+        current cycle.
+        """
+        start, end = self._cycle_bounds()
+        domain = [
+            ('state', '=', 'confirmed'),
+            ('current_appraisal_ids', '!=', False),
+            ('date', '>=', date_from or start),
+            ('date', '<', fields.Date.add(date_to, days=1) if date_to else end),
+        ]
+        if company_ids:
+            domain.append(('company_id', 'in', list(company_ids)))
+        if department_ids:
+            domain.append(('department_id', 'in', list(department_ids)))
+        groups = self.env['oh.appraisal.result']._read_group(domain, ['rating_label'], ['__count'])
+        return sorted(((label or '', count) for label, count in groups), key=lambda item: (-item[1], item[0]))
+
+
+class OHAppraisalDistributionSketch(models.Model):
+    _name = 'oh.appraisal.distribution.sketch'
+    _description = 'Appraisal Score Distribution Sketch'
+    _order = 'cycle_start desc, company_id, department_id'
+    _log_access = False
+
+    company_id = fields.Many2one('res.company', string='Company', required=True, ondelete='cascade', index=True)
+    department_id = fields.Many2one('hr.department', string='Department', ondelete='cascade',
+                                    help="Empty for the company-wide distribution, which also counts "
+                                         "results of employees without a department.")
+    cycle_start = fields.Date(string='Cycle', required=True, index=True)
+    population = fields.Integer(string='Results')
+    bins_json = fields.Text(string='Histogram',
+                            help="Sparse {bin: count} over %s equal bins of 0..100." % SKETCH_BINS)
+    refreshed_on = fields.Datetime(string='Refreshed On')
+    p10 = fields.Float(string='P10 %', digits=(6,2), compute='_compute_quantiles')
+    p50 = fields.Float(string='Median %', digits=(6,2), compute='_compute_quantiles')
+    p90 = fields.Float(string='P90 %', digits=(6,2), compute='_compute_quantiles')
+
+    @api.depends('bins_json')
+    def _compute_quantiles(self):
+        for rec in self:
+            rec.p10, rec.p50, rec.p90 = rec.quantiles((0.1, 0.5, 0.9))
+
+    def quantiles(self, qs):
+        """Approximate score (0..100) at each quantile in ``qs``, to within one bin."""
+        self.ensure_one()
+        bins = sorted((int(b), n) for b, n in json.loads(self.bins_json or '{}').items())
+        total = sum(n for _b, n in bins)
+        result = []
+        for q in qs:
+            if not total:
+                result.append(0.0)
+                continue
+            target = q * total
+            seen = 0
+            value = 100.0
+            for b, n in bins:
+                seen += n
+                if seen >= target:
+                    value = (b - 0.5) * 100.0 / SKETCH_BINS
+                    break
+            result.append(round(value, 2))
+        return result
+
+    @api.model
+    def _rebuild(self, company_ids, cycle_start, params):
+        """Replace the sketches of ``company_ids`` for the cycle from one GROUP BY over its results."""
+        self.env.cr.execute("""
+            WITH cycle AS (""" + CYCLE_RESULTS_SQL + """)
+            SELECT company_id, department_id, GROUPING(department_id) = 1 AS company_wide, bin, count(*)
+              FROM cycle
+          GROUP BY GROUPING SETS ((company_id, bin), (company_id, department_id, bin))
+        """, params)
+        sketches = {}
+        for company_id, department_id, company_wide, bin_, count in self.env.cr.fetchall():
+            if not company_wide and not department_id:
+                # results without a department only count in the company-wide sketch
+                continue
+            sketches.setdefault((company_id, department_id), {})[bin_] = count
+
+        Sketch = self.sudo()
+        Sketch.search([('company_id', 'in', company_ids), ('cycle_start', '=', cycle_start)]).unlink()
+        vals_list = []
+        for (company_id, department_id), bins in sketches.items():
+            vals_list.append({
+                'company_id': company_id,
+                'department_id': department_id or False,
+                'cycle_start': cycle_start,
+                'population': sum(bins.values()),
+                'bins_json': json.dumps(bins, separators=(',', ':')),
+                'refreshed_on': params['now'],
+            })
+        Sketch.create(vals_list)
+        return len(vals_list)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import csv
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = [
+    ('id', 'ID'),
+    ('reference', 'Reference'),
+    ('employee', 'Employee'),
+    ('company', 'Company'),
+    ('master', 'Master'),
+    ('version', 'Config Version'),
+    ('date', 'Date'),
+    ('functional_score', 'Functional %'),
+    ('role_score', 'Role %'),
+    ('common_score', 'Common %'),
+    ('final_percentage', 'Final %'),
+    ('rating_label', 'Rating'),
+    ('state', 'Status'),
+]
+
+# Bytes read at a time when hashing and copying a finished export
+COPY_BLOCK_SIZE = 1024 * 1024
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _flat_breakdown(breakdown):
+    """Compact {category: {code: percent}} used in the tabular formats."""
+    return json.dumps({
+        category: {code: item.get('percent') for code, item in items.items()}
+        for category, items in breakdown.items()
+    }, separators=(',', ':'))
+
+
+class OHAppraisalResultExport(models.TransientModel):
+    _name = 'oh.appraisal.result.export'
+    _description = 'Streaming Export of Appraisal Results'
+
+    date_from = fields.Date(string='From')
+    date_to = fields.Date(string='To')
+    company_ids = fields.Many2many('res.company', string='Companies',
+                                   default=lambda self: self.env.companies,
+                                   help="Leave empty to export every company you have access to.")
+    file_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+        ('jsonl', 'JSON Lines'),
+    ], string='Format', required=True, default='csv')
+    include_breakdown = fields.Boolean(string='Include Item Breakdown', default=False,
+                                       help="Decode each result's item scores. Slower; the breakdown is a JSON column in CSV/XLSX.")
+    chunk_size = fields.Integer(string='Chunk Size', default=2000,
+                                help="Number of results loaded at a time. Memory use depends on this, not on the total.")
+    row_count = fields.Integer(string='Exported Rows', readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string='File', readonly=True)
+
+    def _get_domain(self):
+        domain = []
+        if self.date_from:
+            domain.append(('date', '>=', fields.Datetime.to_string(self.date_from)))
+        if self.date_to:
+            domain.append(('date', '<', fields.Datetime.to_string(fields.Date.add(self.date_to, days=1))))
+        if self.company_ids:
+            domain.append(('company_id', 'in', self.company_ids.ids))
+        return domain
+
+    # ------------- Writers --------------
+    def _write_csv(self, rows, path):
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.writer(fh)
+            header = [label for _key, label in EXPORT_COLUMNS]
+            if self.include_breakdown:
+                header.append('Breakdown')
+            writer.writerow(header)
+            for row in rows:
+                values = [row[key] for key, _label in EXPORT_COLUMNS]
+                if self.include_breakdown:
+                    values.append(_flat_breakdown(row['breakdown']))
+                writer.writerow(values)
+                count += 1
+        return count
+
+    def _write_jsonl(self, rows, path):
+        count = 0
+        with open(path, 'w', encoding='utf-8') as fh:
+            for row in rows:
+                fh.write(json.dumps(row, separators=(',', ':'), default=str))
+                fh.write('\n')
+                count += 1
+        return count
+
+    def _write_xlsx(self, rows, path):
+        import xlsxwriter
+        # constant_memory flushes each row to disk once the next one starts
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        sheet = workbook.add_worksheet(_('Results'))
+        header = [label for _key, label in EXPORT_COLUMNS]
+        if self.include_breakdown:
+            header.append('Breakdown')
+        sheet.write_row(0, 0, header)
+        count = 0
+        for count, row in enumerate(rows, start=1):
+            values = [row[key] for key, _label in EXPORT_COLUMNS]
+            if self.include_breakdown:
+                values.append(_flat_breakdown(row['breakdown']))
+            sheet.write_row(count, 0, values)
+        workbook.close()
+        return count
+
+    # ------------- Attachment storage --------------
+    def _store_file(self, path, filename):
+        """
+        Attach the file at ``path`` to the wizard without holding it in memory.
+        With filestore storage it is copied block by block to the path
+        ir.attachment._file_write would use (same checksum, deduplication and
+        garbage collection) and the attachment is created on it, without the
+        content indexing that would read the file again and keep a second copy
+        of it in the database. Database storage needs the bytes: they are read
+        once, under a binary mimetype so they are not indexed either.
+        """
+        Attachment = self.env['ir.attachment']
+        mimetype = EXPORT_MIMETYPES[self.file_format]
+        vals = {
+            'name': filename,
+            'res_model': self._name,
+            'res_id': self.id,
+        }
+        if Attachment._storage() != 'file':
+            with open(path, 'rb') as fh:
+                attachment = Attachment.create(dict(vals, raw=fh.read(), mimetype='application/octet-stream'))
+            attachment.mimetype = mimetype
+            return attachment
+
+        sha = hashlib.sha1()
+        with open(path, 'rb') as fh:
+            for block in iter(lambda: fh.read(COPY_BLOCK_SIZE), b''):
+                sha.update(block)
+        checksum = sha.hexdigest()
+        fname, full_path = Attachment._get_path(b'', checksum)
+        if not os.path.exists(full_path):
+            with open(path, 'rb') as src, open(full_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_BLOCK_SIZE)
+            Attachment._mark_for_gc(fname)
+        return Attachment.create(dict(vals, mimetype=mimetype, store_fname=fname, checksum=checksum,
+                                      file_size=os.path.getsize(path)))
+
+    def _run_export(self, domain):
+        """Stream the results matching ``domain`` to a temporary file and attach it."""
+        self.ensure_one()
+        if self.chunk_size <= 0:
+            raise UserError(_("The chunk size must be positive."))
+        rows = self.env['oh.appraisal.result'].iter_export_rows(
+            domain, with_breakdown=self.include_breakdown, chunk_size=self.chunk_size)
+        writer = getattr(self, '_write_%s' % self.file_format)
+        filename = 'appraisal_results_%s.%s' % (fields.Date.to_string(fields.Date.context_today(self)), self.file_format)
+
+        fd, path = tempfile.mkstemp(suffix='.' + self.file_format)
+        os.close(fd)
+        try:
+            count = writer(rows, path)
+            attachment = self._store_file(path, filename)
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+        _logger.info("Exported %s appraisal results to %s", count, filename)
+        self.write({'row_count': count, 'attachment_id': attachment.id})
+        return attachment
+
+    def action_export(self):
+        attachment = self._run_export(self._get_domain())
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % attachment.id,
+            'target': 'self',
+        }
+
+    @api.model
+    def export_results(self, domain=None, file_format='jsonl', include_breakdown=False, chunk_size=2000):
+        """Programmatic entry point: stream results matching ``domain`` into an attachment and return it."""
+        wizard = self.create({
+            'file_format': file_format,
+            'include_breakdown': include_breakdown,
+            'chunk_size': chunk_size,
+            'company_ids': [(5, 0, 0)],
+        })
+        return wizard._run_export(domain or [])
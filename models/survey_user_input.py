@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+import logging
+_logger = logging.getLogger(__name__)
+
+
+class SurveyUserInputInherited(models.Model):
+    _inherit = 'survey.user_input'
+
+    def _mark_done(self):
+        res = super(SurveyUserInputInherited, self)._mark_done()
+        appraisal_inputs = self.filtered('appraisal_id')
+        if appraisal_inputs:
+            try:
+                # the provisional score is a convenience: never block a submission on it
+                with self.env.cr.savepoint():
+                    appraisal_inputs.appraisal_id.sudo()._apply_survey_inputs(appraisal_inputs.sudo())
+            except Exception as e:
+                _logger.exception("Failed to update provisional appraisal score for responses %s: %s",
+                                  appraisal_inputs.ids, e)
+        return res
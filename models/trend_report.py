@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+TREND_GRANULARITIES = [
+    ('year', 'Year'),
+    ('quarter', 'Quarter'),
+    ('month', 'Month'),
+]
+
+# Live and archived confirmed results of the period, one per appraisal: the
+# result the appraisal points to, live or archived. The department is the one
+# the result was scored in, not the employee's current one.
+TREND_SOURCE_SQL = """
+    SELECT r.employee_id, r.company_id, r.department_id, r.date, r.final_percentage
+      FROM oh_appraisal_result r
+      JOIN hr_appraisal a ON a.result_id = r.id
+     WHERE r.state = 'confirmed'
+       AND r.date >= %(date_from)s AND r.date < %(date_to)s
+       AND (%(all_companies)s OR r.company_id = ANY(%(company_ids)s::int[]))
+ UNION ALL
+    SELECT ar.employee_id, ar.company_id, ar.department_id, ar.date, ar.final_percentage
+      FROM oh_appraisal_result_archive ar
+      JOIN hr_appraisal a ON a.result_archive_id = ar.id
+     WHERE ar.state = 'confirmed'
+       AND ar.date >= %(date_from)s AND ar.date < %(date_to)s
+       AND (%(all_companies)s OR ar.company_id = ANY(%(company_ids)s::int[]))
+"""
+
+# One score per employee and cycle (the average when a cycle holds several results)
+TREND_CYCLE_SQL = """
+    SELECT s.employee_id, s.company_id, s.department_id,
+           date_trunc(%(granularity)s, s.date) AS period_start,
+           AVG(s.final_percentage) AS score
+      FROM source s
+  GROUP BY s.employee_id, s.company_id, s.department_id, date_trunc(%(granularity)s, s.date)
+"""
+
+class OHAppraisalTrendSnapshot(models.Model):
+    _name = 'oh.appraisal.trend.snapshot'
+    _description = 'Materialized Appraisal Trend Report'
+    _order = 'create_date desc, id desc'
+
+    date_from = fields.Date(string='From', required=True, readonly=True)
+    date_to = fields.Date(string='To', required=True, readonly=True)
+    granularity = fields.Selection(TREND_GRANULARITIES, string='Cycle', required=True, readonly=True)
+    window_size = fields.Integer(string='Rolling Window (cycles)', required=True, readonly=True)
+    company_key = fields.Char(string='Companies', readonly=True, index=True,
+                              help="Sorted ids of the companies covered, empty for all.")
+    source_signature = fields.Char(string='Source Signature', readonly=True,
+                                   help="Row counts and last changes of the results the snapshot was built from.")
+    line_ids = fields.One2many('oh.appraisal.trend.line', 'snapshot_id', string='Lines', readonly=True)
+    line_count = fields.Integer(string='Lines', readonly=True)
+
+    @api.model
+    def _query_params(self, date_from, date_to, granularity, window_size, company_ids):
+        return {
+            'date_from': fields.Datetime.to_string(date_from),
+            'date_to': fields.Datetime.to_string(fields.Date.add(date_to, days=1)),
+            'granularity': granularity,
+            'preceding': max(0, window_size - 1),
+            'all_companies': not company_ids,
+            'company_ids': list(company_ids or []),
+        }
+
+    @api.model
+    def _source_signature(self, params):
+        """
+        Cheap fingerprint of the results in range; any insert, update, archival
+        or appraisal pointing to another result changes it.
+        """
+        self.env['oh.appraisal.result'].flush_model()
+        self.env['oh.appraisal.result.archive'].flush_model()
+        self.env['hr.appraisal'].flush_model(['result_id', 'result_archive_id'])
+        self.env.cr.execute("""
+            SELECT (SELECT concat_ws(':', count(*), max(id), max(write_date))
+                      FROM oh_appraisal_result
+                     WHERE date >= %(date_from)s AND date < %(date_to)s
+                       AND (%(all_companies)s OR company_id = ANY(%(company_ids)s::int[]))),
+                   (SELECT concat_ws(':', count(*), max(id))
+                      FROM oh_appraisal_result_archive
+                     WHERE date >= %(date_from)s AND date < %(date_to)s
+                       AND (%(all_companies)s OR company_id = ANY(%(company_ids)s::int[]))),
+                   (SELECT concat_ws(':', count(*), sum(a.result_id))
+                      FROM hr_appraisal a
+                      JOIN oh_appraisal_result r ON r.id = a.result_id
+                     WHERE r.date >= %(date_from)s AND r.date < %(date_to)s
+                       AND (%(all_companies)s OR r.company_id = ANY(%(company_ids)s::int[])))
+        """, params)
+        return '|'.join(self.env.cr.fetchone())
+
+    @api.model
+    def _get_snapshot(self, date_from, date_to, granularity='year', window_size=3, company_ids=None):
+        """
+        Trend snapshot for the period pair [date_from, date_to], reused as long as
+        the results in range have not changed, otherwise rebuilt in SQL.
+        """
+        if date_from > date_to:
+            raise UserError(_("The start of the period must be before its end."))
+        if window_size < 1:
+            raise UserError(_("The rolling window must cover at least one cycle."))
+        company_ids = sorted(company_ids or [])
+        company_key = ','.join(map(str, company_ids))
+        params = self._query_params(date_from, date_to, granularity, window_size, company_ids)
+        signature = self._source_signature(params)
+        Snapshot = self.sudo()
+        snapshot = Snapshot.search([
+            ('date_from', '=', date_from),
+            ('date_to', '=', date_to),
+            ('granularity', '=', granularity),
+            ('window_size', '=', window_size),
+            ('company_key', '=', company_key or False),
+        ], limit=1)
+        if snapshot and snapshot.source_signature == signature:
+            return snapshot
+        if snapshot:
+            snapshot.line_ids.unlink()
+            snapshot.source_signature = signature
+        else:
+            snapshot = Snapshot.create({
+                'date_from': date_from,
+                'date_to': date_to,
+                'granularity': granularity,
+                'window_size': window_size,
+                'company_key': company_key or False,
+                'source_signature': signature,
+            })
+        snapshot._materialize(params)
+        return snapshot
+
+    def _materialize(self, params):
+        """
+        Fill the snapshot lines with two INSERT ... SELECT statements: per employee
+        and per department, each cycle's score, the delta and rank change against
+        the previous cycle (LAG), the rolling mean over ``window_size`` cycles
+        (AVG OVER) and the rank within the department, resp. company (RANK).
+        """
+        self.ensure_one()
+        self.flush_recordset()
+        cr = self.env.cr
+        params = dict(params, snapshot_id=self.id)
+        cr.execute("""
+            WITH source AS (""" + TREND_SOURCE_SQL + """),
+                 per_cycle AS (""" + TREND_CYCLE_SQL + """),
+                 ranked AS (
+                    SELECT c.*, RANK() OVER (PARTITION BY company_id, department_id, period_start
+                                             ORDER BY score DESC) AS score_rank
+                      FROM per_cycle c
+                 ),
+                 trended AS (
+                    SELECT r.*,
+                           LAG(score) OVER w AS previous_score,
+                           LAG(score_rank) OVER w AS previous_rank,
+                           AVG(score) OVER (w ROWS BETWEEN %(preceding)s PRECEDING AND CURRENT ROW) AS rolling_mean
+                      FROM ranked r
+                    WINDOW w AS (PARTITION BY employee_id, company_id ORDER BY period_start)
+                 )
+            INSERT INTO oh_appraisal_trend_line (snapshot_id, scope, employee_id, department_id, company_id,
+                                                 period_start, score, previous_score, delta, rolling_mean,
+                                                 score_rank, previous_rank, rank_change, headcount)
+            SELECT %(snapshot_id)s, 'employee', employee_id, department_id, company_id,
+                   period_start::date, score, previous_score, score - previous_score, rolling_mean,
+                   score_rank, previous_rank, previous_rank - score_rank, 1
+              FROM trended
+        """, params)
+        employee_lines = cr.rowcount
+        cr.execute("""
+            WITH source AS (""" + TREND_SOURCE_SQL + """),
+                 per_cycle AS (""" + TREND_CYCLE_SQL + """),
+                 departments AS (
+                    SELECT company_id, department_id, period_start,
+                           AVG(score) AS score, COUNT(*) AS headcount
+                      FROM per_cycle
+                  GROUP BY company_id, department_id, period_start
+                 ),
+                 ranked AS (
+                    SELECT d.*, RANK() OVER (PARTITION BY company_id, period_start ORDER BY score DESC) AS score_rank
+                      FROM departments d
+                 ),
+                 trended AS (
+                    SELECT r.*,
+                           LAG(score) OVER w AS previous_score,
+                           LAG(score_rank) OVER w AS previous_rank,
+                           AVG(score) OVER (w ROWS BETWEEN %(preceding)s PRECEDING AND CURRENT ROW) AS rolling_mean
+                      FROM ranked r
+                    WINDOW w AS (PARTITION BY company_id, department_id ORDER BY period_start)
+                 )
+            INSERT INTO oh_appraisal_trend_line (snapshot_id, scope, employee_id, department_id, company_id,
+                                                 period_start, score, previous_score, delta, rolling_mean,
+                                                 score_rank, previous_rank, rank_change, headcount)
+            SELECT %(snapshot_id)s, 'department', NULL, department_id, company_id,
+                   period_start::date, score, previous_score, score - previous_score, rolling_mean,
+                   score_rank, previous_rank, previous_rank - score_rank, headcount
+              FROM trended
+        """, params)
+        self.line_count = employee_lines + cr.rowcount
+        self.env['oh.appraisal.trend.line'].invalidate_model()
+        _logger.info("Materialized trend snapshot %s: %s lines", self.id, self.line_count)
+
+    @api.autovacuum
+    def _gc_snapshots(self):
+        """Drop snapshots built more than 30 days ago; they are rebuilt on demand."""
+        limit = fields.Datetime.subtract(fields.Datetime.now(), days=30)
+        self.sudo().search([('create_date', '<', limit)]).unlink()
+
+    def action_open_lines(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Appraisal Trends"),
+            'res_model': 'oh.appraisal.trend.line',
+            'view_mode': 'list,pivot,graph',
+            'domain': [('snapshot_id', '=', self.id)],
+            'context': {'search_default_filter_employee': 1},
+        }
+
+
+class OHAppraisalTrendLine(models.Model):
+    _name = 'oh.appraisal.trend.line'
+    _description = 'Appraisal Trend Line'
+    _order = 'scope, period_start desc, department_id, score_rank'
+    _log_access = False
+
+    snapshot_id = fields.Many2one('oh.appraisal.trend.snapshot', required=True, ondelete='cascade', index=True)
+    scope = fields.Selection([('employee', 'Employee'), ('department', 'Department')], string='Scope', required=True)
+    employee_id = fields.Many2one('hr.employee', string='Employee', readonly=True)
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    period_start = fields.Date(string='Cycle', readonly=True)
+    score = fields.Float(string='Score %', digits=(6,2), readonly=True, aggregator='avg')
+    previous_score = fields.Float(string='Previous %', digits=(6,2), readonly=True, aggregator='avg')
+    delta = fields.Float(string='Delta', digits=(6,2), readonly=True, aggregator='avg')
+    rolling_mean = fields.Float(string='Rolling Mean %', digits=(6,2), readonly=True, aggregator='avg')
+    score_rank = fields.Integer(string='Rank', readonly=True,
+                                help="Rank within the department (employees) or the company (departments).")
+    previous_rank = fields.Integer(string='Previous Rank', readonly=True)
+    rank_change = fields.Integer(string='Rank Change', readonly=True,
+                                 help="Positive when the rank improved since the previous cycle.")
+    headcount = fields.Integer(string='Employees', readonly=True)
+
+
+class OHAppraisalTrendWizard(models.TransientModel):
+    _name = 'oh.appraisal.trend.wizard'
+    _description = 'Appraisal Trend Report'
+
+    date_from = fields.Date(string='From', required=True,
+                            default=lambda self: fields.Date.subtract(fields.Date.context_today(self), years=5))
+    date_to = fields.Date(string='To', required=True, default=fields.Date.context_today)
+    granularity = fields.Selection(TREND_GRANULARITIES, string='Cycle', required=True, default='year')
+    window_size = fields.Integer(string='Rolling Window (cycles)', required=True, default=3)
+    company_ids = fields.Many2many('res.company', string='Companies',
+                                   default=lambda self: self.env.companies,
+                                   help="Leave empty to compare every company you have access to.")
+
+    def action_open_report(self):
+        self.ensure_one()
+        # snapshots are shared between users: never widen past the companies of this one
+        companies = self.company_ids or self.env.user.company_ids
+        snapshot = self.env['oh.appraisal.trend.snapshot']._get_snapshot(
+            self.date_from, self.date_to, self.granularity, self.window_size, companies.ids)
+        return snapshot.action_open_lines()
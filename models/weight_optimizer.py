@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import time
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import float_compare
+
+from ..lib import weight_search
+
+_logger = logging.getLogger(__name__)
+
+# Department weightage budget of the functional, role and common weights
+BUDGET_FIELDS = ('functional_weightage', 'role_weightage', 'common_weightage')
+
+
+class OHAppraisalMasterOptimizer(models.Model):
+    _inherit = 'oh.appraisal.master'
+
+    def action_open_weight_optimizer(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Weightage Optimizer"),
+            'res_model': 'oh.appraisal.weight.optimizer',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'default_master_id': self.id},
+        }
+
+
+class OHAppraisalWeightOptimizer(models.TransientModel):
+    _name = 'oh.appraisal.weight.optimizer'
+    _description = 'Weightage Optimizer'
+
+    master_id = fields.Many2one('oh.appraisal.master', string='Master', required=True)
+    target_ids = fields.One2many('oh.appraisal.weight.target', 'optimizer_id', string='Target Distribution')
+    iterations = fields.Integer(string='Candidates to Try', default=200, required=True)
+    item_spread = fields.Float(string='Item Weight Spread %', default=0.0,
+                               help="How far template line weights may move from their configured value "
+                                    "(50 allows x1.5 and /1.5). 0 only tunes the category weights.")
+    budget_margin = fields.Float(string='Budget Margin (points)', default=0.0,
+                                 help="Allowed overshoot of the department weightage budgets, in percentage points.")
+    seed = fields.Integer(string='Seed', default=1, required=True)
+    top_count = fields.Integer(string='Candidates to Keep', default=5, required=True)
+
+    functional_min = fields.Float(string='Functional Min %', readonly=True)
+    functional_max = fields.Float(string='Functional Max %', readonly=True)
+    role_min = fields.Float(string='Role Min %', readonly=True)
+    role_max = fields.Float(string='Role Max %', readonly=True)
+    common_min = fields.Float(string='Common Min %', readonly=True)
+    common_max = fields.Float(string='Common Max %', readonly=True)
+    budget_count = fields.Integer(string='Department Budgets', readonly=True)
+
+    population = fields.Integer(string='Employees', readonly=True)
+    baseline_distance = fields.Float(string='Current Distance %', digits=(5, 2), readonly=True)
+    baseline_distribution = fields.Char(string='Current Distribution', readonly=True)
+    candidate_ids = fields.One2many('oh.appraisal.weight.candidate', 'optimizer_id', string='Candidates', readonly=True)
+    duration_ms = fields.Float(string='Search Time (ms)', digits=(12, 1), readonly=True)
+    searched = fields.Boolean(readonly=True)
+
+    @api.onchange('master_id')
+    def _onchange_master_id(self):
+        if not self.master_id or self.target_ids:
+            return
+        scoring = self.master_id._get_scoring_scale()
+        if scoring:
+            quotas = self.env['oh.appraisal.calibration.run']._default_quota_vals(scoring)
+            self.target_ids = [(0, 0, {'sequence': q['sequence'], 'label': q['label'], 'share_percent': q['quota_percent']})
+                               for q in quotas]
+
+    @api.constrains('target_ids')
+    def _check_targets(self):
+        for rec in self:
+            if rec.target_ids and float_compare(sum(rec.target_ids.mapped('share_percent')), 100.0,
+                                                precision_digits=2) != 0:
+                raise ValidationError(_("The target distribution must add up to 100%."))
+
+    def _get_budget_bounds(self, appraisals):
+        """
+        ((low, high), ...) percents of the functional, role and common weights:
+        the range spanned by the weightage budgets of the departments in the
+        population, widened by the margin. Without any budget, 0 to 100.
+        """
+        employees = appraisals.employee_id
+        configs = self.env['oh.appraisal.department.weightage']._get_configs_by_department(
+            employees.department_id, employees.company_id)
+        configs = list(configs.values())
+        bounds = []
+        for budget_field in BUDGET_FIELDS:
+            values = [config[budget_field] or 0.0 for config in configs]
+            if values:
+                bounds.append((max(0.0, min(values) - self.budget_margin), min(100.0, max(values) + self.budget_margin)))
+            else:
+                bounds.append((0.0, 100.0))
+        return tuple(bounds), len(configs)
+
+    def action_search(self):
+        """
+        Try ``iterations`` weight configurations on the stored answers of the
+        master's population and keep the ones whose ratings come closest to the
+        target distribution.
+        """
+        self.ensure_one()
+        if not self.target_ids:
+            raise UserError(_("Set the target share of each rating label first."))
+        if self.iterations < 1 or self.top_count < 1:
+            raise UserError(_("Try and keep at least one candidate."))
+        master = self.master_id
+        plan, population, _cached = master._get_sensitivity_population()
+        appraisals = self.env['hr.appraisal'].browse(population['keys'])
+        bounds, budget_count = self._get_budget_bounds(appraisals)
+        if not weight_search.check_bounds(bounds):
+            raise UserError(_("No category weights within the department budgets add up to 100%. "
+                              "Widen the budget margin."))
+        target = {t.label: t.share_percent / 100.0 for t in self.target_ids}
+
+        start = time.perf_counter()
+        baseline, candidates = weight_search.search(
+            plan, population, target, bounds, iterations=self.iterations,
+            item_spread=self.item_spread / 100.0, top=self.top_count, seed=self.seed)
+        duration_ms = (time.perf_counter() - start) * 1000.0
+        if not candidates:
+            raise UserError(_("No weight configuration within the department budgets could be scored. "
+                              "Widen the budget margin."))
+
+        base_weights = dict(zip(population['items'], population['item_weights']))
+        self.candidate_ids.unlink()
+        self.write({
+            'functional_min': bounds[0][0], 'functional_max': bounds[0][1],
+            'role_min': bounds[1][0], 'role_max': bounds[1][1],
+            'common_min': bounds[2][0], 'common_max': bounds[2][1],
+            'budget_count': budget_count,
+            'population': len(population['keys']),
+            'baseline_distance': baseline['distance'] * 100.0,
+            'baseline_distribution': self._format_distribution(baseline['distribution']),
+            'candidate_ids': [(0, 0, {
+                'sequence': rank,
+                'weight_functional': candidate['weights'][0],
+                'weight_role': candidate['weights'][1],
+                'weight_common': candidate['weights'][2],
+                'distance': candidate['distance'] * 100.0,
+                'mean_percentage': candidate['mean'],
+                'std_percentage': candidate['std'],
+                'distribution': self._format_distribution(candidate['distribution']),
+                'item_change_count': sum(1 for item, weight in candidate['item_weights'].items()
+                                         if weight != base_weights.get(item)),
+                'item_weights_json': json.dumps([[template_id, code, weight] for (template_id, code), weight
+                                                 in candidate['item_weights'].items()]),
+            }) for rank, candidate in enumerate(candidates)],
+            'duration_ms': duration_ms,
+            'searched': True,
+        })
+        _logger.info("Weight search for master %s: %s candidates on %s employees in %.1f ms, best distance %.4f",
+                     master.id, self.iterations, len(population['keys']), duration_ms,
+                     candidates[0]['distance'] if candidates else baseline['distance'])
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Weightage Optimizer"),
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def _format_distribution(self, shares):
+        order = {label: index for index, label in enumerate(self.target_ids.sorted('sequence').mapped('label'))}
+        return ', '.join('%s %.1f%%' % (label or '-', share * 100.0)
+                         for label, share in sorted(shares.items(), key=lambda entry: (order.get(entry[0], len(order)),
+                                                                                      entry[0])))
+
+
+class OHAppraisalWeightTarget(models.TransientModel):
+    _name = 'oh.appraisal.weight.target'
+    _description = 'Weightage Optimizer Target Share'
+    _order = 'sequence, id'
+
+    optimizer_id = fields.Many2one('oh.appraisal.weight.optimizer', required=True, ondelete='cascade')
+    sequence = fields.Integer(default=10)
+    label = fields.Char(string='Rating Label', required=True)
+    share_percent = fields.Float(string='Target %', digits=(5, 2), required=True)
+
+
+class OHAppraisalWeightCandidate(models.TransientModel):
+    _name = 'oh.appraisal.weight.candidate'
+    _description = 'Weightage Optimizer Candidate'
+    _order = 'sequence, id'
+
+    optimizer_id = fields.Many2one('oh.appraisal.weight.optimizer', required=True, ondelete='cascade')
+    sequence = fields.Integer()
+    weight_functional = fields.Float(string='Functional %', digits=(5, 2), readonly=True)
+    weight_role = fields.Float(string='Role %', digits=(5, 2), readonly=True)
+    weight_common = fields.Float(string='Common %', digits=(5, 2), readonly=True)
+    distance = fields.Float(string='Distance %', digits=(5, 2), readonly=True,
+                            help="Share of the employees that would have to change band to match the target.")
+    mean_percentage = fields.Float(string='Mean %', digits=(6, 2), readonly=True)
+    std_percentage = fields.Float(string='Std. Dev.', digits=(6, 2), readonly=True)
+    distribution = fields.Char(string='Rating Distribution', readonly=True)
+    item_change_count = fields.Integer(string='Items Reweighted', readonly=True)
+    item_weights_json = fields.Text(string='Item Weights (JSON)', readonly=True,
+                                    help="[[template_id, item_code, weight], ...] of the candidate.")
+
+    def action_apply(self):
+        """
+        Write the candidate's item weights to the template lines, one write per
+        distinct weight, then its category weights to the master, so each
+        affected master moves to a new configuration version once.
+        """
+        self.ensure_one()
+        master = self.optimizer_id.master_id
+        item_weights = {(template_id, code): weight
+                        for template_id, code, weight in json.loads(self.item_weights_json or '[]')}
+        if item_weights:
+            templates = self.env['oh.appraisal.template'].browse({template_id for template_id, _code in item_weights})
+            by_weight = {}
+            for line in templates.line_ids:
+                weight = item_weights.get((line.template_id.id, line._get_item_code()))
+                if weight is not None and float_compare(weight, line.weight, precision_digits=2):
+                    by_weight.setdefault(weight, []).append(line.id)
+            Line = self.env['oh.appraisal.template.line'].with_context(defer_config_bump=True)
+            for weight, line_ids in by_weight.items():
+                Line.browse(line_ids).write({'weight': weight})
+            if by_weight:
+                # the master itself is bumped by the write below
+                (self.env['oh.appraisal.master']._masters_using(templates=templates) - master)._bump_config_version()
+        master.write({
+            'weight_functional': self.weight_functional,
+            'weight_role': self.weight_role,
+            'weight_common': self.weight_common,
+        })
+        _logger.info("Applied weight candidate %s to master %s (%s item weights)", self.id, master.id, len(item_weights))
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'oh.appraisal.master',
+            'res_id': master.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
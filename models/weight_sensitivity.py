@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from collections import OrderedDict
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+from ..lib import sensitivity
+
+_logger = logging.getLogger(__name__)
+
+# Compiled populations of this process, most recently used last:
+# {(dbname, master_id, config_hash, signature): (plan, population)}
+_POPULATIONS = OrderedDict()
+POPULATION_CACHE_SIZE = 4
+
+
+class OHAppraisalMasterSensitivity(models.Model):
+    _inherit = 'oh.appraisal.master'
+
+    def _sensitivity_signature(self, appraisals):
+        """Cheap fingerprint of the answers of ``appraisals``; any new or edited response changes it."""
+        self.env['survey.user_input'].flush_model()
+        self.env['survey.user_input.line'].flush_model()
+        self.env['oh.appraisal.question.binding'].flush_model()
+        self.env.cr.execute("""
+            SELECT concat_ws(':', count(l.id), max(l.write_date), max(ui.write_date),
+                             (SELECT max(write_date) FROM oh_appraisal_question_binding))
+              FROM survey_user_input ui
+              JOIN survey_user_input_line l ON l.user_input_id = ui.id
+             WHERE ui.appraisal_id = ANY(%s::int[])
+        """, (appraisals.ids,))
+        return '%s|%s' % (hash(tuple(appraisals.ids)), self.env.cr.fetchone()[0])
+
+    def _get_sensitivity_population(self, appraisals=None):
+        """
+        (plan, population) of the stored answers of ``appraisals`` (default: the
+        appraisals whose result was computed with this master), compiled by
+        lib.sensitivity.build_population. The compiled per-item percent matrices
+        are kept in a small per-process cache until the configuration or the
+        answers change, so repeated what-ifs skip the extraction entirely.
+        Returns (plan, population, from_cache).
+        """
+        self.ensure_one()
+        if appraisals is None:
+            appraisals = self.env['hr.appraisal'].search(self._get_scored_appraisal_domain(), order='id')
+        if not appraisals:
+            raise UserError(_("No appraisal has been scored with %s yet.") % self.name)
+        key = (self.env.cr.dbname, self.id, self._get_current_version().config_hash,
+               self._sensitivity_signature(appraisals))
+        cached = _POPULATIONS.get(key)
+        if cached:
+            _POPULATIONS.move_to_end(key)
+            return cached + (True,)
+
+        plan = self._get_scoring_plan()
+        population = sensitivity.build_population(plan, self._get_scoring_jobs(appraisals))
+        _POPULATIONS[key] = (plan, population)
+        while len(_POPULATIONS) > POPULATION_CACHE_SIZE:
+            _POPULATIONS.popitem(last=False)
+        return plan, population, False
+
+    def action_open_sensitivity(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Weight Sensitivity"),
+            'res_model': 'oh.appraisal.sensitivity.wizard',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'default_master_id': self.id},
+        }
+
+
+class OHAppraisalSensitivityWizard(models.TransientModel):
+    _name = 'oh.appraisal.sensitivity.wizard'
+    _description = 'Weight Sensitivity Analysis'
+
+    master_id = fields.Many2one('oh.appraisal.master', string='Master', required=True)
+    weight_functional = fields.Float(string='Functional (Dept) %', digits=(6, 2))
+    weight_role = fields.Float(string='Role %', digits=(6, 2))
+    weight_common = fields.Float(string='Common %', digits=(6, 2))
+    weight_ids = fields.One2many('oh.appraisal.sensitivity.weight', 'wizard_id', string='Item Weight Overrides',
+                                 help="Template line weights to try instead of the configured ones.")
+    step_percent = fields.Float(string='Item Step %', default=10.0,
+                                help="Increase applied to each item's weight when ranking the most sensitive items.")
+    top_count = fields.Integer(string='Items to Show', default=10)
+
+    population = fields.Integer(string='Employees', readonly=True)
+    flip_count = fields.Integer(string='Band Flips', readonly=True)
+    mean_delta = fields.Float(string='Mean Delta', digits=(6, 2), readonly=True)
+    mean_abs_delta = fields.Float(string='Mean |Delta|', digits=(6, 2), readonly=True)
+    max_increase = fields.Float(string='Largest Increase', digits=(6, 2), readonly=True)
+    max_decrease = fields.Float(string='Largest Decrease', digits=(6, 2), readonly=True)
+    flip_summary = fields.Text(string='Band Flips by Label', readonly=True)
+    item_ids = fields.One2many('oh.appraisal.sensitivity.item', 'wizard_id', string='Most Sensitive Items', readonly=True)
+    duration_ms = fields.Float(string='Compute Time (ms)', digits=(12, 1), readonly=True)
+    from_cache = fields.Boolean(string='Cached Population', readonly=True)
+    analyzed = fields.Boolean(readonly=True)
+
+    @api.onchange('master_id')
+    def _onchange_master_id(self):
+        self.weight_functional = self.master_id.weight_functional
+        self.weight_role = self.master_id.weight_role
+        self.weight_common = self.master_id.weight_common
+
+    def _item_weight_overrides(self):
+        return {
+            (line.template_line_id.template_id.id, line.template_line_id._get_item_code()): line.weight
+            for line in self.weight_ids
+        }
+
+    def action_analyze(self):
+        """
+        Rescore the stored answers under the weights of the wizard and compare
+        them with the configured weights; the answers are compiled once per
+        population and reused by every following analysis.
+        """
+        self.ensure_one()
+        weights = (self.weight_functional, self.weight_role, self.weight_common)
+        if abs(sum(weights) - 100.0) > 0.001:
+            raise UserError(_("Functional + Role + Common weightages must sum to 100%% (got %s).") % sum(weights))
+        plan, population, from_cache = self.master_id._get_sensitivity_population()
+
+        start = time.perf_counter()
+        item_weights = self._item_weight_overrides()
+        report = sensitivity.compare(plan, population, weights, item_weights)
+        items = sensitivity.item_sensitivity(plan, population, weights, item_weights,
+                                             step=self.step_percent / 100.0, top=max(0, self.top_count))
+        duration_ms = (time.perf_counter() - start) * 1000.0
+
+        flips = sorted(report['flip_matrix'].items(), key=lambda entry: -entry[1])
+        self.item_ids.unlink()
+        self.write({
+            'population': report['population'],
+            'flip_count': report['flips'],
+            'mean_delta': report['mean_delta'],
+            'mean_abs_delta': report['mean_abs_delta'],
+            'max_increase': report['max_increase'],
+            'max_decrease': report['max_decrease'],
+            'flip_summary': '\n'.join('%s → %s: %s' % (old or '-', new or '-', count)
+                                      for (old, new), count in flips),
+            'item_ids': [(0, 0, {
+                'sequence': rank,
+                'template_id': template_id,
+                'item_code': code,
+                'mean_abs_delta': mean_abs_delta,
+                'flip_count': flip_count,
+                'affected': affected,
+            }) for rank, ((template_id, code), mean_abs_delta, flip_count, affected) in enumerate(items)],
+            'duration_ms': duration_ms,
+            'from_cache': from_cache,
+            'analyzed': True,
+        })
+        _logger.info("Sensitivity of master %s: %s employees, %s flips, analyzed in %.1f ms (cached population: %s)",
+                     self.master_id.id, report['population'], report['flips'], duration_ms, from_cache)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Weight Sensitivity"),
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class OHAppraisalSensitivityWeight(models.TransientModel):
+    _name = 'oh.appraisal.sensitivity.weight'
+    _description = 'Weight Sensitivity Item Override'
+
+    wizard_id = fields.Many2one('oh.appraisal.sensitivity.wizard', required=True, ondelete='cascade')
+    template_line_id = fields.Many2one('oh.appraisal.template.line', string='Template Item', required=True)
+    current_weight = fields.Float(related='template_line_id.weight', string='Current Weight')
+    weight = fields.Float(string='Weight', default=1.0)
+
+
+class OHAppraisalSensitivityItem(models.TransientModel):
+    _name = 'oh.appraisal.sensitivity.item'
+    _description = 'Weight Sensitivity Item'
+    _order = 'sequence'
+
+    wizard_id = fields.Many2one('oh.appraisal.sensitivity.wizard', required=True, ondelete='cascade')
+    sequence = fields.Integer()
+    template_id = fields.Many2one('oh.appraisal.template', string='Template', readonly=True)
+    item_code = fields.Char(string='Item', readonly=True)
+    mean_abs_delta = fields.Float(string='Mean |Delta|', digits=(6, 3), readonly=True)
+    flip_count = fields.Integer(string='Band Flips', readonly=True)
+    affected = fields.Integer(string='Employees', readonly=True)
@@ -56,15 +56,10 @@ class AppraisalDashboard extends Component {
                 []
             );
 
-            console.log("Dashboard config from backend:", result);
-
             if (result) {
                 const allowedCompanyIds = result.company_ids || [];
                 const currentCompanyId = result.current_company_id || false;
 
-                console.log("Allowed Company IDs:", allowedCompanyIds);
-                console.log("Current Company ID:", currentCompanyId);
-
                 this.state.currentUserId = result.user_id;
                 this.state.currentCompanyId = currentCompanyId;
 
@@ -77,8 +72,6 @@ class AppraisalDashboard extends Component {
                         { order: 'name' }
                     );
                     this.state.companies = companies;
-                    
-                    console.log("Loaded Companies:", companies);
 
                     // Set default company
                     if (currentCompanyId) {
@@ -86,7 +79,6 @@ class AppraisalDashboard extends Component {
                         await this.onCompanyChange(currentCompanyId);
                     }
                 } else {
-                    console.warn("No allowed companies found, loading all companies");
                     const companies = await this.orm.searchRead(
                         'res.company',
                         [],
@@ -105,15 +97,12 @@ class AppraisalDashboard extends Component {
                 { order: 'name' }
             );
             this.state.industries = industries;
-            
-            console.log("Loaded Industries:", industries);
 
         } catch (error) {
             console.error("Error loading configuration:", error);
             console.error("Error details:", error.message);
             
             // Fallback: load all companies if user detection fails
-            console.log("Falling back to load all companies");
             const companies = await this.orm.searchRead(
                 'res.company',
                 [],
@@ -121,7 +110,6 @@ class AppraisalDashboard extends Component {
                 { order: 'name' }
             );
             this.state.companies = companies;
-            console.log("Loaded all companies (fallback):", companies);
 
             // Load industries even if user detection fails
             const industries = await this.orm.searchRead(
@@ -330,7 +318,6 @@ class AppraisalDashboard extends Component {
             this.state.simulation.score = 85;
             this.state.simulation.rating = 'Exceeds';
             
-            console.log("Simulation completed");
         } catch (error) {
             console.error("Error running simulation:", error);
         }
@@ -352,4 +339,6 @@ class AppraisalDashboard extends Component {
 }
 
 AppraisalDashboard.template = "oh_appraisal_ext.Dashboard";
-registry.category("actions").add("oh_appraisal_dashboard", AppraisalDashboard);
\ No newline at end of file
+// Registered as a lazy component: the client action declared in
+// dashboard_loader.js fetches this bundle the first time it is opened.
+registry.category("lazy_components").add("oh_appraisal_ext.AppraisalDashboard", AppraisalDashboard);
@@ -0,0 +1,21 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { Component, xml } from "@odoo/owl";
+import { LazyComponent } from "@web/core/assets";
+
+/**
+ * Thin client action shipped in web.assets_backend. The real dashboard
+ * (JS, styles and OWL template) lives in the oh_appraisal_ext.assets_dashboard
+ * bundle and is only downloaded when this action is started.
+ */
+class AppraisalDashboardLoader extends Component {
+    static components = { LazyComponent };
+    static props = ["*"];
+    static template = xml`
+        <LazyComponent bundle="'oh_appraisal_ext.assets_dashboard'"
+                       Component="'oh_appraisal_ext.AppraisalDashboard'"
+                       props="props"/>`;
+}
+
+registry.category("actions").add("oh_appraisal_dashboard", AppraisalDashboardLoader);
@@ -0,0 +1,63 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { Component } from "@odoo/owl";
+import { View } from "@web/views/view";
+import { standardWidgetProps } from "@web/views/widgets/standard_widget_props";
+
+/**
+ * Embeds a paged list of the OKR template's lines (key results or objective
+ * breakdowns of one type) instead of a one2many field. Notebook pages are only
+ * rendered when active, so nothing is fetched until the tab is opened, and the
+ * list fetches one page at a time from the server.
+ */
+export class OkrLazyRelation extends Component {
+    static template = "oh_appraisal_ext.OkrLazyRelation";
+    static components = { View };
+    static props = {
+        ...standardWidgetProps,
+        resModel: String,
+        typeField: String,
+        typeValue: String,
+        listView: String,
+        formView: { type: String, optional: true },
+    };
+
+    get viewProps() {
+        const { record, resModel, typeField, typeValue, listView, formView } = this.props;
+        const context = {
+            [`default_${typeField}`]: typeValue,
+            default_okr_template_id: record.resId,
+            weightage_type: typeValue,
+            list_view_ref: listView,
+        };
+        if (formView) {
+            context.form_view_ref = formView;
+        }
+        return {
+            type: "list",
+            resModel,
+            context,
+            domain: [
+                ["okr_template_id", "=", record.resId],
+                [typeField, "=", typeValue],
+            ],
+            display: { searchPanel: false },
+            noBreadcrumbs: true,
+            searchViewId: false,
+        };
+    }
+}
+
+export const okrLazyRelation = {
+    component: OkrLazyRelation,
+    extractProps: ({ attrs }) => ({
+        resModel: attrs.res_model,
+        typeField: attrs.type_field,
+        typeValue: attrs.type_value,
+        listView: attrs.list_view,
+        formView: attrs.form_view,
+    }),
+};
+
+registry.category("view_widgets").add("okr_lazy_relation", okrLazyRelation);
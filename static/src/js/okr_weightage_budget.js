@@ -0,0 +1,157 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { useEffect } from "@odoo/owl";
+import { X2ManyField, x2ManyField } from "@web/views/fields/x2many/x2many_field";
+
+const CATEGORIES = [
+    {
+        key: "functional",
+        label: "Dept",
+        lineField: "department_weightage",
+        budgetField: "department_budget_functional",
+        resultType: "department",
+    },
+    {
+        key: "role",
+        label: "Role",
+        lineField: "role_weightage",
+        budgetField: "department_budget_role",
+        resultType: "role",
+    },
+    {
+        key: "common",
+        label: "Common",
+        lineField: "common_weightage",
+        budgetField: "department_budget_common",
+        resultType: "common",
+    },
+];
+
+function round2(value) {
+    return Math.round((value + Number.EPSILON) * 100) / 100;
+}
+
+function many2oneId(value) {
+    if (!value) {
+        return false;
+    }
+    return Array.isArray(value) ? value[0] : value.id;
+}
+
+function many2oneName(value) {
+    if (!value) {
+        return "";
+    }
+    return Array.isArray(value) ? value[1] : value.display_name;
+}
+
+/**
+ * Split the common budget equally among ``count`` teams, giving the rounding
+ * remainder to the first team. Mirrors
+ * oh.appraisal.okr.template._split_common_weightage on the server.
+ */
+export function splitCommonWeightage(total, count) {
+    if (!count) {
+        return [];
+    }
+    const share = round2(total / count);
+    const shares = new Array(count).fill(share);
+    const difference = total - share * count;
+    if (Math.abs(difference) > 0.01) {
+        shares[0] = share + round2(difference);
+    }
+    return shares;
+}
+
+/**
+ * One2many widget for ``weightage_ids`` on the OKR template form. Team
+ * allocations, the equal split of the common budget and the remaining
+ * key-result budget per team are all computed in the browser from the data
+ * already loaded in the form (the record needs ``department_budget_*`` and
+ * ``key_result_distribution``); the server only sees the final write on save.
+ */
+export class OkrWeightageBudgetField extends X2ManyField {
+    static template = "oh_appraisal_ext.OkrWeightageBudgetField";
+
+    setup() {
+        super.setup();
+        this.categories = CATEGORIES;
+        useEffect(
+            () => {
+                this.redistributeCommon();
+            },
+            () => [this.lines.length, this.budget("common")]
+        );
+    }
+
+    get lines() {
+        return this.props.record.data[this.props.name].records;
+    }
+
+    budget(categoryKey) {
+        const category = CATEGORIES.find((c) => c.key === categoryKey);
+        return this.props.record.data[category.budgetField] || 0.0;
+    }
+
+    allocated(category) {
+        return round2(
+            this.lines.reduce((total, line) => total + (line.data[category.lineField] || 0.0), 0.0)
+        );
+    }
+
+    remaining(category) {
+        return round2(this.budget(category.key) - this.allocated(category));
+    }
+
+    /**
+     * Remaining key-result budget of a team for one category: what the
+     * template allocates to that category minus what the team's key results
+     * already distribute (same rule as _compute_available_weightage). The
+     * distributed totals come pre-grouped in key_result_distribution, so the
+     * key result lists themselves never need to be loaded in the form.
+     */
+    keyResultRemaining(category, teamId) {
+        const byType = this.keyResultDistribution[category.resultType] || {};
+        const distributed = byType[String(teamId)] || 0.0;
+        return round2(Math.max(0.0, this.allocated(category) - distributed));
+    }
+
+    get keyResultDistribution() {
+        const raw = this.props.record.data.key_result_distribution;
+        if (raw !== this._distributionRaw) {
+            this._distributionRaw = raw;
+            this._distribution = raw ? JSON.parse(raw) : {};
+        }
+        return this._distribution;
+    }
+
+    get teamRows() {
+        return this.lines
+            .filter((line) => many2oneId(line.data.team_id))
+            .map((line) => ({
+                id: line.id,
+                teamId: many2oneId(line.data.team_id),
+                name: many2oneName(line.data.team_id),
+            }));
+    }
+
+    async redistributeCommon() {
+        if (this.props.readonly || !this.props.record.data.department_id) {
+            return;
+        }
+        const shares = splitCommonWeightage(this.budget("common"), this.lines.length);
+        for (const [index, line] of this.lines.entries()) {
+            if (round2(line.data.common_weightage || 0.0) !== round2(shares[index])) {
+                await line.update({ common_weightage: shares[index] });
+            }
+        }
+    }
+}
+
+export const okrWeightageBudgetField = {
+    ...x2ManyField,
+    component: OkrWeightageBudgetField,
+};
+
+registry.category("fields").add("okr_weightage_budget", okrWeightageBudgetField);
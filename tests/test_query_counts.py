@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Query-count regression tests for the hot paths.
+
+Each test runs the same operation on one record and on N records and checks
+that the larger run costs at most a fixed number of extra queries. SLACK is
+kept well below N, so any per-record query pattern (N+1) fails the test while
+a constant amount of extra work (prefetch splits, an extra grouped read) does not.
+"""
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.oh_appraisal_ext.benchmarks import generator
+
+N = 10
+SLACK = 5
+
+DATASET = dict(
+    employees=24, companies=1, departments=2, jobs=2,
+    teams=6, items=4, key_results=3 * N, peers=1,
+)
+
+
+@tagged('post_install', '-at_install')
+class TestQueryCounts(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.data = generator.generate(cls.env, size=DATASET, seed=7)
+        cls.master = cls.env['oh.appraisal.master'].browse(cls.data.master_ids[0])
+        cls.employees = cls.env['hr.employee'].browse(cls.data.employee_ids)
+        cls.appraisals = cls.env['hr.appraisal'].browse(cls.data.appraisal_ids)
+
+    def _count_queries(self, func):
+        """Queries issued by func() on a cold cache, including the final flush."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        before = self.env.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.env.cr.sql_log_count - before
+
+    def assertScales(self, one, many, label):
+        self.assertLessEqual(
+            many, one + SLACK,
+            "%s: %d queries for 1 record but %d for %d records" % (label, one, many, N),
+        )
+
+    def _score(self, employees):
+        def run():
+            for employee in employees:
+                self.master.compute_employee_score(employee, self.data.answers.get(employee.id, {}))
+        return run
+
+    def test_score_employees(self):
+        one = self._count_queries(self._score(self.employees[:1]))
+        many = self._count_queries(self._score(self.employees[1:N + 1]))
+        self.assertScales(one, many, "compute_employee_score")
+
+    def test_close_appraisals(self):
+        one = self._count_queries(self.appraisals[:1]._compute_appraisal_results)
+        many = self._count_queries(self.appraisals[1:N + 1]._compute_appraisal_results)
+        self.assertScales(one, many, "close-out")
+        self.assertTrue(all(self.appraisals[:N + 1].mapped('is_result_computed')))
+
+    def test_okr_template_save_key_results(self):
+        template = self.env['oh.appraisal.okr.template'].browse(self.data.okr_template_ids[0])
+        key_results = template.department_key_result_ids
+        self.assertGreaterEqual(len(key_results), N + 1)
+
+        def save(records, value):
+            return lambda: template.write({'department_key_result_ids': [
+                (1, kr.id, {'distributed_weightage': value}) for kr in records
+            ]})
+
+        one = self._count_queries(save(key_results[:1], 0.02))
+        many = self._count_queries(save(key_results[1:N + 1], 0.02))
+        self.assertScales(one, many, "OKR template save (key results)")
+
+    def test_okr_template_save_weightages(self):
+        template = self.env['oh.appraisal.okr.template'].browse(self.data.okr_template_ids[0])
+        lines = template.weightage_ids
+        self.assertGreater(len(lines), 2)
+
+        def save(records):
+            return lambda: template.write({'weightage_ids': [
+                (1, line.id, {'department_weightage': line.department_weightage - 0.01}) for line in records
+            ]})
+
+        one = self._count_queries(save(lines[:1]))
+        many = self._count_queries(save(lines[1:]))
+        # fewer lines than N here, so the bound is tightened accordingly
+        self.assertLessEqual(many, one + min(SLACK, len(lines) - 2))
+
+    def test_team_list(self):
+        fields = ['complete_name', 'department_id', 'team_leader_id', 'member_count', 'child_count']
+        Team = self.env['oh.appraisal.team']
+        domain = [('id', 'in', self.data.team_ids)]
+        one = self._count_queries(lambda: Team.search_read(domain, fields, limit=1))
+        many = self._count_queries(lambda: Team.search_read(domain, fields, limit=N))
+        self.assertScales(one, many, "team list")
+
+    def test_results_list(self):
+        self.appraisals[:N + 1]._compute_appraisal_results()
+        fields = ['name', 'employee_id', 'master_id', 'final_percentage', 'rating_label', 'date', 'company_id']
+        Result = self.env['oh.appraisal.result']
+        domain = [('company_id', 'in', self.data.company_ids)]
+        self.assertGreaterEqual(Result.search_count(domain), N)
+        one = self._count_queries(lambda: Result.search_read(domain, fields, limit=1))
+        many = self._count_queries(lambda: Result.search_read(domain, fields, limit=N))
+        self.assertScales(one, many, "results list")